@@ -0,0 +1,155 @@
+import asyncio
+import datetime as dt
+import itertools
+
+import discord
+
+from . import db
+
+# Archive rows are written in batches: this long after the first unwritten embed, or at ARCHIVE_BATCH_MAX
+ARCHIVE_FLUSH_DELAY_SECONDS = 2.0
+ARCHIVE_BATCH_MAX = 200
+# A failed write is retried with doubling backoff, capped at this
+ARCHIVE_FLUSH_RETRY_MAX_SECONDS = 60.0
+
+UPSERT_SQL = """
+INSERT INTO audit_archive (uid, guild_id, created_at, title, body)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(uid) DO UPDATE SET title = excluded.title, body = excluded.body
+"""
+
+SEARCH_SQL = """
+SELECT a.created_at, a.title, snippet(audit_archive_fts, 1, '**', '**', '…', 24)
+FROM audit_archive_fts
+JOIN audit_archive a ON a.id = audit_archive_fts.rowid
+WHERE audit_archive_fts MATCH ?
+  AND a.guild_id = ?
+  AND a.created_at >= ?
+  AND a.created_at < ?
+ORDER BY a.created_at DESC
+LIMIT ?
+"""
+
+# uid -> row waiting to be written; a newer version of the same uid (an edit) replaces the older one
+_PENDING: dict[str, tuple[str, int, str, str, str]] = {}
+_FLUSH_TASK: asyncio.Task | None = None
+# Set when the buffer reaches ARCHIVE_BATCH_MAX, to cut the flush delay short
+_BUFFER_FULL = asyncio.Event()
+# One write at a time, so an older version of a row can never land after a newer one
+_WRITE_LOCK = asyncio.Lock()
+_UID_COUNTER = itertools.count()
+
+
+class ArchiveRef:
+    """Identifies an archived embed so edit_audit_embed can replace its text."""
+
+    __slots__ = ("uid", "guild_id", "created_at")
+
+    def __init__(self, uid: str, guild_id: int, created_at: str):
+        self.uid = uid
+        self.guild_id = guild_id
+        self.created_at = created_at
+
+
+def _embed_text(embed: discord.Embed) -> tuple[str, str]:
+    parts = []
+    if embed.description:
+        parts.append(embed.description)
+    for field in embed.fields:
+        parts.append(f"{field.name}: {field.value}")
+    if embed.footer and embed.footer.text:
+        parts.append(embed.footer.text)
+    return embed.title or "", "\n".join(parts)
+
+
+def _queue(ref: ArchiveRef, embed: discord.Embed) -> None:
+    global _FLUSH_TASK
+    title, body = _embed_text(embed)
+    _PENDING[ref.uid] = (ref.uid, ref.guild_id, ref.created_at, title, body)
+
+    if _FLUSH_TASK is None or _FLUSH_TASK.done():
+        _FLUSH_TASK = asyncio.create_task(_flush_later())
+    if len(_PENDING) >= ARCHIVE_BATCH_MAX:
+        _BUFFER_FULL.set()
+
+
+def archive_embed(guild_id: int, embed: discord.Embed) -> ArchiveRef | None:
+    """Queue an audit embed for the archive. Returns a ref for later edits, or None if the archive is off."""
+    if not db.AUDIT_ARCHIVE_ENABLED:
+        return None
+    now = dt.datetime.now(dt.timezone.utc)
+    ref = ArchiveRef(f"{now.timestamp():.6f}-{next(_UID_COUNTER)}", guild_id, now.isoformat())
+    _queue(ref, embed)
+    return ref
+
+
+def archive_embed_edit(ref: ArchiveRef | None, embed: discord.Embed) -> None:
+    if ref is None or not db.AUDIT_ARCHIVE_ENABLED:
+        return
+    _queue(ref, embed)
+
+
+async def flush_archive() -> bool:
+    """Write everything buffered. On failure the rows go back in the buffer and False is returned."""
+    async with _WRITE_LOCK:
+        if not _PENDING:
+            return True
+        rows = list(_PENDING.values())
+        _PENDING.clear()
+        try:
+            async with db.connect() as conn:
+                await conn.executemany(UPSERT_SQL, rows)
+                await conn.commit()
+        except Exception as e:
+            print(f"[audit-archive] Failed to write {len(rows)} row(s), will retry: {type(e).__name__}: {e}")
+            # Edits queued during the failed write are newer, so they win over the re-queued rows
+            for row in rows:
+                _PENDING.setdefault(row[0], row)
+            return False
+        return True
+
+
+async def _wait_for_batch() -> None:
+    try:
+        await asyncio.wait_for(_BUFFER_FULL.wait(), timeout=ARCHIVE_FLUSH_DELAY_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    _BUFFER_FULL.clear()
+
+
+async def _flush_later() -> None:
+    await _wait_for_batch()
+    delay = ARCHIVE_FLUSH_DELAY_SECONDS
+    # Rows queued while a write was in flight are picked up by the next round
+    while _PENDING:
+        if await flush_archive():
+            delay = ARCHIVE_FLUSH_DELAY_SECONDS
+            if _PENDING:
+                await _wait_for_batch()
+            continue
+        delay = min(delay * 2, ARCHIVE_FLUSH_RETRY_MAX_SECONDS)
+        await asyncio.sleep(delay)
+
+
+def _match_expression(query: str) -> str:
+    # Each word becomes a quoted phrase (implicitly ANDed), so user input can't break FTS5 syntax
+    return " ".join('"' + token.replace('"', '""') + '"' for token in query.split())
+
+
+async def search_audit_archive(
+    guild_id: int,
+    query: str,
+    *,
+    since_iso: str,
+    until_iso: str,
+    limit: int = 200,
+) -> list[tuple[str, str, str]]:
+    """Newest-first matches as (created_at, title, snippet)."""
+    match = _match_expression(query)
+    if not match or not db.AUDIT_ARCHIVE_ENABLED:
+        return []
+    # Make sure anything still buffered is searchable
+    await flush_archive()
+    async with db.connect() as conn:
+        rows = await conn.execute_fetchall(SEARCH_SQL, (match, guild_id, since_iso, until_iso, limit))
+    return [(r[0], r[1], r[2]) for r in rows]
@@ -0,0 +1,289 @@
+import asyncio
+import datetime as dt
+import json
+import time
+from collections import deque
+
+import aiohttp
+
+from .config import (
+    AUDIT_WEBHOOK_URL,
+    AUDIT_WEBHOOK_RETRY_QUEUE_MAX,
+    AUDIT_WEBHOOK_BACKOFF_BASE_SECONDS,
+    AUDIT_WEBHOOK_BACKOFF_MAX_SECONDS,
+)
+from .db import connect
+
+# 429s shorter than this are waited out inline; longer ones go through the retry queue
+INLINE_RATE_LIMIT_WAIT_SECONDS = 10.0
+SPILL_REPLAY_BATCH = 50
+
+# post_message result for a payload accepted for later delivery (retry queue or spill)
+QUEUED = object()
+
+# Running totals for /bot_info
+WEBHOOK_STATS = {"delivered": 0, "retried": 0, "dropped": 0, "spilled": 0}
+
+
+class WebhookError(Exception):
+    def __init__(self, message: str, *, retryable: bool, retry_after: float | None = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class _Retry:
+    """A payload waiting for delivery; spill_id is its audit_spill row, kept until it is delivered or dropped."""
+
+    __slots__ = ("payload", "attempts", "next_at", "spill_id")
+
+    def __init__(self, payload: dict, attempts: int, next_at: float, spill_id: int | None = None):
+        self.payload = payload
+        self.attempts = attempts
+        self.next_at = next_at
+        self.spill_id = spill_id
+
+
+# Payloads waiting to be retried, oldest first (the head blocks the rest so order is kept)
+_RETRY_QUEUE: deque[_Retry] = deque()
+_RETRY_TASK: asyncio.Task | None = None
+_SESSION: aiohttp.ClientSession | None = None
+# True while audit_spill may hold rows not yet replayed; new payloads spill behind them to keep order
+_SPILL_PENDING = False
+# Highest audit_spill id already moved into the retry queue this process
+_SPILL_REPLAYED_UPTO = -(2 ** 63)
+
+
+def _session() -> aiohttp.ClientSession:
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+    return _SESSION
+
+
+def _backoff(attempts: int) -> float:
+    return min(AUDIT_WEBHOOK_BACKOFF_MAX_SECONDS, AUDIT_WEBHOOK_BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)))
+
+
+async def _request(method: str, url: str, payload: dict, *, params: dict | None = None) -> dict | None:
+    """
+    One webhook call. Short 429s are waited out using Discord's retry_after.
+    Raises WebhookError (retryable for 429/5xx/network errors) on failure.
+    """
+    while True:
+        try:
+            async with _session().request(method, url, json=payload, params=params) as resp:
+                if resp.status == 429:
+                    try:
+                        data = await resp.json(content_type=None)
+                    except Exception:
+                        data = {}
+                    retry_after = float(data.get("retry_after") or resp.headers.get("Retry-After") or 1.0)
+                    if retry_after > INLINE_RATE_LIMIT_WAIT_SECONDS:
+                        raise WebhookError("rate limited", retryable=True, retry_after=retry_after)
+                    WEBHOOK_STATS["retried"] += 1
+                    await asyncio.sleep(retry_after)
+                    continue
+                if 200 <= resp.status < 300:
+                    if resp.status == 204:
+                        return None
+                    return await resp.json(content_type=None)
+                body = (await resp.text())[:200]
+                raise WebhookError(f"HTTP {resp.status}: {body}", retryable=resp.status >= 500)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise WebhookError(f"{type(e).__name__}: {e}", retryable=True) from e
+
+
+async def _spill(payloads: list[dict]) -> bool:
+    """Park payloads in audit_spill; False if they had to be dropped."""
+    global _SPILL_PENDING
+    now = dt.datetime.now(dt.timezone.utc).isoformat()
+    try:
+        async with connect() as db:
+            await db.executemany(
+                "INSERT INTO audit_spill (payload, spilled_at) VALUES (?, ?)",
+                [(json.dumps(p), now) for p in payloads],
+            )
+            await db.commit()
+    except Exception as e:
+        WEBHOOK_STATS["dropped"] += len(payloads)
+        print(f"[audit-webhook] Spill failed, dropped {len(payloads)} message(s): {type(e).__name__}: {e}")
+        return False
+    _SPILL_PENDING = True
+    WEBHOOK_STATS["spilled"] += len(payloads)
+    return True
+
+
+async def _replay_spill() -> None:
+    """
+    Move the oldest spilled payloads back into the retry queue. Their rows stay in audit_spill
+    until each one is delivered (or dropped), so a restart meanwhile loses nothing.
+    """
+    global _SPILL_PENDING, _SPILL_REPLAYED_UPTO
+    room = AUDIT_WEBHOOK_RETRY_QUEUE_MAX - len(_RETRY_QUEUE)
+    async with connect() as db:
+        rows = await db.execute_fetchall(
+            "SELECT id, payload FROM audit_spill WHERE id > ? ORDER BY id LIMIT ?",
+            (_SPILL_REPLAYED_UPTO, min(room, SPILL_REPLAY_BATCH)),
+        )
+    if len(rows) < min(room, SPILL_REPLAY_BATCH):
+        _SPILL_PENDING = False
+    now = time.monotonic()
+    for spill_id, payload in rows:
+        _RETRY_QUEUE.append(_Retry(json.loads(payload), 0, now, spill_id))
+    if rows:
+        _SPILL_REPLAYED_UPTO = rows[-1][0]
+
+
+async def _settle(item: _Retry) -> None:
+    """The head of the queue was delivered or dropped: pop it and delete its spill row."""
+    _RETRY_QUEUE.popleft()
+    if item.spill_id is None:
+        return
+    try:
+        async with connect() as db:
+            await db.execute("DELETE FROM audit_spill WHERE id = ?", (item.spill_id,))
+            await db.commit()
+    except Exception as e:
+        # Worst case it is sent again after a restart
+        print(f"[audit-webhook] Failed to clear spill row {item.spill_id}: {type(e).__name__}: {e}")
+
+
+async def _queue_for_retry(payload: dict, *, attempts: int, delay: float) -> bool:
+    """False if the payload couldn't be queued or spilled and was dropped."""
+    if _SPILL_PENDING or len(_RETRY_QUEUE) >= AUDIT_WEBHOOK_RETRY_QUEUE_MAX:
+        queued = await _spill([payload])
+    else:
+        _RETRY_QUEUE.append(_Retry(payload, attempts, time.monotonic() + delay))
+        queued = True
+    _ensure_retry_task()
+    return queued
+
+
+def _ensure_retry_task() -> None:
+    global _RETRY_TASK
+    if _RETRY_TASK is None or _RETRY_TASK.done():
+        _RETRY_TASK = asyncio.create_task(_retry_loop())
+
+
+async def _retry_loop() -> None:
+    while True:
+        if not _RETRY_QUEUE:
+            # Only reached once the queue has drained, i.e. the webhook is delivering again
+            if not _SPILL_PENDING:
+                return
+            try:
+                await _replay_spill()
+            except Exception as e:
+                print(f"[audit-webhook] Spill replay failed: {type(e).__name__}: {e}")
+                await asyncio.sleep(AUDIT_WEBHOOK_BACKOFF_MAX_SECONDS)
+            continue
+
+        item = _RETRY_QUEUE[0]
+        wait = item.next_at - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+
+        try:
+            await _request("POST", AUDIT_WEBHOOK_URL, item.payload, params={"wait": "true"})
+        except WebhookError as e:
+            if not e.retryable:
+                await _settle(item)
+                WEBHOOK_STATS["dropped"] += 1
+                print(f"[audit-webhook] Dropped message after non-retryable error: {e}")
+                continue
+            # The head keeps retrying (backoff capped) so order holds; overflow meanwhile spills to SQLite
+            item.attempts += 1
+            WEBHOOK_STATS["retried"] += 1
+            item.next_at = time.monotonic() + (e.retry_after or _backoff(item.attempts))
+            continue
+
+        await _settle(item)
+        WEBHOOK_STATS["delivered"] += 1
+
+
+async def post_message(payload: dict) -> str | object | None:
+    """
+    Execute the webhook with a message payload. Returns the new message ID, QUEUED if it was
+    queued for retry / spilled (it will still be delivered, but can't be edited later), or None
+    if it was dropped. While earlier messages are still pending, new ones queue behind them to keep order.
+    """
+    if _RETRY_QUEUE or _SPILL_PENDING:
+        return QUEUED if await _queue_for_retry(payload, attempts=0, delay=0.0) else None
+
+    try:
+        data = await _request("POST", AUDIT_WEBHOOK_URL, payload, params={"wait": "true"})
+    except WebhookError as e:
+        if not e.retryable:
+            WEBHOOK_STATS["dropped"] += 1
+            print(f"[audit-webhook] Dropped message after non-retryable error: {e}")
+            return None
+        WEBHOOK_STATS["retried"] += 1
+        return QUEUED if await _queue_for_retry(payload, attempts=1, delay=e.retry_after or _backoff(1)) else None
+
+    WEBHOOK_STATS["delivered"] += 1
+    return str(data["id"]) if data and "id" in data else None
+
+
+async def edit_message(message_id: str, payload: dict) -> None:
+    """Best-effort edit of a message this webhook posted."""
+    try:
+        await _request("PATCH", f"{AUDIT_WEBHOOK_URL}/messages/{message_id}", payload)
+    except WebhookError as e:
+        print(f"[audit-webhook] Edit of message {message_id} failed: {e}")
+
+
+async def _persist_retry_queue() -> None:
+    """
+    Write the whole retry queue to audit_spill ahead of any rows not yet replayed, so the next
+    process delivers everything in the original order. Queued rows get ids below the lowest
+    remaining one (ids may go negative; only their order matters).
+    """
+    items = list(_RETRY_QUEUE)
+    spill_ids = [item.spill_id for item in items if item.spill_id is not None]
+    async with connect() as db:
+        if spill_ids:
+            await db.executemany("DELETE FROM audit_spill WHERE id = ?", [(i,) for i in spill_ids])
+        rows = await db.execute_fetchall("SELECT id FROM audit_spill ORDER BY id LIMIT 1")
+        first_id = (rows[0][0] if rows else 1) - len(items)
+        now = dt.datetime.now(dt.timezone.utc).isoformat()
+        await db.executemany(
+            "INSERT INTO audit_spill (id, payload, spilled_at) VALUES (?, ?, ?)",
+            [(first_id + i, json.dumps(item.payload), now) for i, item in enumerate(items)],
+        )
+        await db.commit()
+    _RETRY_QUEUE.clear()
+
+
+async def shutdown() -> None:
+    """Bot shutdown: stop retrying, keep undelivered messages in audit_spill, close the HTTP session."""
+    global _SESSION, _RETRY_TASK
+    if _RETRY_TASK is not None and not _RETRY_TASK.done():
+        _RETRY_TASK.cancel()
+        try:
+            await _RETRY_TASK
+        except asyncio.CancelledError:
+            pass
+    _RETRY_TASK = None
+    if _RETRY_QUEUE:
+        try:
+            await _persist_retry_queue()
+        except Exception as e:
+            WEBHOOK_STATS["dropped"] += len(_RETRY_QUEUE)
+            print(f"[audit-webhook] Failed to spill {len(_RETRY_QUEUE)} queued message(s) on shutdown: {type(e).__name__}: {e}")
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+
+async def resume_spilled() -> None:
+    """on_ready: pick up payloads spilled before a restart."""
+    global _SPILL_PENDING
+    if not AUDIT_WEBHOOK_URL:
+        return
+    async with connect() as db:
+        rows = await db.execute_fetchall("SELECT 1 FROM audit_spill LIMIT 1")
+    if rows:
+        _SPILL_PENDING = True
+        _ensure_retry_task()
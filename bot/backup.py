@@ -0,0 +1,210 @@
+import asyncio
+import datetime as dt
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from .config import (
+    SQLITE_PATH,
+    BACKUP_DIR,
+    BACKUP_INTERVAL_HOURS,
+    BACKUP_KEEP,
+)
+
+SNAPSHOT_PREFIX = "bot-"
+SNAPSHOT_SUFFIX = ".sqlite3.gz"
+
+# The running snapshot loop; start_backup_task is a no-op while it is alive
+_BACKUP_TASK: asyncio.Task | None = None
+
+
+def _integrity_ok(path: str, *, quick: bool = False) -> tuple[bool, str]:
+    conn = sqlite3.connect(path)
+    try:
+        pragma = "quick_check" if quick else "integrity_check"
+        rows = conn.execute(f"PRAGMA {pragma}").fetchall()
+    finally:
+        conn.close()
+    detail = "; ".join(str(r[0]) for r in rows[:5])
+    return (len(rows) == 1 and rows[0][0] == "ok"), detail
+
+
+def _snapshot_sync() -> str:
+    """
+    Copy the live DB with the online backup API, check it, gzip it into BACKUP_DIR
+    and return the snapshot path. Blocking; run in a thread.
+    """
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%d-%H%M%S")
+    final_path = os.path.join(BACKUP_DIR, f"{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}")
+
+    fd, raw_path = tempfile.mkstemp(prefix=".snapshot-", suffix=".sqlite3", dir=BACKUP_DIR)
+    os.close(fd)
+    try:
+        src = sqlite3.connect(SQLITE_PATH)
+        dst = sqlite3.connect(raw_path)
+        try:
+            # One step, i.e. one read transaction on the source. A stepped backup restarts from
+            # page 0 whenever another connection writes, so on a busy bot it might never finish;
+            # in WAL mode the read transaction doesn't block the bot's writers anyway.
+            src.backup(dst, pages=-1)
+        finally:
+            dst.close()
+            src.close()
+
+        ok, detail = _integrity_ok(raw_path, quick=True)
+        if not ok:
+            raise RuntimeError(f"snapshot failed quick_check: {detail}")
+
+        tmp_gz = final_path + ".part"
+        with open(raw_path, "rb") as f_in, gzip.open(tmp_gz, "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+        os.replace(tmp_gz, final_path)
+    finally:
+        for leftover in (raw_path, final_path + ".part"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return final_path
+
+
+def list_snapshots() -> list[str]:
+    """Snapshot paths in BACKUP_DIR, newest first."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    names = [
+        n for n in os.listdir(BACKUP_DIR)
+        if n.startswith(SNAPSHOT_PREFIX) and n.endswith(SNAPSHOT_SUFFIX)
+    ]
+    names.sort(reverse=True)
+    return [os.path.join(BACKUP_DIR, n) for n in names]
+
+
+def _rotate_sync() -> int:
+    removed = 0
+    for path in list_snapshots()[max(0, BACKUP_KEEP):]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+async def take_snapshot() -> str:
+    """Take one snapshot + rotate, without blocking the event loop."""
+    path = await asyncio.to_thread(_snapshot_sync)
+    await asyncio.to_thread(_rotate_sync)
+    return path
+
+
+def _decompress_to_temp(snapshot_path: str) -> str:
+    fd, raw_path = tempfile.mkstemp(prefix=".restore-", suffix=".sqlite3")
+    os.close(fd)
+    opener = gzip.open if snapshot_path.endswith(".gz") else open
+    with opener(snapshot_path, "rb") as f_in, open(raw_path, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+    return raw_path
+
+
+def verify_snapshot(snapshot_path: str) -> tuple[bool, str]:
+    raw_path = _decompress_to_temp(snapshot_path)
+    try:
+        return _integrity_ok(raw_path)
+    finally:
+        os.remove(raw_path)
+
+
+def restore_snapshot(snapshot_path: str) -> None:
+    """
+    Decompress a snapshot, verify it with PRAGMA integrity_check and copy it over SQLITE_PATH.
+    Run this with the bot stopped.
+    """
+    raw_path = _decompress_to_temp(snapshot_path)
+    try:
+        ok, detail = _integrity_ok(raw_path)
+        if not ok:
+            raise RuntimeError(f"integrity_check failed, refusing to restore: {detail}")
+
+        os.makedirs(os.path.dirname(SQLITE_PATH), exist_ok=True)
+        src = sqlite3.connect(raw_path)
+        dst = sqlite3.connect(SQLITE_PATH)
+        try:
+            # Backup API (not a file copy) so any existing WAL for the target is handled correctly.
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+
+        ok, detail = _integrity_ok(SQLITE_PATH)
+        if not ok:
+            raise RuntimeError(f"restored DB failed integrity_check: {detail}")
+    finally:
+        os.remove(raw_path)
+
+
+async def _backup_loop(bot) -> None:
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            t0 = time.perf_counter()
+            path = await take_snapshot()
+            print(f"[backup] Wrote {os.path.basename(path)} in {time.perf_counter() - t0:.1f}s")
+        except Exception as e:
+            print(f"[backup] Snapshot failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(BACKUP_INTERVAL_HOURS * 3600)
+
+
+def start_backup_task(bot) -> None:
+    global _BACKUP_TASK
+    if BACKUP_INTERVAL_HOURS <= 0:
+        return
+    if _BACKUP_TASK is not None and not _BACKUP_TASK.done():
+        return
+    _BACKUP_TASK = asyncio.create_task(_backup_loop(bot))
+
+
+def _main(argv: list[str]) -> int:
+    usage = (
+        "Usage:\n"
+        "  python -m bot.backup snapshot          take a snapshot now\n"
+        "  python -m bot.backup list              list snapshots, newest first\n"
+        "  python -m bot.backup verify <file>     integrity-check a snapshot\n"
+        "  python -m bot.backup restore <file>    verify + restore a snapshot (stop the bot first)"
+    )
+    if not argv:
+        print(usage)
+        return 2
+
+    cmd = argv[0]
+    if cmd == "snapshot":
+        print(asyncio.run(take_snapshot()))
+        return 0
+    if cmd == "list":
+        for path in list_snapshots():
+            print(path)
+        return 0
+    if cmd in {"verify", "restore"} and len(argv) == 2:
+        path = argv[1]
+        if cmd == "verify":
+            ok, detail = verify_snapshot(path)
+            print("ok" if ok else f"FAILED: {detail}")
+            return 0 if ok else 1
+        try:
+            restore_snapshot(path)
+        except Exception as e:
+            print(f"Restore failed: {e}")
+            return 1
+        print(f"Restored {path} -> {SQLITE_PATH}")
+        return 0
+
+    print(usage)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import discord
+
+# A channel that doesn't exist or can't be accessed is not retried over REST for this long
+CHANNEL_NEGATIVE_TTL_SECONDS = 5 * 60
+# A channel fetched over REST is re-fetched after this long, in case an event that would
+# have invalidated it never reached us
+CHANNEL_CACHE_TTL_SECONDS = 30 * 60
+
+# (guild_id, channel_id) -> (channel fetched over REST because it wasn't in the gateway cache, monotonic fetch time)
+_RESOLVED: dict[tuple[int, int], tuple[discord.abc.GuildChannel | discord.Thread, float]] = {}
+# (guild_id, channel_id) -> monotonic time a fetch failed (missing, or no access)
+_MISSING: dict[tuple[int, int], float] = {}
+# Concurrent misses for the same channel share one fetch
+_INFLIGHT: dict[tuple[int, int], asyncio.Task] = {}
+
+
+async def _fetch_channel(guild: discord.Guild, channel_id: int):
+    key = (guild.id, channel_id)
+    try:
+        ch = await guild.fetch_channel(channel_id)
+    except (discord.NotFound, discord.Forbidden):
+        _MISSING[key] = time.monotonic()
+        return None
+    except Exception as e:
+        # Transient (rate limit, 5xx, network): not remembered, the next call tries again
+        print(f"[channels] Failed to fetch channel {channel_id} in guild {guild.id}: {type(e).__name__}: {e}")
+        return None
+    finally:
+        _INFLIGHT.pop(key, None)
+    _RESOLVED[key] = (ch, time.monotonic())
+    _MISSING.pop(key, None)
+    return ch
+
+
+async def resolve_channel(guild: discord.Guild, channel_id: int | None, *, kind=None):
+    """
+    Return a guild channel (or thread) by ID: gateway cache first, then a cached fetch_channel.
+    Fetched channels are kept for CHANNEL_CACHE_TTL_SECONDS; missing or inaccessible ones are
+    remembered for CHANNEL_NEGATIVE_TTL_SECONDS. If kind is given (a type or tuple of types) and
+    the channel isn't one, returns None.
+    """
+    if not channel_id:
+        return None
+
+    ch = guild.get_channel_or_thread(channel_id)
+    if ch is None:
+        key = (guild.id, channel_id)
+        cached = _RESOLVED.get(key)
+        if cached is not None and time.monotonic() - cached[1] < CHANNEL_CACHE_TTL_SECONDS:
+            ch = cached[0]
+        else:
+            missing_at = _MISSING.get(key)
+            if missing_at is not None and time.monotonic() - missing_at < CHANNEL_NEGATIVE_TTL_SECONDS:
+                return None
+            task = _INFLIGHT.get(key)
+            if task is None:
+                task = _INFLIGHT[key] = asyncio.create_task(_fetch_channel(guild, channel_id))
+            ch = await asyncio.shield(task)
+
+    if ch is None or (kind is not None and not isinstance(ch, kind)):
+        return None
+    return ch
+
+
+def forget_channel(guild_id: int, channel_id: int) -> None:
+    """Forget anything cached for this channel (raw events only carry the IDs)."""
+    key = (guild_id, channel_id)
+    _RESOLVED.pop(key, None)
+    _MISSING.pop(key, None)
+
+
+def invalidate_channel(channel: discord.abc.GuildChannel | discord.Thread) -> None:
+    """on_guild_channel_create / update / delete: forget anything cached for this channel."""
+    forget_channel(channel.guild.id, channel.id)
@@ -7,7 +7,7 @@ from discord import app_commands
 
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS
-from ..db import connect
+from ..storage import get_store
 
 
 AFK_NOTIFY_COOLDOWN_SECONDS = 60  # silent cooldown per (pinger, afk_user)
@@ -21,10 +21,6 @@ def _now() -> dt.datetime:
     return dt.datetime.now(dt.timezone.utc)
 
 
-def _iso_now() -> str:
-    return _now().isoformat()
-
-
 def _rel_ts(d: dt.datetime | None) -> str:
     if not d:
         return "unknown"
@@ -41,23 +37,6 @@ def _abs_ts(d: dt.datetime | None) -> str:
     return f"<t:{int(d.timestamp())}:F>"
 
 
-async def _ensure_table() -> None:
-    async with connect() as db:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS afk_status (
-              guild_id INTEGER NOT NULL,
-              user_id INTEGER NOT NULL,
-              message TEXT,
-              until_ts INTEGER,
-              set_at TEXT NOT NULL,
-              PRIMARY KEY (guild_id, user_id)
-            )
-            """
-        )
-        await db.commit()
-
-
 def _parse_until(s: str) -> Optional[int]:
     """
     Accepts:
@@ -89,52 +68,25 @@ def _parse_until(s: str) -> Optional[int]:
 
 
 async def _set_afk(*, guild_id: int, user_id: int, message: Optional[str], until_ts: Optional[int]) -> None:
-    await _ensure_table()
-    async with connect() as db:
-        await db.execute(
-            """
-            INSERT INTO afk_status (guild_id, user_id, message, until_ts, set_at)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(guild_id, user_id) DO UPDATE SET
-              message=excluded.message,
-              until_ts=excluded.until_ts,
-              set_at=excluded.set_at
-            """,
-            (guild_id, user_id, message, until_ts, _iso_now()),
-        )
-        await db.commit()
+    await get_store().set_afk(guild_id=guild_id, user_id=user_id, message=message, until_ts=until_ts)
 
 
 async def _clear_afk(*, guild_id: int, user_id: int) -> bool:
-    await _ensure_table()
-    async with connect() as db:
-        cur = await db.execute(
-            "DELETE FROM afk_status WHERE guild_id = ? AND user_id = ?",
-            (guild_id, user_id),
-        )
-        await db.commit()
-        return (cur.rowcount or 0) > 0
+    return await get_store().clear_afk(guild_id=guild_id, user_id=user_id)
 
 
 async def _get_afk(*, guild_id: int, user_id: int) -> Optional[dict]:
-    await _ensure_table()
-    async with connect() as db:
-        cur = await db.execute(
-            "SELECT message, until_ts, set_at FROM afk_status WHERE guild_id = ? AND user_id = ?",
-            (guild_id, user_id),
-        )
-        row = await cur.fetchone()
-        if not row:
-            return None
-        message, until_ts, set_at = row
+    row = await get_store().get_afk(guild_id=guild_id, user_id=user_id)
+    if not row:
+        return None
+    set_at_dt = None
+    try:
+        set_at_dt = dt.datetime.fromisoformat(row["set_at"])
+        if set_at_dt.tzinfo is None:
+            set_at_dt = set_at_dt.replace(tzinfo=dt.timezone.utc)
+    except Exception:
         set_at_dt = None
-        try:
-            set_at_dt = dt.datetime.fromisoformat(set_at)
-            if set_at_dt.tzinfo is None:
-                set_at_dt = set_at_dt.replace(tzinfo=dt.timezone.utc)
-        except Exception:
-            set_at_dt = None
-        return {"message": message, "until_ts": until_ts, "set_at": set_at_dt}
+    return {"message": row["message"], "until_ts": row["until_ts"], "set_at": set_at_dt}
 
 
 async def _is_afk(*, guild_id: int, user_id: int) -> bool:
@@ -1,6 +1,7 @@
 import discord
 from discord import app_commands
 
+from ..channels import resolve_channel
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS, send_audit_embed
 
@@ -58,17 +59,7 @@ def _build_message_payload(*, body: str, role_ids: tuple[int, ...], as_embed: bo
 
 async def _resolve_announcement_channel(guild: discord.Guild, channel_key: str) -> discord.TextChannel | None:
     channel_id, _ = ANNOUNCEMENT_CHANNELS[channel_key]
-
-    channel = guild.get_channel(channel_id)
-    if isinstance(channel, discord.TextChannel):
-        return channel
-
-    try:
-        fetched = await guild.fetch_channel(channel_id)
-    except Exception:
-        return None
-
-    return fetched if isinstance(fetched, discord.TextChannel) else None
+    return await resolve_channel(guild, channel_id, kind=discord.TextChannel)
 
 
 class AnnouncementPreviewView(discord.ui.View):
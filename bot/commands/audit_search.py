@@ -0,0 +1,94 @@
+import datetime as dt
+
+import discord
+from discord import app_commands
+
+from ..audit_archive import search_audit_archive
+from ..config import ALLOWED_USER_IDS
+from .. import db
+from ..helpers import NO_PINGS, chunk_lines
+from ..views import SimplePagedView
+
+MAX_RESULTS = 200
+
+
+def _parse_day(value: str) -> dt.datetime:
+    return dt.datetime.combine(dt.date.fromisoformat(value.strip()), dt.time(), tzinfo=dt.timezone.utc)
+
+
+def _line(created_at: str, title: str, snippet: str) -> str:
+    ts = int(dt.datetime.fromisoformat(created_at).timestamp())
+    snippet = " ".join(snippet.split())
+    return f"<t:{ts}:f> **{title or '(untitled)'}**\n{snippet[:300]}"
+
+
+def setup(bot):
+    @bot.tree.command(
+        name="audit_search",
+        description="Staff-only: full-text search of the local audit log archive.",
+    )
+    @app_commands.describe(
+        query="Words to search for (all must match), e.g. a user ID, name or invite code.",
+        days="How many days back to search (default 30). Ignored if since is set.",
+        since="Optional start date, YYYY-MM-DD (UTC).",
+        until="Optional end date, YYYY-MM-DD (UTC, inclusive).",
+    )
+    async def audit_search(
+        interaction: discord.Interaction,
+        query: str,
+        days: app_commands.Range[int, 1, 3650] = 30,
+        since: str | None = None,
+        until: str | None = None,
+    ):
+        if interaction.user.id not in ALLOWED_USER_IDS:
+            await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+            return
+
+        guild = interaction.guild
+        if guild is None:
+            await interaction.response.send_message("Run this in a server, not DMs.", ephemeral=True)
+            return
+
+        if not db.AUDIT_ARCHIVE_ENABLED:
+            await interaction.response.send_message(
+                "The audit archive is unavailable (this SQLite build has no FTS5).",
+                ephemeral=True,
+            )
+            return
+
+        now = dt.datetime.now(dt.timezone.utc)
+        try:
+            start = _parse_day(since) if since else now - dt.timedelta(days=days)
+            end = _parse_day(until) + dt.timedelta(days=1) if until else now + dt.timedelta(minutes=1)
+        except ValueError:
+            await interaction.response.send_message("Dates must look like `2025-01-31`.", ephemeral=True)
+            return
+
+        rows = await search_audit_archive(
+            guild.id,
+            query,
+            since_iso=start.isoformat(),
+            until_iso=end.isoformat(),
+            limit=MAX_RESULTS,
+        )
+
+        lines = [_line(created_at, title, snippet) for created_at, title, snippet in rows]
+        pages = chunk_lines(lines or ["(no matches)"])
+
+        more = f" (showing the newest {MAX_RESULTS})" if len(rows) >= MAX_RESULTS else ""
+        view = SimplePagedView(
+            author_id=interaction.user.id,
+            pages=pages,
+            title="Audit search",
+            description=(
+                f"Query: `{query[:100]}`\n"
+                f"Range: <t:{int(start.timestamp())}:d> → <t:{int(min(end, now).timestamp())}:d>\n"
+                f"Matches: **{len(rows)}**{more}"
+            ),
+        )
+        await interaction.response.send_message(
+            embed=view.build_embed(),
+            view=view,
+            ephemeral=True,
+            allowed_mentions=NO_PINGS,
+        )
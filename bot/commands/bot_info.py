@@ -5,6 +5,7 @@ import discord
 from ..config import (
     ALLOWED_USER_IDS,
     AUDIT_LOG_CHANNEL_ID,
+    AUDIT_WEBHOOK_URL,
     TICKET_CHANNEL_ID,
     DEFAULT_PURGE_DAYS,
     CONFIRM_CODE_TTL_SECONDS,
@@ -16,7 +17,11 @@ from ..config import (
     PURGE_DM_ENABLED,
     PURGE_DM_TEMPLATE,
 )
-from ..helpers import NO_PINGS
+from .. import role_rules
+from .invite import INVITE_POOL_MIN_REMAINING_SECONDS
+from ..audit_webhook import WEBHOOK_STATS
+from ..helpers import AUDIT_SEND_COUNTS, NO_PINGS
+from ..join_pipeline import JOIN_STAGE_SAMPLES, join_stage_stats
 
 
 def _fmt_uptime(started_at: dt.datetime | None) -> str:
@@ -104,7 +109,10 @@ def setup(bot):
                 "- Standard purge targets require **Member** and no extra roles beyond Member/Redditor\n"
                 "- `expired_only` targets members with **Expired** unless they also have the exemption role\n"
                 "- `/move_server` uses the configured server roles (**Omega**, **Alpha**, **Delta**)\n"
-                "- `/server_status` can open/close move destinations with an optional staff note"
+                "- `/server_status` can open/close move destinations with an optional staff note\n"
+                f"- Role rules: **{len(role_rules.active_rules())}** (SS VOD/Expired sync, `ROLE_RULES_JSON`, `role_rules` table), "
+                f"**{role_rules.pending_syncs()}** member(s) pending, **{role_rules.SYNC_STATS['reconciled']}** reconciled, "
+                f"**{role_rules.SYNC_STATS['sweep_fixed']}** fixed by the periodic sweep"
             ),
             inline=False,
         )
@@ -115,7 +123,8 @@ def setup(bot):
                 f"- Member role ID: `{VISITOR_ROLE_ID}`\n"
                 f"- Redditor role ID: `{REDDITOR_ROLE_ID}`\n"
                 f"- Ticket channel: <#{TICKET_CHANNEL_ID}>\n"
-                f"- Audit log: " + (f"<#{AUDIT_LOG_CHANNEL_ID}>" if AUDIT_LOG_CHANNEL_ID else "**disabled**")
+                f"- Audit log: "
+                + ("**webhook**" if AUDIT_WEBHOOK_URL else f"<#{AUDIT_LOG_CHANNEL_ID}>" if AUDIT_LOG_CHANNEL_ID else "**disabled**")
             ),
             inline=False,
         )
@@ -132,10 +141,10 @@ def setup(bot):
             name="Staff tools",
             value=(
                 "Slash commands:\n"
-                "- `/announce`, `/bot_info`, `/check`, `/check_panel`\n"
+                "- `/announce`, `/audit_search`, `/bot_info`, `/check`, `/check_panel`, `/db_stats`\n"
                 "- `/give_creds`, `/extend_creds`, `/test_purge_dm`\n"
                 "- `/list_only_allowed_roles`, `/purge_eligible`, `/remove_all_pending`\n"
-                "- `/move_panel`, `/silent_ping`, `/whois`, `/afk_clear`\n"
+                "- `/move_panel`, `/silent_ping`, `/whois`, `/afk_clear`, `/invite_stats`, `/join_stats`\n"
                 "- `/server_status set`, `/server_status clear`, `/server_status list`\n\n"
                 "Limited staff path:\n"
                 "- `/invite user:<member>` allows invite creation on behalf of someone else\n\n"
@@ -151,7 +160,8 @@ def setup(bot):
                 "- `/afk` to set AFK with optional ETA/note\n"
                 "- `/checkme` to self-check purge risk\n"
                 "- `/discord_info` to generate Discord signup details\n"
-                "- `/invite` to create or reuse your own 24h landing-channel invite\n"
+                f"- `/invite` to create or reuse your own landing-channel invite "
+                f"(valid at least {INVITE_POOL_MIN_REMAINING_SECONDS // 3600}h)\n"
                 "- `/move_server` to request a move between open destinations\n"
                 "- `/serverinfo` for server stats (ephemeral by default)\n"
                 "- Context menu: **Whois** for staff"
@@ -181,6 +191,30 @@ def setup(bot):
             inline=False,
         )
 
+        stage_lines = [
+            f"- {e['name']}: p50 **{e['p50_ms']:.0f}ms** · p95 **{e['p95_ms']:.0f}ms** · max **{e['max_ms']:.0f}ms**"
+            for e in join_stage_stats()
+        ]
+        embed.add_field(
+            name=f"Join pipeline (join → stage done, last {JOIN_STAGE_SAMPLES} joins)",
+            value="\n".join(stage_lines) or "(no joins since startup)",
+            inline=False,
+        )
+
+        embed.add_field(
+            name="Audit delivery",
+            value=(
+                f"- Embeds queued: **{AUDIT_SEND_COUNTS['embeds']}**\n"
+                f"- Messages sent: **{AUDIT_SEND_COUNTS['messages']}**"
+                + (
+                    f"\n- Webhook: delivered **{WEBHOOK_STATS['delivered']}** · retried **{WEBHOOK_STATS['retried']}** · "
+                    f"spilled **{WEBHOOK_STATS['spilled']}** · dropped **{WEBHOOK_STATS['dropped']}**"
+                    if AUDIT_WEBHOOK_URL else ""
+                )
+            ),
+            inline=False,
+        )
+
         # Send once, then edit to include interaction RTT.
         await interaction.response.send_message(embed=embed, ephemeral=True, allowed_mentions=NO_PINGS)
 
@@ -0,0 +1,77 @@
+import datetime as dt
+
+import discord
+from discord import app_commands
+
+from ..config import ALLOWED_USER_IDS, SLOW_QUERY_MS
+from ..helpers import NO_PINGS
+from ..db import HISTOGRAM_BOUNDS_MS, QUERY_WINDOW_SECONDS, SLOW_QUERIES, query_stats
+from ..invite_tracking import BASELINE_WRITE_COUNTS
+
+
+def _short_sql(fp: str, limit: int = 120) -> str:
+    fp = fp.replace("`", "'")
+    return fp if len(fp) <= limit else fp[: limit - 1] + "…"
+
+
+def _histogram_text(hist: list[int]) -> str:
+    labels = [f"≤{b}" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+    return " ".join(f"{label}:{n}" for label, n in zip(labels, hist) if n)
+
+
+def setup(bot):
+    @bot.tree.command(
+        name="db_stats",
+        description="Staff-only: slowest DB statements (last hour) and recent slow queries.",
+    )
+    @app_commands.describe(top="How many statements to show (default 5, max 10).")
+    async def db_stats(interaction: discord.Interaction, top: app_commands.Range[int, 1, 10] = 5):
+        if interaction.user.id not in ALLOWED_USER_IDS:
+            await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+            return
+
+        stats = query_stats(limit=top)
+
+        embed = discord.Embed(
+            title="DB stats",
+            description=(
+                f"Window: last **{QUERY_WINDOW_SECONDS // 60} min**, ranked by total time.\n"
+                f"Slow threshold: **{SLOW_QUERY_MS}ms**"
+            ),
+        )
+
+        if not stats:
+            embed.add_field(name="Statements", value="(no queries recorded yet)", inline=False)
+
+        for i, e in enumerate(stats, start=1):
+            value = (
+                f"`{_short_sql(e['fingerprint'])}`\n"
+                f"calls **{e['count']}** · total **{e['total_ms']:.0f}ms** · "
+                f"p50 **{e['p50_ms']:.1f}ms** · p95 **{e['p95_ms']:.1f}ms** · max **{e['max_ms']:.0f}ms**\n"
+                f"ms buckets: {_histogram_text(e['histogram'])}"
+            )
+            embed.add_field(name=f"#{i}", value=value[:1024], inline=False)
+
+        recent = list(SLOW_QUERIES)[-5:]
+        if recent:
+            lines = []
+            for q in reversed(recent):
+                at = dt.datetime.fromtimestamp(q["at"], tz=dt.timezone.utc)
+                lines.append(
+                    f"<t:{int(at.timestamp())}:R> **{q['ms']:.0f}ms** at `{q['call_site']}`\n"
+                    f"`{_short_sql(q['fingerprint'], 80)}`"
+                )
+            embed.add_field(name="Recent slow queries", value="\n".join(lines)[:1024], inline=False)
+        else:
+            embed.add_field(name="Recent slow queries", value="(none)", inline=False)
+
+        embed.add_field(
+            name="Invite baseline writes",
+            value=(
+                f"- Rows written: **{BASELINE_WRITE_COUNTS['written']}**\n"
+                f"- Unchanged rows skipped: **{BASELINE_WRITE_COUNTS['skipped']}**"
+            ),
+            inline=False,
+        )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True, allowed_mentions=NO_PINGS)
@@ -3,6 +3,7 @@ import datetime as dt
 import discord
 from discord import app_commands
 
+from ..channels import resolve_channel
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS
 
@@ -47,14 +48,7 @@ def parse_expiry(expiry_str: str) -> dt.date | None:
 
 
 async def _get_fallback_channel(guild: discord.Guild) -> discord.TextChannel | None:
-    ch = guild.get_channel(CREDS_FALLBACK_CHANNEL_ID)
-    if isinstance(ch, discord.TextChannel):
-        return ch
-    try:
-        fetched = await guild.fetch_channel(CREDS_FALLBACK_CHANNEL_ID)
-        return fetched if isinstance(fetched, discord.TextChannel) else None
-    except Exception:
-        return None
+    return await resolve_channel(guild, CREDS_FALLBACK_CHANNEL_ID, kind=discord.TextChannel)
 
 
 def _build_extend_dm(expiry_iso: str) -> str:
@@ -1,12 +1,20 @@
+import asyncio
 import datetime as dt
 
 import discord
 from discord import app_commands
 
+from ..channels import resolve_channel
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS, send_audit_embed
-from ..invite_tracking import snapshot_invites_to_db
-from ..db import connect
+from ..invite_tracking import (
+    get_owner_invite,
+    invite_expires_at,
+    remember_invite_owner,
+    remember_owner_invite,
+    stored_invite_owner,
+)
+from ..storage import get_store
 
 
 # Always create invites to this "landing" channel
@@ -15,103 +23,163 @@ INVITE_TARGET_CHANNEL_ID = 1457896130653458542
 DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60  # 24h
 DEFAULT_MAX_USES = 0  # 0 = unlimited uses
 
+# Pre-minted pool of unclaimed invites so /invite doesn't create one in the user-visible path
+INVITE_POOL_SIZE = 3
+# Only invites with at least this much of their max_age left are handed out. Older unclaimed ones
+# are left to expire on their own (no delete calls), and the pool is topped up with fresh ones.
+INVITE_POOL_MIN_REMAINING_SECONDS = 12 * 60 * 60
+INVITE_POOL_CHECK_SECONDS = 5 * 60
+
+# guild_id -> unclaimed pool invites, oldest first
+_INVITE_POOLS: dict[int, list[discord.Invite]] = {}
+# One refill at a time per guild, so the loop and claim-triggered refills can't overfill the pool
+_POOL_LOCKS: dict[int, asyncio.Lock] = {}
+# Guilds whose pool was rebuilt from guild.invites() after a restart
+_POOL_RECOVERED: set[int] = set()
+_POOL_REFILL_TASKS: dict[int, asyncio.Task] = {}
+_POOL_TASK: asyncio.Task | None = None
+
 
 def _now() -> dt.datetime:
     return dt.datetime.now(dt.timezone.utc)
 
 
-def _now_iso() -> str:
-    return _now().isoformat()
+async def _get_target_channel(guild: discord.Guild) -> discord.abc.GuildChannel | None:
+    return await resolve_channel(guild, INVITE_TARGET_CHANNEL_ID, kind=discord.abc.GuildChannel)
 
 
-async def _get_target_channel(guild: discord.Guild) -> discord.abc.GuildChannel | None:
-    ch = guild.get_channel(INVITE_TARGET_CHANNEL_ID)
-    if ch is None:
-        try:
-            ch = await guild.fetch_channel(INVITE_TARGET_CHANNEL_ID)
-        except Exception:
-            return None
-    if isinstance(ch, discord.abc.GuildChannel):
-        return ch
-    return None
+def _pool_invite_remaining(inv: discord.Invite) -> float:
+    expires_at = invite_expires_at(inv)
+    if expires_at is None:
+        return float(DEFAULT_MAX_AGE_SECONDS)
+    return (expires_at - _now()).total_seconds()
 
 
-def _invite_is_active(inv: discord.Invite) -> bool:
-    # Deleted/revoked invites won't appear in guild.invites(), so this helper
-    # only needs to validate age/uses for currently existing invites.
-    if inv.max_uses and (inv.uses or 0) >= inv.max_uses:
-        return False
+def _pool_invite_claimable(inv: discord.Invite) -> bool:
+    return _pool_invite_remaining(inv) >= INVITE_POOL_MIN_REMAINING_SECONDS
 
-    if inv.max_age and inv.created_at:
-        created = inv.created_at
-        if created.tzinfo is None:
-            created = created.replace(tzinfo=dt.timezone.utc)
-        expires_at = created + dt.timedelta(seconds=inv.max_age)
-        if _now() >= expires_at:
-            return False
 
-    return True
+async def _recover_invite_pool(guild: discord.Guild, target: discord.abc.GuildChannel) -> None:
+    """
+    After a restart, adopt the unclaimed pool invites minted before it instead of orphaning them:
+    the bot's own unused invites to the target channel that no /invite owner was recorded for.
+    """
+    invites = await guild.invites()
+    pool = _INVITE_POOLS.setdefault(guild.id, [])
+    known = {inv.code for inv in pool}
+    for inv in sorted(invites, key=lambda i: i.created_at or _now()):
+        if (
+            inv.code in known
+            or inv.inviter is None
+            or inv.inviter.id != guild.me.id
+            or getattr(inv.channel, "id", None) != target.id
+            or inv.max_age != DEFAULT_MAX_AGE_SECONDS
+            or inv.max_uses != DEFAULT_MAX_USES
+            or inv.uses
+        ):
+            continue
+        if await stored_invite_owner(guild.id, inv.code) not in (None, guild.me.id):
+            continue
+        pool.append(inv)
+    print(f"[invite-pool] Recovered {len(pool)} unclaimed invite(s) in guild {guild.id}")
 
 
-def _invite_expires_at(inv: discord.Invite) -> dt.datetime | None:
-    if not inv.max_age or not inv.created_at:
-        return None
-    created = inv.created_at
-    if created.tzinfo is None:
-        created = created.replace(tzinfo=dt.timezone.utc)
-    return created + dt.timedelta(seconds=inv.max_age)
+async def _refill_invite_pool(guild: discord.Guild) -> None:
+    lock = _POOL_LOCKS.setdefault(guild.id, asyncio.Lock())
+    async with lock:
+        target = await _get_target_channel(guild)
+        if target is None or guild.me is None or not target.permissions_for(guild.me).create_instant_invite:
+            return
+
+        if guild.id not in _POOL_RECOVERED:
+            try:
+                await _recover_invite_pool(guild, target)
+                _POOL_RECOVERED.add(guild.id)
+            except Exception as e:
+                print(f"[invite-pool] Recovery failed in guild {guild.id}: {type(e).__name__}: {e}")
+                return
+
+        pool = _INVITE_POOLS.setdefault(guild.id, [])
+        # Expired invites are gone on Discord's side already
+        pool[:] = [inv for inv in pool if _pool_invite_remaining(inv) > 0]
+        while sum(1 for inv in pool if _pool_invite_claimable(inv)) < INVITE_POOL_SIZE:
+            try:
+                inv = await target.create_invite(
+                    max_age=DEFAULT_MAX_AGE_SECONDS,
+                    max_uses=DEFAULT_MAX_USES,
+                    unique=True,
+                    reason="Pre-minted for /invite (unclaimed)",
+                )
+            except Exception as e:
+                print(f"[invite-pool] Refill failed in guild {guild.id}: {type(e).__name__}: {e}")
+                return
+            pool.append(inv)
+
+
+def _schedule_pool_refill(guild: discord.Guild) -> None:
+    task = _POOL_REFILL_TASKS.get(guild.id)
+    if task is None or task.done():
+        _POOL_REFILL_TASKS[guild.id] = asyncio.create_task(_refill_invite_pool(guild))
+
+
+def _claim_pooled_invite(guild: discord.Guild) -> discord.Invite | None:
+    # Oldest claimable first, so the fresher ones stay in the pool longer
+    pool = _INVITE_POOLS.get(guild.id, [])
+    claimed = next((inv for inv in pool if _pool_invite_claimable(inv)), None)
+    if claimed is not None:
+        pool.remove(claimed)
+    _schedule_pool_refill(guild)
+    return claimed
+
 
+def forget_pooled_invite(invite: discord.Invite) -> None:
+    """on_invite_delete: drop a pool invite that was revoked outside the bot."""
+    guild_id = getattr(invite.guild, "id", None)
+    pool = _INVITE_POOLS.get(guild_id) if guild_id is not None else None
+    if pool:
+        pool[:] = [inv for inv in pool if inv.code != invite.code]
 
-async def _find_existing_active_invite(guild: discord.Guild, owner_id: int) -> discord.Invite | None:
+
+async def _invite_pool_loop(bot) -> None:
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        for g in list(bot.guilds):
+            if g.get_channel(INVITE_TARGET_CHANNEL_ID) is None:
+                continue
+            try:
+                await _refill_invite_pool(g)
+            except Exception as e:
+                print(f"[invite-pool] Top-up failed in guild {g.id}: {type(e).__name__}: {e}")
+        await asyncio.sleep(INVITE_POOL_CHECK_SECONDS)
+
+
+def start_invite_pool_task(bot) -> None:
+    global _POOL_TASK
+    if _POOL_TASK is not None and not _POOL_TASK.done():
+        return
+    _POOL_TASK = asyncio.create_task(_invite_pool_loop(bot))
+
+
+async def _find_existing_active_invite(guild: discord.Guild, owner_id: int) -> dict | None:
     """
-    Return the owner's current active invite if one exists.
-    We treat inviter_id in invite_baseline as the effective owner of the invite.
+    Return the owner's current active invite as {"code", "url", "expires_at"}, if one exists.
+    Served from the in-memory owner index; Discord is only asked on a miss or after expiry.
     """
     try:
-        invites = await guild.invites()
+        return await get_owner_invite(guild, owner_id)
     except Exception:
         return None
 
-    live_by_code = {inv.code: inv for inv in invites}
-
-    async with connect() as db:
-        rows = await db.execute_fetchall(
-            """
-            SELECT code, created_at, updated_at
-            FROM invite_baseline
-            WHERE guild_id = ? AND inviter_id = ?
-            ORDER BY updated_at DESC, created_at DESC
-            """,
-            (guild.id, owner_id),
-        )
-
-    for code, _, _ in rows:
-        inv = live_by_code.get(code)
-        if inv is None:
-            continue
-        if not _invite_is_active(inv):
-            continue
-        return inv
-
-    return None
-
 
 async def _store_invite_owner(*, guild_id: int, code: str, owner_id: int, created_at: str | None, uses: int) -> None:
-    now = _now_iso()
-    async with connect() as db:
-        await db.execute(
-            """
-            INSERT INTO invite_baseline (guild_id, code, uses, inviter_id, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(guild_id, code) DO UPDATE SET
-              uses=excluded.uses,
-              inviter_id=excluded.inviter_id,
-              created_at=COALESCE(invite_baseline.created_at, excluded.created_at),
-              updated_at=excluded.updated_at
-            """,
-            (guild_id, code, uses, owner_id, created_at, now),
-        )
-        await db.commit()
+    await get_store().set_invite_owner(
+        guild_id=guild_id,
+        code=code,
+        owner_id=owner_id,
+        created_at=created_at,
+        uses=uses,
+    )
+    remember_invite_owner(guild_id=guild_id, code=code, owner_id=owner_id, uses=uses)
 
 
 async def _maybe_dm_on_behalf_recipient(
@@ -157,7 +225,10 @@ async def _maybe_dm_on_behalf_recipient(
 def setup(bot):
     @bot.tree.command(
         name="invite",
-        description="Create a 24h invite (unlimited uses) to the public landing channel.",
+        description=(
+            f"Get an invite (unlimited uses, valid at least {INVITE_POOL_MIN_REMAINING_SECONDS // 3600}h) "
+            "to the public landing channel."
+        ),
     )
     @app_commands.describe(
         user="Optional: create the invite on behalf of another user (staff only).",
@@ -200,24 +271,19 @@ def setup(bot):
 
         await interaction.response.defer(ephemeral=True)
 
-        # Refresh baseline before checking for an active invite
-        try:
-            await snapshot_invites_to_db(guild)
-        except Exception:
-            pass
-
+        # The baseline is kept current by on_invite_create / on_invite_delete, so no snapshot is needed here
         existing_inv = await _find_existing_active_invite(guild, owner.id)
         dm_status = None
         reused_existing = existing_inv is not None
 
         if existing_inv is not None:
-            expires_at = _invite_expires_at(existing_inv)
+            expires_at = existing_inv["expires_at"]
 
             if owner.id != interaction.user.id:
                 dm_status = await _maybe_dm_on_behalf_recipient(
                     recipient=owner,
                     requester=interaction.user,
-                    invite_url=existing_inv.url,
+                    invite_url=existing_inv["url"],
                     expires_at=expires_at,
                     reused_existing=True,
                 )
@@ -227,26 +293,26 @@ def setup(bot):
                     msg = (
                         "You already have an active invite. Only one active invite is allowed at a time.\n\n"
                         f"Your current invite (goes to <#{INVITE_TARGET_CHANNEL_ID}>, expires <t:{int(expires_at.timestamp())}:R>):\n"
-                        f"{existing_inv.url}"
+                        f"{existing_inv['url']}"
                     )
                 else:
                     msg = (
                         "You already have an active invite. Only one active invite is allowed at a time.\n\n"
                         f"Your current invite (goes to <#{INVITE_TARGET_CHANNEL_ID}>):\n"
-                        f"{existing_inv.url}"
+                        f"{existing_inv['url']}"
                     )
             else:
                 if expires_at is not None:
                     msg = (
                         f"{owner.mention} already has an active invite, so I didn’t create a new one.\n\n"
                         f"Current invite (goes to <#{INVITE_TARGET_CHANNEL_ID}>, expires <t:{int(expires_at.timestamp())}:R>):\n"
-                        f"{existing_inv.url}"
+                        f"{existing_inv['url']}"
                     )
                 else:
                     msg = (
                         f"{owner.mention} already has an active invite, so I didn’t create a new one.\n\n"
                         f"Current invite (goes to <#{INVITE_TARGET_CHANNEL_ID}>):\n"
-                        f"{existing_inv.url}"
+                        f"{existing_inv['url']}"
                     )
 
                 if dm_status == "sent":
@@ -264,7 +330,7 @@ def setup(bot):
                 desc = (
                     f"Owner: {owner} ({owner.id})\n"
                     f"Target channel: <#{INVITE_TARGET_CHANNEL_ID}> ({INVITE_TARGET_CHANNEL_ID})\n"
-                    f"Existing code reused: `{existing_inv.code}`\n"
+                    f"Existing code reused: `{existing_inv['code']}`\n"
                     f"Expires: {f'<t:{int(expires_at.timestamp())}:R>' if expires_at else 'no expiry'}"
                 )
             else:
@@ -272,7 +338,7 @@ def setup(bot):
                     f"Requested by: {interaction.user} ({interaction.user.id})\n"
                     f"Owner: {owner} ({owner.id})\n"
                     f"Target channel: <#{INVITE_TARGET_CHANNEL_ID}> ({INVITE_TARGET_CHANNEL_ID})\n"
-                    f"Existing code reused: `{existing_inv.code}`\n"
+                    f"Existing code reused: `{existing_inv['code']}`\n"
                     f"Expires: {f'<t:{int(expires_at.timestamp())}:R>' if expires_at else 'no expiry'}\n"
                     f"Recipient DM: {dm_status or 'not attempted'}"
                 )
@@ -284,7 +350,9 @@ def setup(bot):
             await send_audit_embed(guild, embed)
             return
 
-        # No active invite found; create a new one
+        # No active invite found; claim a pre-minted one, or create a new one if the pool is empty
+        inv = _claim_pooled_invite(guild)
+        pooled = inv is not None
         try:
             reason = (
                 f"Invite created via /invite by {interaction.user} ({interaction.user.id})"
@@ -292,12 +360,13 @@ def setup(bot):
                 else f"Invite created via /invite by {interaction.user} ({interaction.user.id}) on behalf of {owner} ({owner.id})"
             )
 
-            inv = await target.create_invite(
-                max_age=DEFAULT_MAX_AGE_SECONDS,
-                max_uses=DEFAULT_MAX_USES,
-                unique=True,
-                reason=reason,
-            )
+            if inv is None:
+                inv = await target.create_invite(
+                    max_age=DEFAULT_MAX_AGE_SECONDS,
+                    max_uses=DEFAULT_MAX_USES,
+                    unique=True,
+                    reason=reason,
+                )
         except discord.Forbidden:
             await interaction.followup.send("Invite creation failed (missing permissions).", ephemeral=True)
             return
@@ -305,11 +374,6 @@ def setup(bot):
             await interaction.followup.send("Invite creation failed (Discord API error). Try again.", ephemeral=True)
             return
 
-        try:
-            await snapshot_invites_to_db(guild)
-        except Exception:
-            pass
-
         try:
             created_at = inv.created_at.isoformat() if inv.created_at else None
             uses = inv.uses or 0
@@ -322,8 +386,9 @@ def setup(bot):
             )
         except Exception:
             pass
+        remember_owner_invite(guild_id=guild.id, owner_id=owner.id, invite=inv)
 
-        expires_at = _now() + dt.timedelta(seconds=DEFAULT_MAX_AGE_SECONDS)
+        expires_at = invite_expires_at(inv) or _now() + dt.timedelta(seconds=DEFAULT_MAX_AGE_SECONDS)
 
         if owner.id != interaction.user.id:
             dm_status = await _maybe_dm_on_behalf_recipient(
@@ -363,7 +428,7 @@ def setup(bot):
             desc = (
                 f"Owner: {owner} ({owner.id})\n"
                 f"Target channel: <#{INVITE_TARGET_CHANNEL_ID}> ({INVITE_TARGET_CHANNEL_ID})\n"
-                f"Code: `{inv.code}`\n"
+                f"Code: `{inv.code}`{' (pre-minted)' if pooled else ''}\n"
                 f"Max age: {DEFAULT_MAX_AGE_SECONDS}s\n"
                 f"Max uses: unlimited\n"
                 f"Expires: <t:{int(expires_at.timestamp())}:R>"
@@ -373,7 +438,7 @@ def setup(bot):
                 f"Requested by: {interaction.user} ({interaction.user.id})\n"
                 f"Owner: {owner} ({owner.id})\n"
                 f"Target channel: <#{INVITE_TARGET_CHANNEL_ID}> ({INVITE_TARGET_CHANNEL_ID})\n"
-                f"Code: `{inv.code}`\n"
+                f"Code: `{inv.code}`{' (pre-minted)' if pooled else ''}\n"
                 f"Max age: {DEFAULT_MAX_AGE_SECONDS}s\n"
                 f"Max uses: unlimited\n"
                 f"Expires: <t:{int(expires_at.timestamp())}:R>\n"
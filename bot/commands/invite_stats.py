@@ -0,0 +1,66 @@
+import datetime as dt
+from typing import Literal
+
+import discord
+from discord import app_commands
+
+from ..config import ALLOWED_USER_IDS
+from ..helpers import NO_PINGS, chunk_lines
+from ..storage import get_store
+from ..views import SimplePagedView
+
+
+def _since_day(days: int) -> str:
+    # Today counts as day 1
+    return (dt.datetime.now(dt.timezone.utc).date() - dt.timedelta(days=days - 1)).isoformat()
+
+
+def _line(rank: int, key: int | str, joins: int, by: str) -> str:
+    if by == "code":
+        label = f"`{key}`" if key else "unknown invite"
+    else:
+        label = f"<@{key}> (`{key}`)" if key else "unknown inviter"
+    return f"{rank}. {label} — **{joins}** join(s)"
+
+
+def setup(bot):
+    @bot.tree.command(
+        name="invite_stats",
+        description="Staff-only: join leaderboard by inviter or invite code.",
+    )
+    @app_commands.describe(
+        days="How many days back to count, including today (default 30).",
+        by="Group by inviter (default) or invite code.",
+    )
+    async def invite_stats(
+        interaction: discord.Interaction,
+        days: app_commands.Range[int, 1, 3650] = 30,
+        by: Literal["inviter", "code"] = "inviter",
+    ):
+        if interaction.user.id not in ALLOWED_USER_IDS:
+            await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+            return
+
+        guild = interaction.guild
+        if guild is None:
+            await interaction.response.send_message("Run this in a server, not DMs.", ephemeral=True)
+            return
+
+        rows = await get_store().invite_join_counts(guild_id=guild.id, since_day=_since_day(days), by=by)
+        total = sum(joins for _, joins in rows)
+
+        lines = [_line(i, key, joins, by) for i, (key, joins) in enumerate(rows, start=1)]
+        pages = chunk_lines(lines or ["(no joins recorded)"])
+
+        view = SimplePagedView(
+            author_id=interaction.user.id,
+            pages=pages,
+            title="Invite stats",
+            description=f"Last **{days}** day(s), by **{by}**. Total joins: **{total}**.",
+        )
+        await interaction.response.send_message(
+            embed=view.build_embed(),
+            view=view,
+            ephemeral=True,
+            allowed_mentions=NO_PINGS,
+        )
@@ -0,0 +1,136 @@
+import datetime as dt
+from typing import Literal
+
+import discord
+from discord import app_commands
+
+from ..config import ALLOWED_USER_IDS
+from ..helpers import NO_PINGS, chunk_lines
+from ..member_stats import hour_key
+from ..storage import MEMBER_HOURLY_COUNTS, TENURE_BUCKETS, get_store
+from ..views import SimplePagedView
+
+# Hourly charts beyond this many days are too long to page through
+MAX_HOURLY_DAYS = 14
+BAR_WIDTH = 10
+
+TENURE_LABELS = {
+    "1h": "<1h",
+    "1d": "<1d",
+    "7d": "<7d",
+    "30d": "<30d",
+    "365d": "<1y",
+    "more": "1y+",
+    "unknown": "unknown",
+}
+
+
+def _periods(start: dt.datetime, end: dt.datetime, by: str) -> list[str]:
+    """Every period key from start (midnight UTC) to end, so quiet periods still show as empty rows."""
+    step = dt.timedelta(hours=1) if by == "hour" else dt.timedelta(days=1)
+    keys = []
+    cur = start
+    while cur <= end:
+        keys.append(hour_key(cur) if by == "hour" else cur.date().isoformat())
+        cur += step
+    return keys
+
+
+def _fold(rows: list[dict], by: str) -> dict[str, dict[str, int]]:
+    out: dict[str, dict[str, int]] = {}
+    for row in rows:
+        key = row["hour"] if by == "hour" else row["hour"][:10]
+        totals = out.get(key)
+        if totals is None:
+            totals = out[key] = dict.fromkeys(MEMBER_HOURLY_COUNTS, 0)
+        for c in MEMBER_HOURLY_COUNTS:
+            totals[c] += row[c]
+    return out
+
+
+def _bar(n: int, peak: int) -> str:
+    if not n:
+        return ""
+    return "█" * max(1, round(n * BAR_WIDTH / peak))
+
+
+def _chart_line(key: str, counts: dict[str, int] | None, peak: int, by: str) -> str:
+    joins = counts["joins"] if counts else 0
+    leaves = counts["leaves"] if counts else 0
+    label = key[5:].replace("T", " ") + "h" if by == "hour" else key
+    return f"{label} +{joins:<4} {_bar(joins, peak):<{BAR_WIDTH}} -{leaves:<4} {_bar(leaves, peak)}".rstrip()
+
+
+def setup(bot):
+    @bot.tree.command(
+        name="join_stats",
+        description="Staff-only: joins, leaves and churn over time.",
+    )
+    @app_commands.describe(
+        days="How many days back to chart, including today (default 7).",
+        by=f"Chart per hour or per day (default: hourly up to 2 days, daily beyond; hourly max {MAX_HOURLY_DAYS} days).",
+    )
+    async def join_stats(
+        interaction: discord.Interaction,
+        days: app_commands.Range[int, 1, 3650] = 7,
+        by: Literal["auto", "hour", "day"] = "auto",
+    ):
+        if interaction.user.id not in ALLOWED_USER_IDS:
+            await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+            return
+
+        guild = interaction.guild
+        if guild is None:
+            await interaction.response.send_message("Run this in a server, not DMs.", ephemeral=True)
+            return
+
+        if by == "auto":
+            by = "hour" if days <= 2 else "day"
+        if by == "hour" and days > MAX_HOURLY_DAYS:
+            await interaction.response.send_message(
+                f"Hourly charts cover at most {MAX_HOURLY_DAYS} days; use `by:day` for longer ranges.",
+                ephemeral=True,
+            )
+            return
+
+        now = dt.datetime.now(dt.timezone.utc)
+        # Today counts as day 1
+        start = dt.datetime.combine(now.date() - dt.timedelta(days=days - 1), dt.time(), tzinfo=dt.timezone.utc)
+        rows = await get_store().member_hourly_counts(guild_id=guild.id, since_hour=hour_key(start))
+
+        periods = _fold(rows, by)
+        totals = dict.fromkeys(MEMBER_HOURLY_COUNTS, 0)
+        for counts in periods.values():
+            for c in MEMBER_HOURLY_COUNTS:
+                totals[c] += counts[c]
+        peak = max((max(c["joins"], c["leaves"]) for c in periods.values()), default=0) or 1
+
+        # Newest first, like the other staff listings
+        keys = _periods(start, now, by)
+        lines = [_chart_line(k, periods.get(k), peak, by) for k in reversed(keys)]
+        pages = [f"```\n{page}\n```" for page in chunk_lines(lines, max_chars=1000)]
+
+        joins, leaves = totals["joins"], totals["leaves"]
+        new_pct = f" ({totals['new_account_joins'] * 100 / joins:.0f}%)" if joins else ""
+        tenure = " · ".join(
+            f"{TENURE_LABELS[name]}: {totals[f'tenure_{name}']}"
+            for name, _ in TENURE_BUCKETS
+            if totals[f"tenure_{name}"]
+        )
+        view = SimplePagedView(
+            author_id=interaction.user.id,
+            pages=pages,
+            title="Join stats",
+            description=(
+                f"Last **{days}** day(s), per **{by}**.\n"
+                f"Joins: **{joins}** (new accounts: **{totals['new_account_joins']}**{new_pct})\n"
+                f"Leaves: **{leaves}** · Net: **{joins - leaves:+d}**\n"
+                f"Time in server at leave: {tenure or '(no leaves)'}"
+            ),
+        )
+        await interaction.response.send_message(
+            embed=view.build_embed(),
+            view=view,
+            ephemeral=True,
+            allowed_mentions=NO_PINGS,
+        )
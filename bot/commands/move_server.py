@@ -4,6 +4,7 @@ import secrets
 import discord
 from discord import app_commands
 
+from ..channels import resolve_channel
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS, send_audit_embed
 
@@ -77,25 +78,11 @@ async def _filter_open_destinations(guild_id: int, destination_role_ids: list[in
 
 
 async def _fetch_requests_channel(guild: discord.Guild) -> discord.TextChannel | None:
-    ch = guild.get_channel(MOVE_REQUESTS_CHANNEL_ID)
-    if isinstance(ch, discord.TextChannel):
-        return ch
-    try:
-        fetched = await guild.fetch_channel(MOVE_REQUESTS_CHANNEL_ID)
-        return fetched if isinstance(fetched, discord.TextChannel) else None
-    except Exception:
-        return None
+    return await resolve_channel(guild, MOVE_REQUESTS_CHANNEL_ID, kind=discord.TextChannel)
 
 
 async def _fetch_fallback_ping_channel(guild: discord.Guild) -> discord.TextChannel | None:
-    ch = guild.get_channel(MOVE_FALLBACK_PING_CHANNEL_ID)
-    if isinstance(ch, discord.TextChannel):
-        return ch
-    try:
-        fetched = await guild.fetch_channel(MOVE_FALLBACK_PING_CHANNEL_ID)
-        return fetched if isinstance(fetched, discord.TextChannel) else None
-    except Exception:
-        return None
+    return await resolve_channel(guild, MOVE_FALLBACK_PING_CHANNEL_ID, kind=discord.TextChannel)
 
 
 def _parse_footer_ids(embed: discord.Embed) -> tuple[int, int, str, int, int]:
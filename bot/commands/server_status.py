@@ -1,4 +1,3 @@
-import datetime as dt
 from typing import Optional
 
 import discord
@@ -6,60 +5,23 @@ from discord import app_commands
 
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS
-from ..db import connect
+from ..storage import get_store
 
 from .server_roles import SERVER_ROLES
 
 
-def _iso_now() -> str:
-    return dt.datetime.now(dt.timezone.utc).isoformat()
-
-
-async def _ensure_table() -> None:
-    async with connect() as db:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS server_status (
-              guild_id INTEGER NOT NULL,
-              role_id INTEGER NOT NULL,
-              is_open INTEGER NOT NULL,
-              note TEXT,
-              updated_at TEXT NOT NULL,
-              updated_by INTEGER,
-              PRIMARY KEY (guild_id, role_id)
-            )
-            """
-        )
-        await db.commit()
-
-
 async def set_status(*, guild_id: int, role_id: int, is_open: bool, note: Optional[str], updated_by: int) -> None:
-    await _ensure_table()
-    async with connect() as db:
-        await db.execute(
-            """
-            INSERT INTO server_status (guild_id, role_id, is_open, note, updated_at, updated_by)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(guild_id, role_id) DO UPDATE SET
-              is_open=excluded.is_open,
-              note=excluded.note,
-              updated_at=excluded.updated_at,
-              updated_by=excluded.updated_by
-            """,
-            (guild_id, role_id, 1 if is_open else 0, note, _iso_now(), updated_by),
-        )
-        await db.commit()
+    await get_store().set_server_status(
+        guild_id=guild_id,
+        role_id=role_id,
+        is_open=is_open,
+        note=note,
+        updated_by=updated_by,
+    )
 
 
 async def clear_status(*, guild_id: int, role_id: int) -> bool:
-    await _ensure_table()
-    async with connect() as db:
-        cur = await db.execute(
-            "DELETE FROM server_status WHERE guild_id = ? AND role_id = ?",
-            (guild_id, role_id),
-        )
-        await db.commit()
-        return (cur.rowcount or 0) > 0
+    return await get_store().clear_server_status(guild_id=guild_id, role_id=role_id)
 
 
 async def get_effective_status(*, guild_id: int, role_id: int) -> dict:
@@ -68,25 +30,12 @@ async def get_effective_status(*, guild_id: int, role_id: int) -> dict:
     Returns:
       {"is_open": bool, "note": str|None, "updated_at": str|None, "updated_by": int|None, "is_default": bool}
     """
-    await _ensure_table()
-    async with connect() as db:
-        cur = await db.execute(
-            "SELECT is_open, note, updated_at, updated_by FROM server_status WHERE guild_id = ? AND role_id = ?",
-            (guild_id, role_id),
-        )
-        row = await cur.fetchone()
+    row = await get_store().get_server_status(guild_id=guild_id, role_id=role_id)
 
     if not row:
         return {"is_open": True, "note": None, "updated_at": None, "updated_by": None, "is_default": True}
 
-    is_open_i, note, updated_at, updated_by = row
-    return {
-        "is_open": bool(is_open_i),
-        "note": note,
-        "updated_at": updated_at,
-        "updated_by": updated_by,
-        "is_default": False,
-    }
+    return {**row, "is_default": False}
 
 
 def _server_choices() -> list[app_commands.Choice[str]]:
@@ -5,7 +5,7 @@ from discord import app_commands
 
 from ..config import ALLOWED_USER_IDS
 from ..helpers import NO_PINGS, rel_ts
-from ..db import connect
+from ..storage import get_store
 
 
 def _age_str(since: dt.datetime | None) -> str:
@@ -40,30 +40,11 @@ def _parse_iso_dt(s: str | None) -> dt.datetime | None:
 
 
 async def _get_invite_join_info(*, guild_id: int, member_id: int) -> dict | None:
-    async with connect() as db:
-        cur = await db.execute(
-            """
-            SELECT invite_code, inviter_id, uses_before, uses_after, joined_at
-            FROM invite_join_log
-            WHERE guild_id = ? AND member_id = ?
-            ORDER BY id DESC
-            LIMIT 1
-            """,
-            (guild_id, member_id),
-        )
-        row = await cur.fetchone()
-
+    row = await get_store().latest_join(guild_id=guild_id, member_id=member_id)
     if not row:
         return None
 
-    invite_code, inviter_id, uses_before, uses_after, joined_at = row
-    return {
-        "invite_code": invite_code,
-        "inviter_id": inviter_id,
-        "uses_before": uses_before,
-        "uses_after": uses_after,
-        "joined_at": _parse_iso_dt(joined_at),
-    }
+    return {**row, "joined_at": _parse_iso_dt(row["joined_at"])}
 
 
 def _build_whois_embed(user: discord.Member, invite_info: dict | None) -> discord.Embed:
@@ -17,11 +17,37 @@ if not XC_URL:
 # Persisted DB path (recommended to keep under /app/data with a docker volume)
 SQLITE_PATH = os.getenv("SQLITE_PATH", "/app/data/bot.sqlite3")
 
+# Storage backend for invite tracking, AFK and server status: "sqlite" (default) or "memory".
+# "memory" keeps nothing across restarts; it's meant for benchmarking handler logic.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").strip().lower()
+
+# Raw invite_join_log rows older than this are rolled into daily per-inviter counts and deleted.
+# Set to 0 to keep raw join rows forever.
+INVITE_JOIN_LOG_RETENTION_DAYS = int(os.getenv("INVITE_JOIN_LOG_RETENTION_DAYS", "90"))
+RETENTION_INTERVAL_SECONDS = 6 * 60 * 60
+RETENTION_BATCH_SIZE = 500          # rows per delete transaction
+RETENTION_BATCH_PAUSE_SECONDS = 0.2  # yield the write lock between batches
+
+# Online backups (gzip snapshots taken with the sqlite backup API while the bot runs)
+BACKUP_DIR = os.getenv("BACKUP_DIR", os.path.join(os.path.dirname(SQLITE_PATH), "backups"))
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "6"))  # 0 disables the backup task
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "14"))
+
+# Statements slower than this are printed as [db-slow] and listed in /db_stats
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "250"))
+
 # --------------------
 # OPTIONAL / CONFIG
 # --------------------
 AUDIT_LOG_CHANNEL_ID = int(os.getenv("AUDIT_LOG_CHANNEL_ID", "0")) or None
 
+# Optional: post audit embeds through a channel webhook (own rate limits) instead of the bot account.
+# Failed posts are retried in order with backoff; when the retry queue is full they spill to SQLite.
+AUDIT_WEBHOOK_URL = os.getenv("AUDIT_WEBHOOK_URL", "").strip() or None
+AUDIT_WEBHOOK_RETRY_QUEUE_MAX = 200      # messages held in memory for retry
+AUDIT_WEBHOOK_BACKOFF_BASE_SECONDS = 1.0
+AUDIT_WEBHOOK_BACKOFF_MAX_SECONDS = 120.0
+
 # Comma-separated list in .env, e.g. "123,456"
 ALLOWED_USER_IDS = {
     int(x.strip())
@@ -43,6 +69,17 @@ SS_VOD_ROLE_ID = int(os.getenv("SS_VOD_ROLE_ID", os.getenv("ACTIVE_SUBSCRIBER_RO
 EXPIRED_ROLE_ID = int(os.getenv("EXPIRED_ROLE_ID", "0")) or None
 SS_VOD_ROLE_SYNC_DELAY_SECONDS = 5
 
+# Extra role-transition rules (see bot/role_rules.py), on top of the SS VOD/Expired rules above
+# and any rows in the role_rules table, e.g.
+# [{"role": 123, "on": "added", "action": "remove", "target": 456, "delay": 5}]
+ROLE_RULES_JSON = os.getenv("ROLE_RULES_JSON", "").strip()
+
+# Periodic sweep that re-checks every cached member against the role rules and fixes violations
+ROLE_SWEEP_INTERVAL_SECONDS = 6 * 60 * 60
+ROLE_SWEEP_START_DELAY_SECONDS = 5 * 60  # let member chunking finish after startup
+ROLE_SWEEP_ACTION_DELAY_SECONDS = 1.0    # between members' role edits
+ROLE_SWEEP_MAX_FIXES = 500               # per sweep; the rest wait for the next one
+
 # Purge safety defaults
 DEFAULT_PURGE_DAYS = 7
 CONFIRM_CODE_TTL_SECONDS = 15 * 60  # 15 minutes
@@ -50,6 +87,13 @@ KICK_DELAY_SECONDS = 1.2           # throttle to avoid rate limits
 CONFIRM_PHRASE = "I UNDERSTAND"    # must match after normalization
 GRACE_PERIOD_SECONDS = 60          # cancel window before kicks start
 
+# Raid mode: RAID_JOIN_THRESHOLD+ joins within RAID_WINDOW_SECONDS switch per-join audit posts to one
+# summary every RAID_SUMMARY_INTERVAL_SECONDS, until the rate falls to RAID_EXIT_THRESHOLD or below
+RAID_WINDOW_SECONDS = 60
+RAID_JOIN_THRESHOLD = 10
+RAID_EXIT_THRESHOLD = 3
+RAID_SUMMARY_INTERVAL_SECONDS = 30
+
 # /checkme cooldown
 CHECKME_COOLDOWN_SECONDS = 10 * 60  # 10 minutes
 
@@ -1,7 +1,13 @@
+import functools
 import os
+import re
+import sys
+import time
+from collections import deque
+
 import aiosqlite
 
-from .config import SQLITE_PATH
+from .config import SQLITE_PATH, SLOW_QUERY_MS
 
 CREATE_SQL = """
 PRAGMA journal_mode=WAL;
@@ -25,12 +31,80 @@ CREATE TABLE IF NOT EXISTS invite_join_log (
   invite_code TEXT,
   inviter_id INTEGER,
   uses_before INTEGER,
-  uses_after INTEGER
+  uses_after INTEGER,
+  rolled_up INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE INDEX IF NOT EXISTS idx_invite_join_log_guild_time
   ON invite_join_log (guild_id, joined_at);
 
+-- /whois: latest join row for a member (rowid order comes free with the index)
+CREATE INDEX IF NOT EXISTS idx_invite_join_log_guild_member
+  ON invite_join_log (guild_id, member_id);
+
+-- Daily join counts per inviter and per invite code, maintained as each join's attribution resolves
+-- (invite_join_log.rolled_up marks rows already counted)
+-- day: YYYY-MM-DD (UTC)
+-- inviter_id: 0 when the inviter was unknown; invite_code: '' when the invite was unknown
+CREATE TABLE IF NOT EXISTS invite_inviter_daily (
+  guild_id INTEGER NOT NULL,
+  day TEXT NOT NULL,
+  inviter_id INTEGER NOT NULL,
+  joins INTEGER NOT NULL,
+  PRIMARY KEY (guild_id, day, inviter_id)
+);
+
+CREATE TABLE IF NOT EXISTS invite_code_daily (
+  guild_id INTEGER NOT NULL,
+  day TEXT NOT NULL,
+  invite_code TEXT NOT NULL,
+  joins INTEGER NOT NULL,
+  PRIMARY KEY (guild_id, day, invite_code)
+);
+
+-- Hourly join/leave counts for /join_stats, bumped as each event happens
+-- hour: YYYY-MM-DDTHH (UTC); new_account_joins: joins flagged by the NEW_ACCOUNT_WARNING_DAYS check
+-- tenure_*: leaves by time in server (upper bounds: 1h, 1d, 7d, 30d, 365d, then longer / unknown)
+CREATE TABLE IF NOT EXISTS member_hourly (
+  guild_id INTEGER NOT NULL,
+  hour TEXT NOT NULL,
+  joins INTEGER NOT NULL DEFAULT 0,
+  new_account_joins INTEGER NOT NULL DEFAULT 0,
+  leaves INTEGER NOT NULL DEFAULT 0,
+  tenure_1h INTEGER NOT NULL DEFAULT 0,
+  tenure_1d INTEGER NOT NULL DEFAULT 0,
+  tenure_7d INTEGER NOT NULL DEFAULT 0,
+  tenure_30d INTEGER NOT NULL DEFAULT 0,
+  tenure_365d INTEGER NOT NULL DEFAULT 0,
+  tenure_more INTEGER NOT NULL DEFAULT 0,
+  tenure_unknown INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (guild_id, hour)
+);
+
+-- Role-transition rules loaded at startup alongside the config ones (bot/role_rules.py)
+-- event: 'added' / 'removed' (trigger_role_id); action: 'add' / 'remove' (target_role_id)
+CREATE TABLE IF NOT EXISTS role_rules (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  trigger_role_id INTEGER NOT NULL,
+  event TEXT NOT NULL,
+  action TEXT NOT NULL,
+  target_role_id INTEGER NOT NULL,
+  delay_seconds REAL NOT NULL DEFAULT 0,
+  reason TEXT,
+  enabled INTEGER NOT NULL DEFAULT 1
+);
+
+-- Members seen holding a role that has a "removed" rule, so the periodic sweep only applies that
+-- rule to members who actually lost the role, not to everyone who never had it. A row is deleted
+-- once the rule has been applied (or found already satisfied), or when the member leaves
+CREATE TABLE IF NOT EXISTS role_rule_seen (
+  guild_id INTEGER NOT NULL,
+  role_id INTEGER NOT NULL,
+  member_id INTEGER NOT NULL,
+  first_seen_at TEXT NOT NULL,
+  PRIMARY KEY (guild_id, role_id, member_id)
+);
+
 -- Staff-managed server availability for move_server
 -- is_open: 1=open, 0=closed
 -- until_ts: optional unix seconds; if set and in the past, treated as open and row is auto-cleared
@@ -47,20 +121,249 @@ CREATE TABLE IF NOT EXISTS server_status (
 
 CREATE INDEX IF NOT EXISTS idx_server_status_guild
   ON server_status (guild_id);
+
+-- Audit webhook payloads that overflowed the in-memory retry queue; replayed oldest first
+CREATE TABLE IF NOT EXISTS audit_spill (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  payload TEXT NOT NULL,
+  spilled_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS afk_status (
+  guild_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  message TEXT,
+  until_ts INTEGER,
+  set_at TEXT NOT NULL,
+  PRIMARY KEY (guild_id, user_id)
+);
 """
 
 
+# --------------------
+# Query timing
+# --------------------
+QUERY_WINDOW_SECONDS = 60 * 60                 # stats cover the last hour
+QUERY_SAMPLES_PER_FINGERPRINT = 2000
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# fingerprint -> deque[(monotonic_ts, elapsed_ms)]
+QUERY_SAMPLES: dict[str, deque] = {}
+# Most recent statements over SLOW_QUERY_MS: {"at", "ms", "fingerprint", "call_site"}
+SLOW_QUERIES: deque = deque(maxlen=50)
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> str:
+    """Normalize a statement so calls that differ only in literals / IN-list size group together."""
+    s = re.sub(r"--[^\n]*", " ", sql)
+    s = re.sub(r"'(?:[^']|'')*'", "?", s)
+    s = re.sub(r"\b\d+(?:\.\d+)?\b", "?", s)
+    s = re.sub(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", "IN (?, ...)", s, flags=re.IGNORECASE)
+    return " ".join(s.split())
+
+
+def _call_site() -> str:
+    """First frames outside this module, e.g. 'storage.py:210 latest_join <- whois.py:43 _get_invite_join_info'."""
+    frames: list[str] = []
+    f = sys._getframe(2)
+    while f is not None and len(frames) < 2:
+        filename = f.f_code.co_filename
+        if os.path.abspath(filename) != _THIS_FILE and "aiosqlite" not in filename:
+            frames.append(f"{os.path.basename(filename)}:{f.f_lineno} {f.f_code.co_name}")
+            if not filename.endswith("storage.py"):
+                break
+        f = f.f_back
+    return " <- ".join(frames) or "unknown"
+
+
+def _record(sql: str, t0: float) -> None:
+    now = time.monotonic()
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    fp = fingerprint_sql(sql)
+
+    samples = QUERY_SAMPLES.get(fp)
+    if samples is None:
+        samples = QUERY_SAMPLES[fp] = deque(maxlen=QUERY_SAMPLES_PER_FINGERPRINT)
+    samples.append((now, elapsed_ms))
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        site = _call_site()
+        SLOW_QUERIES.append({"at": time.time(), "ms": elapsed_ms, "fingerprint": fp, "call_site": site})
+        print(f"[db-slow] {elapsed_ms:.0f}ms at {site}: {fp[:200]}")
+
+
+def query_stats(limit: int = 10) -> list[dict]:
+    """
+    Per-fingerprint latency over the rolling window, worst total time first.
+    Each entry: fingerprint, count, total_ms, p50_ms, p95_ms, max_ms, histogram (count per HISTOGRAM_BOUNDS_MS bucket + overflow).
+    """
+    cutoff = time.monotonic() - QUERY_WINDOW_SECONDS
+    out: list[dict] = []
+    for fp, samples in list(QUERY_SAMPLES.items()):
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        if not samples:
+            QUERY_SAMPLES.pop(fp, None)
+            continue
+
+        values = sorted(ms for _, ms in samples)
+        hist = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for ms in values:
+            i = 0
+            while i < len(HISTOGRAM_BOUNDS_MS) and ms > HISTOGRAM_BOUNDS_MS[i]:
+                i += 1
+            hist[i] += 1
+
+        n = len(values)
+        out.append({
+            "fingerprint": fp,
+            "count": n,
+            "total_ms": sum(values),
+            "p50_ms": values[n // 2],
+            "p95_ms": values[min(n - 1, int(n * 0.95))],
+            "max_ms": values[-1],
+            "histogram": hist,
+        })
+
+    out.sort(key=lambda e: e["total_ms"], reverse=True)
+    return out[:limit]
+
+
+class TimedConnection:
+    """
+    aiosqlite connection proxy that records the latency of every statement (and commit).
+    Anything not wrapped here is passed straight through to the real connection.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def __aenter__(self):
+        await self._conn.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._conn.__aexit__(exc_type, exc, tb)
+
+    async def execute(self, sql, parameters=None):
+        t0 = time.perf_counter()
+        try:
+            return await self._conn.execute(sql, parameters)
+        finally:
+            _record(sql, t0)
+
+    async def executemany(self, sql, parameters):
+        t0 = time.perf_counter()
+        try:
+            return await self._conn.executemany(sql, parameters)
+        finally:
+            _record(sql, t0)
+
+    async def execute_fetchall(self, sql, parameters=None):
+        t0 = time.perf_counter()
+        try:
+            return await self._conn.execute_fetchall(sql, parameters)
+        finally:
+            _record(sql, t0)
+
+    async def executescript(self, sql_script):
+        t0 = time.perf_counter()
+        try:
+            return await self._conn.executescript(sql_script)
+        finally:
+            _record(sql_script, t0)
+
+    async def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return await self._conn.commit()
+        finally:
+            _record("COMMIT", t0)
+
+
 def connect():
     """
-    Return an aiosqlite connection context manager.
+    Return a timed aiosqlite connection context manager.
     Usage: async with connect() as db:
     """
-    return aiosqlite.connect(SQLITE_PATH)
+    return TimedConnection(aiosqlite.connect(SQLITE_PATH))
+
+
+# Columns added after a table first shipped: (table, column, definition).
+# CREATE TABLE IF NOT EXISTS won't touch an existing table, so these are applied with ALTER TABLE.
+ADDED_COLUMNS = [
+    ("invite_join_log", "rolled_up", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# Indexes that reference ADDED_COLUMNS, created after the columns exist
+POST_MIGRATION_SQL = """
+-- Join rows not yet counted in the daily rollups (pending attribution / rows from before rollups)
+CREATE INDEX IF NOT EXISTS idx_invite_join_log_unrolled
+  ON invite_join_log (guild_id, joined_at) WHERE rolled_up = 0;
+
+-- Owner lookups moved to the in-memory index in invite_tracking; nothing reads this any more
+DROP INDEX IF EXISTS idx_invite_baseline_guild_inviter;
+"""
+
+
+# Local full-text archive of audit embeds (/audit_search). Needs SQLite built with FTS5;
+# without it ensure_db() leaves AUDIT_ARCHIVE_ENABLED off and the bot runs without the archive.
+AUDIT_ARCHIVE_SQL = """
+-- uid: assigned when the embed is queued, so a later edit can replace the archived text
+CREATE TABLE IF NOT EXISTS audit_archive (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  uid TEXT NOT NULL UNIQUE,
+  guild_id INTEGER NOT NULL,
+  created_at TEXT NOT NULL,
+  title TEXT,
+  body TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_archive_guild_time
+  ON audit_archive (guild_id, created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS audit_archive_fts
+  USING fts5(title, body, content='audit_archive', content_rowid='id');
+
+CREATE TRIGGER IF NOT EXISTS audit_archive_ai AFTER INSERT ON audit_archive BEGIN
+  INSERT INTO audit_archive_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_archive_ad AFTER DELETE ON audit_archive BEGIN
+  INSERT INTO audit_archive_fts (audit_archive_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_archive_au AFTER UPDATE ON audit_archive BEGIN
+  INSERT INTO audit_archive_fts (audit_archive_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+  INSERT INTO audit_archive_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+"""
+
+AUDIT_ARCHIVE_ENABLED = False
 
 
 async def ensure_db() -> None:
+    global AUDIT_ARCHIVE_ENABLED
     os.makedirs(os.path.dirname(SQLITE_PATH), exist_ok=True)
 
     async with connect() as db:
         await db.executescript(CREATE_SQL)
+        for table, column, definition in ADDED_COLUMNS:
+            cols = await db.execute_fetchall(f"PRAGMA table_info({table})")
+            if column not in {c[1] for c in cols}:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        await db.executescript(POST_MIGRATION_SQL)
         await db.commit()
+
+        try:
+            await db.executescript(AUDIT_ARCHIVE_SQL)
+            await db.commit()
+            AUDIT_ARCHIVE_ENABLED = True
+        except aiosqlite.OperationalError as e:
+            print(f"[db] Audit archive disabled (SQLite FTS5 unavailable?): {e}")
@@ -1,9 +1,13 @@
+import asyncio
 import datetime as dt
 import secrets
 from typing import Literal
 
 import discord
 
+from . import audit_webhook
+from .audit_archive import ArchiveRef, archive_embed, archive_embed_edit
+from .channels import resolve_channel
 from .config import (
     VISITOR_ROLE_ID,
     REDDITOR_ROLE_ID,
@@ -16,6 +20,7 @@ from .config import (
     GRACE_PERIOD_SECONDS,
     TICKET_CHANNEL_ID,
     AUDIT_LOG_CHANNEL_ID,
+    AUDIT_WEBHOOK_URL,
 )
 
 NO_PINGS = discord.AllowedMentions.none()
@@ -24,6 +29,10 @@ NO_PINGS = discord.AllowedMentions.none()
 CHECKME_LAST_USED: dict[int, dt.datetime] = {}
 PENDING_PURGES: dict[tuple[int, int], dict] = {}
 
+# Discord limits per audit message (embeds queued while a send is in flight are packed together)
+AUDIT_MAX_EMBEDS_PER_MESSAGE = 10
+AUDIT_MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
 EXPIRED_ROLE_ID = 1457796091834667172
 EXPIRED_EXEMPT_ROLE_ID = 1457567060031967264
 
@@ -254,20 +263,167 @@ def generate_confirm_code() -> str:
     return secrets.token_hex(3).upper()  # 6 hex chars
 
 
-async def send_audit_embed(guild: discord.Guild, embed: discord.Embed) -> None:
-    if not AUDIT_LOG_CHANNEL_ID:
-        return
+class AuditBatch:
+    """
+    One posted audit message and its current embeds; shared by the receipts of everything packed into it.
+    message is the bot's discord.Message, or the message ID when it went out through AUDIT_WEBHOOK_URL
+    (audit_webhook.QUEUED if the webhook accepted it for later delivery, so it can't be edited).
+    """
+
+    def __init__(self, message: discord.Message | str, embeds: list[discord.Embed]):
+        self.message = message
+        self.embeds = embeds
+        self.lock = asyncio.Lock()
+
+
+class AuditReceipt:
+    """Where a queued audit embed ended up: its message batch and its position in it (plus its archive row)."""
+
+    def __init__(self, batch: AuditBatch, index: int, archive_ref: ArchiveRef | None = None):
+        self.batch = batch
+        self.index = index
+        self.archive_ref = archive_ref
+
+
+class _AuditItem:
+    __slots__ = ("embed", "content", "allowed_mentions", "future", "archive_ref")
+
+    def __init__(self, embed, content, allowed_mentions, future, archive_ref):
+        self.embed = embed
+        self.content = content
+        self.allowed_mentions = allowed_mentions
+        self.future = future
+        self.archive_ref = archive_ref
+
+
+# guild_id -> audit embeds waiting for the next flush, in call order
+_AUDIT_QUEUES: dict[int, list[_AuditItem]] = {}
+_AUDIT_FLUSH_TASKS: dict[int, asyncio.Task] = {}
+# Running totals: embeds queued vs messages actually sent
+AUDIT_SEND_COUNTS = {"embeds": 0, "messages": 0}
+
+
+def _pack_audit_items(items: list[_AuditItem]) -> list[list[_AuditItem]]:
+    """
+    Greedily pack items, in order, into messages of at most 10 embeds / 6000 embed chars.
+    Items with content (role pings) always get a message of their own.
+    """
+    groups: list[list[_AuditItem]] = []
+    cur: list[_AuditItem] = []
+    cur_chars = 0
+    for item in items:
+        size = len(item.embed)
+        if item.content is not None:
+            if cur:
+                groups.append(cur)
+            groups.append([item])
+            cur, cur_chars = [], 0
+            continue
+        if cur and (len(cur) >= AUDIT_MAX_EMBEDS_PER_MESSAGE or cur_chars + size > AUDIT_MAX_EMBED_CHARS_PER_MESSAGE):
+            groups.append(cur)
+            cur, cur_chars = [], 0
+        cur.append(item)
+        cur_chars += size
+    if cur:
+        groups.append(cur)
+    return groups
+
+
+async def _send_audit_group(ch, group: list[_AuditItem]) -> None:
+    """Send one packed group via the audit channel, or via the webhook when ch is None."""
+    embeds = [item.embed for item in group]
+    first = group[0]
+    allowed_mentions = first.allowed_mentions or NO_PINGS
+    try:
+        if ch is None:
+            payload = {
+                "embeds": [e.to_dict() for e in embeds],
+                "allowed_mentions": allowed_mentions.to_dict(),
+            }
+            if first.content is not None:
+                payload["content"] = first.content
+            message = await audit_webhook.post_message(payload)
+        else:
+            message = await ch.send(content=first.content, embeds=embeds, allowed_mentions=allowed_mentions)
+    except Exception:
+        message = None
+    if message is not None:
+        AUDIT_SEND_COUNTS["messages"] += 1
+
+    batch = AuditBatch(message, embeds) if message is not None else None
+    for i, item in enumerate(group):
+        if not item.future.done():
+            item.future.set_result(AuditReceipt(batch, i, item.archive_ref) if batch is not None else None)
+
+
+async def _flush_audit_queue(guild: discord.Guild) -> None:
+    # No batching delay: an embed queued when nothing else is pending goes out right away.
+    # Yield once so embeds queued in the same tick (concurrent join stages) share the message;
+    # anything queued while a send is in flight is packed into the next one.
+    await asyncio.sleep(0)
+    while _AUDIT_QUEUES.get(guild.id):
+        items = _AUDIT_QUEUES.pop(guild.id)
+        if AUDIT_WEBHOOK_URL:
+            # ch=None routes every group through the webhook sink
+            for group in _pack_audit_items(items):
+                await _send_audit_group(None, group)
+            continue
+        ch = await resolve_channel(guild, AUDIT_LOG_CHANNEL_ID, kind=(discord.TextChannel, discord.Thread))
+        if ch is None:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_result(None)
+            continue
+        # Groups go out one at a time so the channel shows them in call order
+        for group in _pack_audit_items(items):
+            await _send_audit_group(ch, group)
 
-    ch = guild.get_channel(AUDIT_LOG_CHANNEL_ID)
-    if ch is None:
-        try:
-            ch = await guild.fetch_channel(AUDIT_LOG_CHANNEL_ID)
-        except Exception:
-            return
 
-    if isinstance(ch, (discord.TextChannel, discord.Thread)):
+async def send_audit_embed(
+    guild: discord.Guild,
+    embed: discord.Embed,
+    *,
+    content: str | None = None,
+    allowed_mentions: discord.AllowedMentions | None = None,
+    archive: bool = True,
+) -> AuditReceipt | None:
+    """
+    Queue an embed for the audit channel. It is sent at once if nothing else is queued; embeds that
+    pile up behind an in-flight send are packed into as few messages as possible, in call order.
+    Resolves once sent, with a receipt for edit_audit_embed, or None if it couldn't be sent.
+    Unless archive is False (a resend of an embed already archived), the embed is also written to
+    the local /audit_search archive, whether or not an audit channel is configured.
+    """
+    archive_ref = archive_embed(guild.id, embed) if archive else None
+    if not AUDIT_LOG_CHANNEL_ID and not AUDIT_WEBHOOK_URL:
+        return None
+
+    future = asyncio.get_running_loop().create_future()
+    _AUDIT_QUEUES.setdefault(guild.id, []).append(_AuditItem(embed, content, allowed_mentions, future, archive_ref))
+    AUDIT_SEND_COUNTS["embeds"] += 1
+
+    task = _AUDIT_FLUSH_TASKS.get(guild.id)
+    if task is None or task.done():
+        _AUDIT_FLUSH_TASKS[guild.id] = asyncio.create_task(_flush_audit_queue(guild))
+    return await future
+
+
+async def edit_audit_embed(sent: AuditReceipt | None, embed: discord.Embed) -> None:
+    """Replace an embed previously posted with send_audit_embed (no-op if it was never sent)."""
+    if sent is None:
+        return
+    archive_embed_edit(sent.archive_ref, embed)
+    batch = sent.batch
+    # Edits to embeds sharing a message are serialized so none overwrites another
+    async with batch.lock:
+        batch.embeds[sent.index] = embed
+        if batch.message is audit_webhook.QUEUED:
+            return
         try:
-            await ch.send(embed=embed, allowed_mentions=NO_PINGS)
+            if isinstance(batch.message, str):
+                await audit_webhook.edit_message(batch.message, {"embeds": [e.to_dict() for e in batch.embeds]})
+            else:
+                batch.message = await batch.message.edit(embeds=batch.embeds, allowed_mentions=NO_PINGS)
         except Exception:
             return
 
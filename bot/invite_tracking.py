@@ -1,127 +1,487 @@
 import asyncio
 import datetime as dt
+import time
+
 import discord
 
-from .db import connect
+from .storage import get_store
+
+# Joins arriving within this window share one guild.invites() fetch
+ATTRIBUTION_BATCH_WINDOW_SECONDS = 0.5
+# Retries back off from the observed invite-update lag, doubling per attempt
+ATTRIBUTION_RETRY_MIN_SECONDS = 0.25
+ATTRIBUTION_RETRY_MAX_SECONDS = 8.0
+ATTRIBUTION_MAX_RETRIES = 3
+
+# Startup priming: how many guilds snapshot at once, and how long one guild may take
+SNAPSHOT_CONCURRENCY = 5
+SNAPSHOT_TIMEOUT_SECONDS = 20.0
+
+# Write-behind delay: baseline changes are persisted this long after the first unflushed change
+BASELINE_FLUSH_DELAY_SECONDS = 2.0
+# A failed flush is retried after BASELINE_FLUSH_DELAY_SECONDS, doubling up to this
+BASELINE_FLUSH_RETRY_MAX_SECONDS = 60.0
+
+# A guild's owner index is trusted for misses this long after a full rebuild from guild.invites()
+OWNER_INDEX_TTL_SECONDS = 10 * 60
+
+# guild_id -> {code: (uses, inviter_id)}; loaded from the store once per guild, then kept in memory
+_BASELINES: dict[int, dict[str, tuple[int, int | None]]] = {}
+# guild_id -> {code: baseline row} waiting to be persisted
+_PENDING_WRITES: dict[int, dict[str, tuple[str, int, int | None, str | None]]] = {}
+_FLUSH_TASKS: dict[int, asyncio.Task] = {}
+# Running totals of baseline rows queued for writing vs skipped as unchanged
+BASELINE_WRITE_COUNTS = {"written": 0, "skipped": 0}
+
+# (guild_id, owner_id) -> {"code", "url", "expires_at"}: each owner's current active invite
+_OWNER_INVITES: dict[tuple[int, int], dict] = {}
+# guild_id -> monotonic time of the last full owner index rebuild
+_OWNER_INDEX_BUILT_AT: dict[int, float] = {}
 
 
 def _now_iso() -> str:
     return dt.datetime.now(dt.timezone.utc).isoformat()
 
 
-# Keep existing inviter_id if we already have one (prevents overwriting staff creator with "bot")
-UPSERT_BASELINE_SQL = """
-INSERT INTO invite_baseline (guild_id, code, uses, inviter_id, created_at, updated_at)
-VALUES (?, ?, ?, ?, ?, ?)
-ON CONFLICT(guild_id, code) DO UPDATE SET
-  uses=excluded.uses,
-  inviter_id=COALESCE(invite_baseline.inviter_id, excluded.inviter_id),
-  created_at=COALESCE(invite_baseline.created_at, excluded.created_at),
-  updated_at=excluded.updated_at
-"""
+def _baseline_rows(invites: list[discord.Invite]) -> list[tuple[str, int, int | None, str | None]]:
+    rows = []
+    for inv in invites:
+        inviter_id = inv.inviter.id if inv.inviter else None
+        created_at = inv.created_at.isoformat() if inv.created_at else None
+        rows.append((inv.code, inv.uses or 0, inviter_id, created_at))
+    return rows
 
 
-async def snapshot_invites_to_db(guild: discord.Guild) -> None:
-    invites = await guild.invites()
-    now = _now_iso()
+async def _get_baseline(guild_id: int) -> dict[str, tuple[int, int | None]]:
+    baseline = _BASELINES.get(guild_id)
+    if baseline is None:
+        loaded = await get_store().load_invite_baseline(guild_id)
+        baseline = _BASELINES.setdefault(guild_id, loaded)
+    return baseline
+
+
+def _apply_invites(guild_id: int, invites: list[discord.Invite], *, keep: set[str] = frozenset()) -> tuple[int, int]:
+    """
+    Replace the in-memory baseline with the live invite list and queue only new or changed
+    codes for persistence. A stored inviter_id always wins over Discord's inviter (the bot, for /invite links).
+    Codes in keep (state unknown this round, e.g. a failed vanity fetch) carry over unchanged.
+    Returns (queued, skipped).
+    """
+    old = _BASELINES.get(guild_id, {})
+    rows = _baseline_rows(invites)
+
+    fresh: dict[str, tuple[int, int | None]] = {code: old[code] for code in keep if code in old}
+    changed = []
+    for row in rows:
+        code, uses, inviter_id, _ = row
+        prev = old.get(code)
+        stored_inviter_id = prev[1] if prev else None
+        fresh[code] = (uses, stored_inviter_id if stored_inviter_id is not None else inviter_id)
+        if prev is None or prev[0] != uses or (stored_inviter_id is None and inviter_id is not None):
+            changed.append(row)
+    _BASELINES[guild_id] = fresh
+
+    _queue_baseline_write(guild_id, changed)
+
+    skipped = len(rows) - len(changed)
+    BASELINE_WRITE_COUNTS["written"] += len(changed)
+    BASELINE_WRITE_COUNTS["skipped"] += skipped
+    return len(changed), skipped
+
+
+def _queue_baseline_write(guild_id: int, rows: list[tuple[str, int, int | None, str | None]]) -> None:
+    if not rows:
+        return
+    pending = _PENDING_WRITES.setdefault(guild_id, {})
+    for row in rows:
+        pending[row[0]] = row
+
+    task = _FLUSH_TASKS.get(guild_id)
+    if task is None or task.done():
+        _FLUSH_TASKS[guild_id] = asyncio.create_task(_flush_later(guild_id))
+
+
+async def flush_baseline_writes(guild_id: int) -> bool:
+    rows = _PENDING_WRITES.pop(guild_id, None)
+    if not rows:
+        return True
+    try:
+        await get_store().upsert_invite_baseline(guild_id, list(rows.values()))
+        return True
+    except Exception as e:
+        print(f"[invite-tracking] Baseline flush failed in guild {guild_id}: {type(e).__name__}: {e}")
+        # Put the rows back unless a newer row for the same code was queued meanwhile
+        pending = _PENDING_WRITES.setdefault(guild_id, {})
+        for code, row in rows.items():
+            pending.setdefault(code, row)
+        return False
+
+
+async def _flush_later(guild_id: int) -> None:
+    delay = BASELINE_FLUSH_DELAY_SECONDS
+    await asyncio.sleep(delay)
+    while _PENDING_WRITES.get(guild_id):
+        if await flush_baseline_writes(guild_id):
+            delay = BASELINE_FLUSH_DELAY_SECONDS
+            continue
+        delay = min(delay * 2, BASELINE_FLUSH_RETRY_MAX_SECONDS)
+        await asyncio.sleep(delay)
+
+
+async def flush_all_baseline_writes() -> None:
+    """Shutdown: persist every guild's queued baseline rows now instead of waiting for the delay."""
+    for guild_id in list(_PENDING_WRITES):
+        await flush_baseline_writes(guild_id)
 
-    async with connect() as db:
-        for inv in invites:
-            inviter_id = inv.inviter.id if inv.inviter else None
-            created_at = inv.created_at.isoformat() if inv.created_at else None
-            uses = inv.uses or 0
 
-            await db.execute(
-                UPSERT_BASELINE_SQL,
-                (guild.id, inv.code, uses, inviter_id, created_at, now),
-            )
-        await db.commit()
+def invite_expires_at(inv: discord.Invite) -> dt.datetime | None:
+    if not inv.max_age:
+        return None
+    created = inv.created_at or dt.datetime.now(dt.timezone.utc)
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=dt.timezone.utc)
+    return created + dt.timedelta(seconds=inv.max_age)
+
+
+def _entry_is_live(entry: dict) -> bool:
+    expires_at = entry["expires_at"]
+    return expires_at is None or dt.datetime.now(dt.timezone.utc) < expires_at
+
+
+def _index_owner_invite(guild_id: int, owner_id: int, inv: discord.Invite, *, replace: bool = False) -> None:
+    """Index inv as owner_id's active invite; unless replace, keep whichever of old/new lives longer."""
+    if inv.max_uses and (inv.uses or 0) >= inv.max_uses:
+        return
+    entry = {"code": inv.code, "url": inv.url, "expires_at": invite_expires_at(inv)}
+    if not _entry_is_live(entry):
+        return
+
+    key = (guild_id, owner_id)
+    prev = _OWNER_INVITES.get(key)
+    if not replace and prev is not None and _entry_is_live(prev):
+        if prev["expires_at"] is None:
+            return
+        if entry["expires_at"] is not None and entry["expires_at"] <= prev["expires_at"]:
+            return
+    _OWNER_INVITES[key] = entry
+
+
+def _rebuild_owner_index(guild_id: int, invites: list[discord.Invite]) -> None:
+    """Re-index every owner in the guild from a live invite list (owners come from the baseline)."""
+    baseline = _BASELINES.get(guild_id, {})
+    for key in [k for k in _OWNER_INVITES if k[0] == guild_id]:
+        del _OWNER_INVITES[key]
+
+    for inv in invites:
+        owner_id = baseline.get(inv.code, (0, None))[1]
+        if owner_id is None and inv.inviter is not None and not inv.inviter.bot:
+            owner_id = inv.inviter.id
+        if owner_id is not None:
+            _index_owner_invite(guild_id, owner_id, inv)
+
+    _OWNER_INDEX_BUILT_AT[guild_id] = time.monotonic()
+
 
+def _forget_owner_invite(guild_id: int, code: str) -> None:
+    for key in [k for k, e in _OWNER_INVITES.items() if k[0] == guild_id and e["code"] == code]:
+        del _OWNER_INVITES[key]
+
+
+def remember_owner_invite(*, guild_id: int, owner_id: int, invite: discord.Invite) -> None:
+    """Record a freshly created /invite link as the owner's active invite."""
+    _index_owner_invite(guild_id, owner_id, invite, replace=True)
+
+
+async def get_owner_invite(guild: discord.Guild, owner_id: int) -> dict | None:
+    """
+    Return {"code", "url", "expires_at"} for the owner's active invite, or None.
+    Answered from memory; guild.invites() is only fetched when the entry is missing or expired
+    and the guild's index is older than OWNER_INDEX_TTL_SECONDS.
+    """
+    key = (guild.id, owner_id)
+    entry = _OWNER_INVITES.get(key)
+    if entry is not None:
+        if _entry_is_live(entry):
+            return entry
+        del _OWNER_INVITES[key]
+
+    built_at = _OWNER_INDEX_BUILT_AT.get(guild.id)
+    if built_at is not None and time.monotonic() - built_at < OWNER_INDEX_TTL_SECONDS:
+        return None
 
-async def _detect_used_invite_once(guild: discord.Guild) -> dict | None:
     invites = await guild.invites()
+    await _get_baseline(guild.id)
+    _rebuild_owner_index(guild.id, invites)
+    return _OWNER_INVITES.get(key)
+
+
+def remember_invite_owner(*, guild_id: int, code: str, owner_id: int, uses: int) -> None:
+    """Keep the in-memory baseline in step with an owner recorded via /invite."""
+    baseline = _BASELINES.get(guild_id)
+    if baseline is not None:
+        baseline[code] = (uses, owner_id)
+
+
+async def stored_invite_owner(guild_id: int, code: str) -> int | None:
+    """Inviter on record for a code: the /invite owner when there is one, else Discord's inviter."""
+    row = (await _get_baseline(guild_id)).get(code)
+    return row[1] if row else None
+
 
-    async with connect() as db:
-        rows = await db.execute_fetchall(
-            "SELECT code, uses, inviter_id FROM invite_baseline WHERE guild_id = ?",
-            (guild.id,),
-        )
-        baseline = {r[0]: (r[1], r[2]) for r in rows}  # code -> (uses, inviter_id)
-
-        best = None
-        for inv in invites:
-            code = inv.code
-            after = inv.uses or 0
-
-            before, stored_inviter_id = baseline.get(code, (0, None))
-            delta = after - before
-            if delta <= 0:
+async def handle_invite_create(invite: discord.Invite) -> None:
+    """Gateway on_invite_create: add the new code to the baseline without polling guild.invites()."""
+    guild_id = getattr(invite.guild, "id", None)
+    if guild_id is None:
+        return
+
+    baseline = await _get_baseline(guild_id)
+    row = _baseline_rows([invite])[0]
+    code, uses, inviter_id, _ = row
+    prev = baseline.get(code)
+    stored_inviter_id = prev[1] if prev else None
+    baseline[code] = (uses, stored_inviter_id if stored_inviter_id is not None else inviter_id)
+    _queue_baseline_write(guild_id, [row])
+
+    # /invite links are indexed under their owner by /invite itself; here only member-made invites
+    owner_id = stored_inviter_id
+    if owner_id is None and invite.inviter is not None and not invite.inviter.bot:
+        owner_id = invite.inviter.id
+    if owner_id is not None:
+        _index_owner_invite(guild_id, owner_id, invite)
+
+
+async def handle_invite_delete(invite: discord.Invite) -> None:
+    """Gateway on_invite_delete (revoked or expired): drop the code from memory and from the store."""
+    guild_id = getattr(invite.guild, "id", None)
+    if guild_id is None:
+        return
+
+    baseline = _BASELINES.get(guild_id)
+    if baseline is not None:
+        baseline.pop(invite.code, None)
+    pending = _PENDING_WRITES.get(guild_id)
+    if pending is not None:
+        pending.pop(invite.code, None)
+    _forget_owner_invite(guild_id, invite.code)
+
+    await get_store().delete_invite_baseline(guild_id, [invite.code])
+
+
+async def fetch_tracked_invites(guild: discord.Guild) -> tuple[list[discord.Invite], set[str]]:
+    """
+    guild.invites() plus the vanity invite when the guild has one, fetched concurrently.
+    Returns (invites, codes whose state couldn't be read this round). A failed vanity fetch
+    never fails the whole call; its code is reported so the baseline keeps the last known uses.
+    """
+    if "VANITY_URL" not in guild.features:
+        return await guild.invites(), set()
+
+    invites, vanity = await asyncio.gather(guild.invites(), guild.vanity_invite(), return_exceptions=True)
+    if isinstance(invites, BaseException):
+        raise invites
+    if isinstance(vanity, BaseException):
+        print(f"[invite-tracking] Vanity invite fetch failed in guild {guild.id}: {type(vanity).__name__}: {vanity}")
+        return invites, {guild.vanity_url_code} if guild.vanity_url_code else set()
+    if vanity is not None:
+        invites = [*invites, vanity]
+    return invites, set()
+
+
+async def snapshot_invites_to_db(guild: discord.Guild) -> tuple[int, int]:
+    """
+    Refresh the baseline from the live invites (and vanity). Returns (rows written, rows skipped as unchanged).
+    Runs in the guild's attribution drain, so a join that lands meanwhile is still claimed, not absorbed.
+    """
+    return await _coordinator(guild.id).request_snapshot(guild)
+
+
+async def prime_invite_baselines(guilds: list[discord.Guild]) -> None:
+    """Snapshot every guild's invites concurrently (bounded), each with its own timeout."""
+    t0 = time.perf_counter()
+    sem = asyncio.Semaphore(SNAPSHOT_CONCURRENCY)
+    primed = 0
+
+    async def _one(g: discord.Guild) -> None:
+        nonlocal primed
+        async with sem:
+            try:
+                written, skipped = await asyncio.wait_for(snapshot_invites_to_db(g), timeout=SNAPSHOT_TIMEOUT_SECONDS)
+                primed += 1
+                print(f"[invite-tracking] Baseline for guild {g.id}: {written} written, {skipped} unchanged")
+            except discord.Forbidden:
+                print(f"[invite-tracking] Missing permissions to read invites in guild {g.id}")
+            except asyncio.TimeoutError:
+                print(f"[invite-tracking] Snapshot timed out after {SNAPSHOT_TIMEOUT_SECONDS:.0f}s in guild {g.id}")
+            except Exception as e:
+                print(f"[invite-tracking] Snapshot failed in guild {g.id}: {type(e).__name__}: {e}")
+
+    await asyncio.gather(*(_one(g) for g in guilds))
+    print(f"[invite-tracking] Primed {primed}/{len(guilds)} guild(s) in {time.perf_counter() - t0:.1f}s")
+
+
+async def _claim_invite_uses(
+    guild: discord.Guild,
+    invites: list[discord.Invite],
+    *,
+    unknown: set[str] = frozenset(),
+) -> tuple[list[dict], tuple[int, int]]:
+    """
+    Diff the live invites against the in-memory baseline and return one claim per observed use,
+    in a deterministic order (largest delta first, then code). Advances the baseline; the
+    baseline write counts are returned alongside the claims.
+    """
+    baseline = await _get_baseline(guild.id)  # code -> (uses, inviter_id)
+    vanity_code = guild.vanity_url_code if "VANITY_URL" in guild.features else None
+
+    deltas = []
+    for inv in invites:
+        after = inv.uses or 0
+        before, stored_inviter_id = baseline.get(inv.code, (0, None))
+        if after - before <= 0:
+            continue
+
+        # Prefer stored_inviter_id (staff who ran /invite) over Discord inviter (bot)
+        discord_inviter_id = inv.inviter.id if inv.inviter else None
+        effective_inviter_id = stored_inviter_id if stored_inviter_id is not None else discord_inviter_id
+        deltas.append((-(after - before), inv.code, effective_inviter_id, before, after))
+
+    claims: list[dict] = []
+    for _, code, inviter_id, before, after in sorted(deltas):
+        for uses in range(before, after):
+            claims.append({
+                "code": code,
+                "inviter_id": inviter_id,
+                "before": uses,
+                "after": uses + 1,
+                "vanity": code == vanity_code,
+            })
+
+    # Refresh baseline (but DO NOT overwrite inviter_id if we already stored staff creator)
+    return claims, _apply_invites(guild.id, invites, keep=unknown)
+
+
+class _PendingJoin:
+    __slots__ = ("future", "attempts", "submitted_at")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.attempts = 0
+        self.submitted_at = time.monotonic()
+
+
+class _AttributionCoordinator:
+    """
+    One per guild. Joins that arrive within ATTRIBUTION_BATCH_WINDOW_SECONDS share one invites() fetch,
+    and the observed uses are handed out to the pending joins in arrival order.
+    A single drain task per guild means baseline diffs never race each other; baseline snapshots
+    (snapshot_invites_to_db) go through the same drain and double as a claim round.
+    Unresolved joins are retried after a delay derived from how long Discord has recently
+    taken to reflect a join in invite uses (EWMA), doubling per attempt.
+    """
+
+    def __init__(self):
+        self.pending: list[_PendingJoin] = []
+        # Futures for requested baseline snapshots, resolved with (rows written, rows skipped)
+        self.snapshots: list[asyncio.Future] = []
+        self.task: asyncio.Task | None = None
+        self.lag_ewma = 1.0
+
+    def _retry_delay(self, attempts: int) -> float:
+        base = max(ATTRIBUTION_RETRY_MIN_SECONDS, self.lag_ewma)
+        return min(ATTRIBUTION_RETRY_MAX_SECONDS, base * (2 ** (attempts - 1)))
+
+    def submit(self, guild: discord.Guild) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(_PendingJoin(future))
+        self._ensure_drain(guild)
+        return future
+
+    def request_snapshot(self, guild: discord.Guild) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.snapshots.append(future)
+        self._ensure_drain(guild)
+        return future
+
+    def _ensure_drain(self, guild: discord.Guild) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._drain(guild))
+
+    async def _drain(self, guild: discord.Guild) -> None:
+        await asyncio.sleep(ATTRIBUTION_BATCH_WINDOW_SECONDS)
+        while self.pending or self.snapshots:
+            batch, self.pending = self.pending, []
+            snapshots, self.snapshots = self.snapshots, []
+            try:
+                invites, unknown = await fetch_tracked_invites(guild)
+                claims, written = await _claim_invite_uses(guild, invites, unknown=unknown)
+            except Exception as e:
+                for f in [p.future for p in batch] + snapshots:
+                    if not f.done():
+                        f.set_exception(e)
                 continue
 
-            # Prefer stored_inviter_id (staff who ran /invite) over Discord inviter (bot)
-            discord_inviter_id = inv.inviter.id if inv.inviter else None
-            effective_inviter_id = stored_inviter_id if stored_inviter_id is not None else discord_inviter_id
-
-            if best is None or delta > best["delta"]:
-                best = {
-                    "code": code,
-                    "inviter_id": effective_inviter_id,
-                    "before": before,
-                    "after": after,
-                    "delta": delta,
-                }
-
-        # Refresh baseline (but DO NOT overwrite inviter_id if we already stored staff creator)
-        now = _now_iso()
-        for inv in invites:
-            inviter_id = inv.inviter.id if inv.inviter else None
-            created_at = inv.created_at.isoformat() if inv.created_at else None
-            uses = inv.uses or 0
-
-            await db.execute(
-                UPSERT_BASELINE_SQL,
-                (guild.id, inv.code, uses, inviter_id, created_at, now),
-            )
-        await db.commit()
-
-    if best is None:
-        return None
+            if snapshots:
+                _rebuild_owner_index(guild.id, invites)
+                for f in snapshots:
+                    if not f.done():
+                        f.set_result(written)
 
-    return {
-        "code": best["code"],
-        "inviter_id": best["inviter_id"],
-        "before": best["before"],
-        "after": best["after"],
-    }
+            now = time.monotonic()
+            for p, claim in zip(batch, claims):
+                self.lag_ewma = 0.8 * self.lag_ewma + 0.2 * (now - p.submitted_at)
+                if not p.future.done():
+                    p.future.set_result(claim)
+
+            retry: list[_PendingJoin] = []
+            for p in batch[len(claims):]:
+                if p.attempts < ATTRIBUTION_MAX_RETRIES:
+                    p.attempts += 1
+                    retry.append(p)
+                elif not p.future.done():
+                    p.future.set_result(None)
+
+            if retry:
+                # Discord can lag a moment behind the join event; older joins keep their place in line
+                self.pending = retry + self.pending
+                await asyncio.sleep(self._retry_delay(retry[0].attempts))
+            elif self.pending:
+                await asyncio.sleep(ATTRIBUTION_BATCH_WINDOW_SECONDS)
+
+
+_COORDINATORS: dict[int, _AttributionCoordinator] = {}
+
+
+def _coordinator(guild_id: int) -> _AttributionCoordinator:
+    coordinator = _COORDINATORS.get(guild_id)
+    if coordinator is None:
+        coordinator = _COORDINATORS[guild_id] = _AttributionCoordinator()
+    return coordinator
 
 
 async def detect_used_invite(guild: discord.Guild) -> dict | None:
-    first = await _detect_used_invite_once(guild)
-    if first is not None:
-        return first
-
-    await asyncio.sleep(1.0)
-    return await _detect_used_invite_once(guild)
-
-
-async def log_join_event(*, guild_id: int, member: discord.Member, invite_info: dict | None) -> None:
-    async with connect() as db:
-        await db.execute(
-            """
-            INSERT INTO invite_join_log (
-              guild_id, member_id, member_tag, joined_at,
-              invite_code, inviter_id, uses_before, uses_after
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                guild_id,
-                member.id,
-                str(member),
-                _now_iso(),
-                (invite_info["code"] if invite_info else None),
-                (invite_info["inviter_id"] if invite_info else None),
-                (invite_info["before"] if invite_info else None),
-                (invite_info["after"] if invite_info else None),
-            ),
-        )
-        await db.commit()
+    return await _coordinator(guild.id).submit(guild)
+
+
+async def log_join_event(*, guild_id: int, member: discord.Member, invite_info: dict | None) -> int:
+    """Insert the join row (invite_info may be None while attribution is pending). Returns the row id."""
+    return await get_store().add_join(
+        guild_id=guild_id,
+        member_id=member.id,
+        member_tag=str(member),
+        joined_at=_now_iso(),
+        invite_code=(invite_info["code"] if invite_info else None),
+        inviter_id=(invite_info["inviter_id"] if invite_info else None),
+        uses_before=(invite_info["before"] if invite_info else None),
+        uses_after=(invite_info["after"] if invite_info else None),
+    )
+
+
+async def record_join_attribution(row_id: int, invite_info: dict | None) -> None:
+    """Finalize a join row (invite_info None = unknown) and count it in the daily invite rollups."""
+    await get_store().set_join_invite(
+        row_id,
+        invite_code=(invite_info["code"] if invite_info else None),
+        inviter_id=(invite_info["inviter_id"] if invite_info else None),
+        uses_before=(invite_info["before"] if invite_info else None),
+        uses_after=(invite_info["after"] if invite_info else None),
+    )
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from collections import deque
+
+# Each on_member_join stage gets its own timeout; a stuck stage never holds up the others
+JOIN_STAGE_TIMEOUT_SECONDS = 10.0
+# Invite attribution may retry a few times before giving up, so it gets a longer budget
+JOIN_ATTRIBUTION_TIMEOUT_SECONDS = 30.0
+# Recent joins kept per stage for /bot_info
+JOIN_STAGE_SAMPLES = 200
+
+# stage -> recent ms from the join event to the stage finishing
+JOIN_STAGE_TIMINGS: dict[str, deque[float]] = {}
+
+
+def _record_stage(name: str, ms: float) -> None:
+    samples = JOIN_STAGE_TIMINGS.get(name)
+    if samples is None:
+        samples = JOIN_STAGE_TIMINGS[name] = deque(maxlen=JOIN_STAGE_SAMPLES)
+    samples.append(ms)
+
+
+async def run_stage(name: str, coro, *, started_at: float, timeout: float = JOIN_STAGE_TIMEOUT_SECONDS):
+    """
+    Run one join stage under its own timeout and return its result, or None if it failed.
+    Failures are logged here and never raised, so sibling stages in the same TaskGroup keep running.
+    started_at is the perf_counter() value taken when the join event arrived.
+    """
+    try:
+        async with asyncio.timeout(timeout):
+            return await coro
+    except TimeoutError:
+        print(f"[join] Stage {name} timed out after {timeout:g}s")
+    except Exception as e:
+        print(f"[join] Stage {name} failed: {type(e).__name__}: {e}")
+    finally:
+        _record_stage(name, (time.perf_counter() - started_at) * 1000)
+    return None
+
+
+def join_stage_stats() -> list[dict]:
+    """Per-stage join-to-done latency: name, count, p50_ms, p95_ms, max_ms."""
+    out = []
+    for name, samples in JOIN_STAGE_TIMINGS.items():
+        values = sorted(samples)
+        n = len(values)
+        if not n:
+            continue
+        out.append({
+            "name": name,
+            "count": n,
+            "p50_ms": values[n // 2],
+            "p95_ms": values[min(n - 1, int(n * 0.95))],
+            "max_ms": values[-1],
+        })
+    return out
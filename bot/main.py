@@ -1,6 +1,7 @@
 import asyncio
 import datetime as dt
 import re
+import time
 
 import discord
 from discord.ext import commands
@@ -9,15 +10,28 @@ from .config import (
     TOKEN,
     ALLOWED_USER_IDS,
     VISITOR_ROLE_ID,
-    SS_VOD_ROLE_ID,
-    EXPIRED_ROLE_ID,
-    SS_VOD_ROLE_SYNC_DELAY_SECONDS,
-    AUDIT_LOG_CHANNEL_ID,
 )
 from .views import CheckStatusPanelView
-from .helpers import send_audit_embed
-from .db import ensure_db
-from .invite_tracking import snapshot_invites_to_db, detect_used_invite, log_join_event
+from .channels import forget_channel, invalidate_channel
+from .audit_webhook import resume_spilled, shutdown as shutdown_webhook
+from .audit_archive import flush_archive
+from .helpers import send_audit_embed, edit_audit_embed
+from .storage import get_store
+from .invite_tracking import (
+    prime_invite_baselines,
+    detect_used_invite,
+    log_join_event,
+    record_join_attribution,
+    handle_invite_create,
+    handle_invite_delete,
+    flush_all_baseline_writes,
+)
+from .join_pipeline import JOIN_ATTRIBUTION_TIMEOUT_SECONDS, run_stage
+from . import raid_mode
+from . import member_stats
+from . import role_rules
+from .retention import start_retention_task
+from .backup import start_backup_task
 
 # commands
 from .commands import checkme, check, check_panel, list_roles, purge, bot_info, give_creds, test_purge_dm, whois, serverinfo
@@ -31,18 +45,37 @@ from .commands import silent_ping
 from .commands import remove_all_pending
 from .commands import extend_creds
 from .commands import announce
+from .commands import db_stats
+from .commands import invite_stats
+from .commands import audit_search
+from .commands import join_stats
 
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+class PurgeBot(commands.Bot):
+    async def close(self):
+        # Persist write-behind state before the loop goes away
+        await flush_all_baseline_writes()
+        await flush_archive()
+        await super().close()
+        await shutdown_webhook()
+
+
+bot = PurgeBot(command_prefix="!", intents=intents)
 
 bot.version = "modular-v1"
 
 NEW_ACCOUNT_WARNING_DAYS = 90
 NEW_ACCOUNT_WARNING_ROLE_ID = 1457561998530318478
 
+# Startup invite priming runs beside command sync; keep a reference so it isn't garbage-collected
+_INVITE_PRIME_TASK: asyncio.Task | None = None
+# Fire-and-forget tasks (deferred invite attribution, ...) held until they finish
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
 PLEX_LINK_RE = re.compile(
     r"(?<!<)https?://(?:www\.)?plex\.tv/\S+(?!>)",
     re.IGNORECASE,
@@ -150,91 +183,24 @@ async def _maybe_delete_pin_system_message(message: discord.Message) -> None:
 async def _send_new_account_warning_ping(guild: discord.Guild, embed: discord.Embed) -> None:
     """
     Send the new-account warning with a role ping above the embed, if the audit channel exists.
-    Falls back to the normal audit helper if we can't send directly.
+    Falls back to a plain audit embed if the ping message can't be sent.
     """
-    if not AUDIT_LOG_CHANNEL_ID:
-        await send_audit_embed(guild, embed)
-        return
-
-    channel = guild.get_channel(AUDIT_LOG_CHANNEL_ID)
-    if channel is None:
-        try:
-            fetched = await guild.fetch_channel(AUDIT_LOG_CHANNEL_ID)
-            channel = fetched
-        except Exception:
-            channel = None
-
-    if isinstance(channel, discord.TextChannel):
-        try:
-            await channel.send(
-                content=f"<@&{NEW_ACCOUNT_WARNING_ROLE_ID}>",
-                embed=embed,
-                allowed_mentions=discord.AllowedMentions(roles=True),
-            )
-            return
-        except discord.Forbidden:
-            pass
-        except discord.HTTPException:
-            pass
-
-    await send_audit_embed(guild, embed)
-
-
-async def _sync_subscriber_roles(member: discord.Member, *, ss_vod_should_exist: bool) -> None:
-    """
-        After a short delay, enforce:
-            - if SS VOD exists -> remove Expired
-            - if SS VOD does not exist -> add Expired
-    Re-checks member roles after the delay before changing anything.
-    """
-    if member.bot:
-        return
-
-    if not SS_VOD_ROLE_ID or not EXPIRED_ROLE_ID:
-        return
-
-    await asyncio.sleep(SS_VOD_ROLE_SYNC_DELAY_SECONDS)
-
-    guild = member.guild
-    refreshed = guild.get_member(member.id)
-    if refreshed is None:
-        try:
-            refreshed = await guild.fetch_member(member.id)
-        except Exception:
-            return
-
-    ss_vod_role = guild.get_role(SS_VOD_ROLE_ID)
-    expired_role = guild.get_role(EXPIRED_ROLE_ID)
-
-    if ss_vod_role is None or expired_role is None:
-        print(
-            f"[subscriber-role-sync] Missing role(s) in guild {guild.id}: "
-            f"ss_vod={SS_VOD_ROLE_ID} expired={EXPIRED_ROLE_ID}"
-        )
-        return
-
-    role_ids = {r.id for r in refreshed.roles}
-    has_ss_vod = SS_VOD_ROLE_ID in role_ids
-    has_expired = EXPIRED_ROLE_ID in role_ids
-
-    try:
-        if ss_vod_should_exist:
-            if has_ss_vod and has_expired:
-                await refreshed.remove_roles(expired_role, reason="SS VOD gained; removing Expired")
-        else:
-            if not has_ss_vod and not has_expired:
-                await refreshed.add_roles(expired_role, reason="SS VOD lost; adding Expired")
-    except discord.Forbidden:
-        print(
-            f"[subscriber-role-sync] Missing permissions / hierarchy issue in guild {guild.id} "
-            f"for member {refreshed.id}"
-        )
-    except Exception as e:
-        print(f"[subscriber-role-sync] Failed in guild {guild.id} for member {refreshed.id}: {type(e).__name__}: {e}")
+    sent = await send_audit_embed(
+        guild,
+        embed,
+        content=f"<@&{NEW_ACCOUNT_WARNING_ROLE_ID}>",
+        allowed_mentions=discord.AllowedMentions(roles=True),
+    )
+    if sent is None:
+        # The first attempt already archived the embed
+        await send_audit_embed(guild, embed, archive=False)
 
 
 @bot.event
 async def on_ready():
+    global _INVITE_PRIME_TASK
+    t0 = time.perf_counter()
+
     if not hasattr(bot, "started_at") or bot.started_at is None:
         bot.started_at = dt.datetime.now(dt.timezone.utc)
 
@@ -247,15 +213,19 @@ async def on_ready():
     bot.add_view(move_server.MoveServerActionView())
     bot.add_view(move_panel.MovePanelView())
 
-    await ensure_db()
+    await get_store().setup()
+    await resume_spilled()
+    await role_rules.load_role_rules()
 
-    for g in bot.guilds:
-        try:
-            await snapshot_invites_to_db(g)
-        except discord.Forbidden:
-            print(f"[invite-tracking] Missing permissions to read invites in guild {g.id}")
-        except Exception as e:
-            print(f"[invite-tracking] Snapshot failed in guild {g.id}: {type(e).__name__}: {e}")
+    # Invite priming runs in the background so command sync doesn't wait on it.
+    # Re-run on every ready: invite events may have been missed while disconnected.
+    if _INVITE_PRIME_TASK is None or _INVITE_PRIME_TASK.done():
+        _INVITE_PRIME_TASK = asyncio.create_task(prime_invite_baselines(list(bot.guilds)))
+
+    start_retention_task(bot)
+    start_backup_task(bot)
+    invite_cmd.start_invite_pool_task(bot)
+    role_rules.start_role_sweep_task(bot)
 
     try:
         synced = await bot.tree.sync()
@@ -263,49 +233,18 @@ async def on_ready():
     except Exception as e:
         print("Command sync failed:", e)
 
+    print(f"[startup] Ready in {time.perf_counter() - t0:.1f}s (invite priming continues in the background)")
 
-@bot.event
-async def on_member_join(member: discord.Member):
-    guild = member.guild
-
-    # Auto-assign Member role
-    try:
-        role = guild.get_role(VISITOR_ROLE_ID)
-        if role is None:
-            print(f"[auto-role] Role {VISITOR_ROLE_ID} not found in guild {guild.id}")
-        else:
-            await member.add_roles(role, reason="Auto-assign Member role on join")
-    except discord.Forbidden:
-        print(f"[auto-role] Missing permissions / role hierarchy to assign {VISITOR_ROLE_ID} in guild {guild.id}")
-    except Exception as e:
-        print(f"[auto-role] Failed to assign role: {type(e).__name__}: {e}")
-
-    # Invite tracking + logging
-    invite_info = None
-    unknown_reason = None
-
-    try:
-        invite_info = await detect_used_invite(guild)
-        if invite_info is None:
-            unknown_reason = "unknown (no invite delta detected — vanity/expired/race)"
-    except discord.Forbidden:
-        unknown_reason = "unknown (missing permission to read invites — give bot Manage Server)"
-    except Exception as e:
-        unknown_reason = f"unknown (invite check error: {type(e).__name__})"
-
-    try:
-        await log_join_event(guild_id=guild.id, member=member, invite_info=invite_info)
-    except Exception as e:
-        print(f"[invite-tracking] Failed to log join: {type(e).__name__}: {e}")
-
-    # Account age check
-    created_at = _ensure_utc(member.created_at)
-    is_new_account = False
-    if created_at is not None:
-        account_age = _utc_now() - created_at
-        is_new_account = account_age <= dt.timedelta(days=NEW_ACCOUNT_WARNING_DAYS)
 
-    # Standard join log
+def _build_join_embed(
+    member: discord.Member,
+    *,
+    created_at: dt.datetime | None,
+    is_new_account: bool,
+    invite_info: dict | None,
+    invite_status: str | None,
+) -> discord.Embed:
+    """Standard join log embed. invite_status is shown when there is no invite_info (pending or unknown)."""
     embed = discord.Embed(
         title="Member joined",
         description=f"{member} ({member.id}) joined.",
@@ -319,12 +258,17 @@ async def on_member_join(member: discord.Member):
     )
 
     if invite_info:
-        inviter = f"<@{invite_info['inviter_id']}>" if invite_info.get("inviter_id") else "unknown"
+        if invite_info.get("vanity"):
+            inviter = "vanity URL"
+        elif invite_info.get("inviter_id"):
+            inviter = f"<@{invite_info['inviter_id']}>"
+        else:
+            inviter = "unknown"
         embed.add_field(name="Invite", value=f"`{invite_info['code']}`", inline=True)
         embed.add_field(name="Inviter", value=inviter, inline=True)
         embed.add_field(name="Uses", value=f"{invite_info['before']} → {invite_info['after']}", inline=True)
     else:
-        embed.add_field(name="Invite", value=unknown_reason or "unknown", inline=False)
+        embed.add_field(name="Invite", value=invite_status or "unknown", inline=False)
 
     if is_new_account:
         embed.add_field(
@@ -333,29 +277,160 @@ async def on_member_join(member: discord.Member):
             inline=False,
         )
 
-    await send_audit_embed(guild, embed)
+    return embed
 
-    # Separate caution warning for new accounts
-    if is_new_account:
-        warning = discord.Embed(
-            title="New account join warning",
-            description=(
-                f"{member.mention} ({member} / {member.id}) joined with a recently created account.\n"
-                f"Please use caution."
-            ),
-            color=discord.Color.orange(),
+
+async def _detect_join_invite(guild: discord.Guild) -> tuple[dict | None, str | None]:
+    """Returns (invite_info, unknown_reason); exactly one of them is set."""
+    try:
+        invite_info = await detect_used_invite(guild)
+    except discord.Forbidden:
+        return None, "unknown (missing permission to read invites — give bot Manage Server)"
+    except Exception as e:
+        return None, f"unknown (invite check error: {type(e).__name__})"
+    if invite_info is None:
+        return None, "unknown (no invite delta detected — vanity/expired/race)"
+    return invite_info, None
+
+
+async def _resolve_join_attribution(
+    member: discord.Member,
+    *,
+    started_at: float,
+    created_at: dt.datetime | None,
+    is_new_account: bool,
+    log_task: asyncio.Task,
+    audit_task: asyncio.Task | None,
+) -> None:
+    """Deferred half of on_member_join: attribute the invite, fill in the join row, edit the audit embed."""
+    result = await run_stage(
+        "attribution",
+        _detect_join_invite(member.guild),
+        started_at=started_at,
+        timeout=JOIN_ATTRIBUTION_TIMEOUT_SECONDS,
+    )
+    invite_info, unknown_reason = result or (None, "unknown (invite check timed out)")
+    raid_mode.note_attribution(member, invite_info)
+
+    # Both stages swallow their own failures, so these just hand back None.
+    # There is no audit stage in raid mode; the join goes into the raid summary instead.
+    row_id = await log_task
+    audit_message = await audit_task if audit_task is not None else None
+
+    if row_id is not None:
+        try:
+            await record_join_attribution(row_id, invite_info)
+        except Exception as e:
+            print(f"[invite-tracking] Failed to record attribution: {type(e).__name__}: {e}")
+
+    embed = _build_join_embed(
+        member,
+        created_at=created_at,
+        is_new_account=is_new_account,
+        invite_info=invite_info,
+        invite_status=unknown_reason,
+    )
+    await edit_audit_embed(audit_message, embed)
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+
+async def _grant_join_role(member: discord.Member) -> None:
+    guild = member.guild
+    try:
+        role = guild.get_role(VISITOR_ROLE_ID)
+        if role is None:
+            print(f"[auto-role] Role {VISITOR_ROLE_ID} not found in guild {guild.id}")
+        else:
+            await member.add_roles(role, reason="Auto-assign Member role on join")
+    except discord.Forbidden:
+        print(f"[auto-role] Missing permissions / role hierarchy to assign {VISITOR_ROLE_ID} in guild {guild.id}")
+
+
+async def _send_new_account_warning(member: discord.Member, created_at: dt.datetime | None) -> None:
+    warning = discord.Embed(
+        title="New account join warning",
+        description=(
+            f"{member.mention} ({member} / {member.id}) joined with a recently created account.\n"
+            f"Please use caution."
+        ),
+        color=discord.Color.orange(),
+    )
+    warning.add_field(
+        name="Account created",
+        value=f"{_ts_full(created_at)}\n({_ts_rel(created_at)})",
+        inline=False,
+    )
+    warning.add_field(
+        name="Threshold",
+        value=f"{NEW_ACCOUNT_WARNING_DAYS} days or less",
+        inline=False,
+    )
+    await _send_new_account_warning_ping(member.guild, warning)
+
+
+@bot.event
+async def on_member_join(member: discord.Member):
+    started_at = time.perf_counter()
+    guild = member.guild
+
+    # Account age check
+    created_at = _ensure_utc(member.created_at)
+    is_new_account = False
+    if created_at is not None:
+        account_age = _utc_now() - created_at
+        is_new_account = account_age <= dt.timedelta(days=NEW_ACCOUNT_WARNING_DAYS)
+
+    # Standard join log (posted right away, edited once attribution resolves)
+    embed = _build_join_embed(
+        member,
+        created_at=created_at,
+        is_new_account=is_new_account,
+        invite_info=None,
+        invite_status="resolving…",
+    )
+
+    # During a join storm, per-join audit posts are replaced by raid_mode's periodic summaries
+    in_raid = raid_mode.note_join(member, created_at=created_at, is_new_account=is_new_account)
+
+    # Independent stages run concurrently. run_stage applies a per-stage timeout and swallows
+    # failures, so one slow or failing stage never cancels the others.
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(run_stage("role", _grant_join_role(member), started_at=started_at))
+        log_task = tg.create_task(
+            run_stage(
+                "log",
+                log_join_event(guild_id=guild.id, member=member, invite_info=None),
+                started_at=started_at,
+            )
         )
-        warning.add_field(
-            name="Account created",
-            value=f"{_ts_full(created_at)}\n({_ts_rel(created_at)})",
-            inline=False,
+        tg.create_task(
+            run_stage("stats", member_stats.record_join(member, is_new_account=is_new_account), started_at=started_at)
         )
-        warning.add_field(
-            name="Threshold",
-            value=f"{NEW_ACCOUNT_WARNING_DAYS} days or less",
-            inline=False,
+        audit_task = None
+        if not in_raid:
+            audit_task = tg.create_task(run_stage("audit", send_audit_embed(guild, embed), started_at=started_at))
+        if is_new_account and not in_raid:
+            tg.create_task(
+                run_stage("warning", _send_new_account_warning(member, created_at), started_at=started_at)
+            )
+
+        # Attribution starts now too, but can take several retries, so it finishes outside the group
+        _spawn(
+            _resolve_join_attribution(
+                member,
+                started_at=started_at,
+                created_at=created_at,
+                is_new_account=is_new_account,
+                log_task=log_task,
+                audit_task=audit_task,
+            )
         )
-        await _send_new_account_warning_ping(guild, warning)
 
 
 @bot.event
@@ -386,32 +461,60 @@ async def on_member_remove(member: discord.Member):
         inline=False,
     )
 
+    await member_stats.record_leave(member)
     await send_audit_embed(guild, embed)
 
 
 @bot.event
-async def on_member_update(before: discord.Member, after: discord.Member):
-    if before.bot or after.bot:
-        return
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    invalidate_channel(channel)
 
-    if not SS_VOD_ROLE_ID or not EXPIRED_ROLE_ID:
-        return
 
-    before_role_ids = {r.id for r in before.roles}
-    after_role_ids = {r.id for r in after.roles}
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    invalidate_channel(after)
 
-    had_ss_vod = SS_VOD_ROLE_ID in before_role_ids
-    has_ss_vod = SS_VOD_ROLE_ID in after_role_ids
 
-    # SS VOD was added
-    if not had_ss_vod and has_ss_vod:
-        asyncio.create_task(_sync_subscriber_roles(after, ss_vod_should_exist=True))
-        return
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    invalidate_channel(channel)
 
-    # SS VOD was removed
-    if had_ss_vod and not has_ss_vod:
-        asyncio.create_task(_sync_subscriber_roles(after, ss_vod_should_exist=False))
-        return
+
+# Threads fire no on_guild_channel_* events, and fetched-only threads aren't in the gateway
+# cache, so the raw events are the only reliable signal
+@bot.event
+async def on_raw_thread_update(payload: discord.RawThreadUpdateEvent):
+    forget_channel(payload.guild_id, payload.thread_id)
+
+
+@bot.event
+async def on_raw_thread_delete(payload: discord.RawThreadDeleteEvent):
+    forget_channel(payload.guild_id, payload.thread_id)
+
+
+@bot.event
+async def on_invite_create(invite: discord.Invite):
+    try:
+        await handle_invite_create(invite)
+    except Exception as e:
+        print(f"[invite-tracking] Failed to record created invite {invite.code}: {type(e).__name__}: {e}")
+
+
+@bot.event
+async def on_invite_delete(invite: discord.Invite):
+    invite_cmd.forget_pooled_invite(invite)
+    try:
+        await handle_invite_delete(invite)
+    except Exception as e:
+        print(f"[invite-tracking] Failed to drop deleted invite {invite.code}: {type(e).__name__}: {e}")
+
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    # Only the roles that changed are looked up in the rule dispatch table; fired rules
+    # wait in the member's debounced reconciliation until the roles settle
+    role_rules.schedule_rules(after, role_rules.rules_for_update(before, after))
+    await role_rules.mark_trigger_gains(before, after)
 
 
 @bot.event
@@ -444,6 +547,10 @@ def load_commands():
     silent_ping.setup(bot)
     extend_creds.setup(bot)
     announce.setup(bot)
+    db_stats.setup(bot)
+    invite_stats.setup(bot)
+    audit_search.setup(bot)
+    join_stats.setup(bot)
 
 
 load_commands()
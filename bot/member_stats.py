@@ -0,0 +1,39 @@
+import datetime as dt
+
+import discord
+
+from .storage import TENURE_BUCKETS, get_store
+
+
+def hour_key(d: dt.datetime) -> str:
+    """member_hourly bucket for a UTC datetime: YYYY-MM-DDTHH"""
+    return d.astimezone(dt.timezone.utc).strftime("%Y-%m-%dT%H")
+
+
+def tenure_bucket(joined_at: dt.datetime | None, left_at: dt.datetime) -> str:
+    if joined_at is None:
+        return "unknown"
+    if joined_at.tzinfo is None:
+        joined_at = joined_at.replace(tzinfo=dt.timezone.utc)
+    seconds = (left_at - joined_at).total_seconds()
+    for name, upper in TENURE_BUCKETS:
+        if upper is not None and seconds < upper:
+            return name
+    return "more"
+
+
+async def record_join(member: discord.Member, *, is_new_account: bool) -> None:
+    now = dt.datetime.now(dt.timezone.utc)
+    await get_store().record_member_join(guild_id=member.guild.id, hour=hour_key(now), new_account=is_new_account)
+
+
+async def record_leave(member: discord.Member) -> None:
+    now = dt.datetime.now(dt.timezone.utc)
+    try:
+        await get_store().record_member_leave(
+            guild_id=member.guild.id,
+            hour=hour_key(now),
+            tenure_bucket=tenure_bucket(member.joined_at, now),
+        )
+    except Exception as e:
+        print(f"[member-stats] Failed to record leave in guild {member.guild.id}: {type(e).__name__}: {e}")
@@ -0,0 +1,173 @@
+import asyncio
+import datetime as dt
+import time
+from collections import deque
+
+import discord
+
+from .config import (
+    RAID_WINDOW_SECONDS,
+    RAID_JOIN_THRESHOLD,
+    RAID_EXIT_THRESHOLD,
+    RAID_SUMMARY_INTERVAL_SECONDS,
+)
+from .helpers import chunk_lines, send_audit_embed
+
+
+class _RaidState:
+    """Per-guild sliding join window, plus the raid-mode summary buffer while raid mode is on."""
+
+    def __init__(self):
+        self.joins: deque[float] = deque()
+        self.active = False
+        self.started_at: dt.datetime | None = None
+        self.total_joins = 0
+        self.new_accounts = 0
+        # member_id -> record, in join order; emptied by each summary
+        self.pending: dict[int, dict] = {}
+        # Members already listed in an earlier summary of this raid
+        self.listed: set[int] = set()
+        self.task: asyncio.Task | None = None
+
+    def rate(self, now: float) -> int:
+        cutoff = now - RAID_WINDOW_SECONDS
+        while self.joins and self.joins[0] < cutoff:
+            self.joins.popleft()
+        return len(self.joins)
+
+
+_RAID_STATES: dict[int, _RaidState] = {}
+
+
+def note_join(member: discord.Member, *, created_at: dt.datetime | None, is_new_account: bool) -> bool:
+    """
+    Count a join toward the guild's rate window, entering raid mode at RAID_JOIN_THRESHOLD.
+    Returns True when raid mode is on; the join is then buffered for the next summary and the
+    caller should skip its per-join audit posts.
+    """
+    guild = member.guild
+    state = _RAID_STATES.get(guild.id)
+    if state is None:
+        state = _RAID_STATES[guild.id] = _RaidState()
+
+    now = time.monotonic()
+    state.joins.append(now)
+    if not state.active and state.rate(now) >= RAID_JOIN_THRESHOLD:
+        state.active = True
+        state.started_at = dt.datetime.now(dt.timezone.utc)
+        state.task = asyncio.create_task(_summary_loop(guild, state))
+        print(f"[raid] Raid mode on in guild {guild.id} ({len(state.joins)} joins in {RAID_WINDOW_SECONDS}s)")
+
+    if not state.active:
+        return False
+
+    state.total_joins += 1
+    record = state.pending.get(member.id)
+    if record is not None:
+        record["joins"] += 1
+    elif member.id not in state.listed:
+        state.pending[member.id] = {
+            "mention": member.mention,
+            "tag": str(member),
+            "id": member.id,
+            "created_at": created_at,
+            "new_account": is_new_account,
+            "invite_code": None,
+            "joins": 1,
+        }
+        if is_new_account:
+            state.new_accounts += 1
+    return True
+
+
+def note_attribution(member: discord.Member, invite_info: dict | None) -> None:
+    """Attach a resolved invite to a raid record that hasn't been summarized yet."""
+    state = _RAID_STATES.get(member.guild.id)
+    record = state.pending.get(member.id) if state is not None else None
+    if record is not None and invite_info:
+        record["invite_code"] = invite_info["code"]
+
+
+def _record_line(r: dict) -> str:
+    line = f"- {r['mention']} ({r['tag']} / `{r['id']}`)"
+    if r["new_account"]:
+        created = f" <t:{int(r['created_at'].timestamp())}:R>" if r["created_at"] else ""
+        line += f" ⚠️ new account{created}"
+    if r["invite_code"]:
+        line += f" via `{r['invite_code']}`"
+    if r["joins"] > 1:
+        line += f" ×{r['joins']}"
+    return line
+
+
+def _take_pending(state: _RaidState) -> list[dict]:
+    records = list(state.pending.values())
+    state.pending.clear()
+    state.listed.update(r["id"] for r in records)
+    return records
+
+
+async def _post_summary(guild: discord.Guild, records: list[dict]) -> None:
+    if not records:
+        return
+    new_count = sum(1 for r in records if r["new_account"])
+    pages = chunk_lines([_record_line(r) for r in records], max_chars=4000)
+    for i, page in enumerate(pages, start=1):
+        title = "Raid mode: joins" + (f" ({i}/{len(pages)})" if len(pages) > 1 else "")
+        embed = discord.Embed(title=title, description=page, color=discord.Color.orange())
+        if i == 1:
+            embed.add_field(name="Members", value=str(len(records)), inline=True)
+            embed.add_field(name="New accounts", value=str(new_count), inline=True)
+        await send_audit_embed(guild, embed)
+
+
+async def _summary_loop(guild: discord.Guild, state: _RaidState) -> None:
+    try:
+        await send_audit_embed(
+            guild,
+            discord.Embed(
+                title="Raid mode on",
+                description=(
+                    f"**{len(state.joins)}** joins in the last {RAID_WINDOW_SECONDS}s.\n"
+                    f"Join and new-account logs are summarized every {RAID_SUMMARY_INTERVAL_SECONDS}s "
+                    f"until the rate drops to {RAID_EXIT_THRESHOLD} or fewer per {RAID_WINDOW_SECONDS}s."
+                ),
+                color=discord.Color.red(),
+            ),
+        )
+        while True:
+            await asyncio.sleep(RAID_SUMMARY_INTERVAL_SECONDS)
+            if state.rate(time.monotonic()) <= RAID_EXIT_THRESHOLD:
+                break
+            await _post_summary(guild, _take_pending(state))
+    except Exception as e:
+        print(f"[raid] Summary loop failed in guild {guild.id}: {type(e).__name__}: {e}")
+    finally:
+        # Leave raid mode and reset synchronously, so a raid that starts while the final summary
+        # is being posted gets a clean state of its own
+        state.active = False
+        records = _take_pending(state)
+        started_at, total_joins, new_accounts = state.started_at, state.total_joins, state.new_accounts
+        state.started_at = None
+        state.total_joins = 0
+        state.new_accounts = 0
+        state.listed.clear()
+
+    print(f"[raid] Raid mode off in guild {guild.id}")
+    try:
+        await _post_summary(guild, records)
+        started = f"<t:{int(started_at.timestamp())}:R>" if started_at else "unknown"
+        await send_audit_embed(
+            guild,
+            discord.Embed(
+                title="Raid mode off",
+                description=(
+                    f"Started: {started}\n"
+                    f"Joins: **{total_joins}**\n"
+                    f"New accounts: **{new_accounts}**"
+                ),
+                color=discord.Color.green(),
+            ),
+        )
+    except Exception as e:
+        print(f"[raid] Final summary failed in guild {guild.id}: {type(e).__name__}: {e}")
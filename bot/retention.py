@@ -0,0 +1,121 @@
+import asyncio
+import datetime as dt
+
+import discord
+
+from .config import (
+    INVITE_JOIN_LOG_RETENTION_DAYS,
+    RETENTION_INTERVAL_SECONDS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_BATCH_PAUSE_SECONDS,
+)
+from .invite_tracking import fetch_tracked_invites
+from .storage import get_store
+
+# Join rows still not finalized this long after logging are counted as-is
+STALE_JOIN_ROLLUP_SECONDS = 60 * 60
+
+# The running retention loop, so a repeated on_ready doesn't start a second one
+_RETENTION_TASK: asyncio.Task | None = None
+
+
+def _cutoff_iso(days: int) -> str:
+    return (dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)).isoformat()
+
+
+async def compact_join_log(guild_id: int, *, cutoff_iso: str) -> int:
+    """
+    Roll join rows older than cutoff_iso into daily per-inviter counts, then delete them.
+    Each batch is its own short transaction so the write lock is never held for long.
+    Returns the number of raw rows removed.
+    """
+    store = get_store()
+    removed = 0
+    while True:
+        n = await store.compact_join_log_batch(guild_id, cutoff_iso=cutoff_iso, limit=RETENTION_BATCH_SIZE)
+        removed += n
+        if n < RETENTION_BATCH_SIZE:
+            break
+        await asyncio.sleep(RETENTION_BATCH_PAUSE_SECONDS)
+    return removed
+
+
+async def rollup_stale_joins(guild_id: int) -> int:
+    """
+    Count join rows that were never finalized (bot restarted mid-attribution, or logged before
+    rollups existed) into the daily rollups, so /invite_stats doesn't miss them.
+    """
+    store = get_store()
+    cutoff_iso = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=STALE_JOIN_ROLLUP_SECONDS)).isoformat()
+    counted = 0
+    while True:
+        n = await store.rollup_stale_joins(guild_id, cutoff_iso=cutoff_iso, limit=RETENTION_BATCH_SIZE)
+        counted += n
+        if n < RETENTION_BATCH_SIZE:
+            break
+        await asyncio.sleep(RETENTION_BATCH_PAUSE_SECONDS)
+    return counted
+
+
+async def prune_invite_baseline(guild: discord.Guild) -> int:
+    """
+    Delete baseline rows for codes that no longer exist in guild.invites() (or as the vanity invite).
+    Stored codes are read before the live fetch so an invite created in between is never pruned.
+    Returns the number of baseline rows removed.
+    """
+    store = get_store()
+    stored = set(await store.load_invite_baseline(guild.id))
+    if not stored:
+        return 0
+
+    invites, unknown = await fetch_tracked_invites(guild)
+    live = {inv.code for inv in invites} | unknown
+    stale = sorted(stored - live)
+
+    removed = 0
+    for i in range(0, len(stale), RETENTION_BATCH_SIZE):
+        removed += await store.delete_invite_baseline(guild.id, stale[i:i + RETENTION_BATCH_SIZE])
+        await asyncio.sleep(RETENTION_BATCH_PAUSE_SECONDS)
+
+    return removed
+
+
+async def run_retention(guilds: list[discord.Guild]) -> None:
+    for g in guilds:
+        try:
+            counted = await rollup_stale_joins(g.id)
+            if counted:
+                print(f"[retention] Counted {counted} unfinalized join row(s) into rollups in guild {g.id}")
+        except Exception as e:
+            print(f"[retention] Stale join rollup failed in guild {g.id}: {type(e).__name__}: {e}")
+
+        if INVITE_JOIN_LOG_RETENTION_DAYS > 0:
+            try:
+                removed = await compact_join_log(g.id, cutoff_iso=_cutoff_iso(INVITE_JOIN_LOG_RETENTION_DAYS))
+                if removed:
+                    print(f"[retention] Rolled up {removed} join row(s) in guild {g.id}")
+            except Exception as e:
+                print(f"[retention] Join log compaction failed in guild {g.id}: {type(e).__name__}: {e}")
+
+        try:
+            pruned = await prune_invite_baseline(g)
+            if pruned:
+                print(f"[retention] Pruned {pruned} stale invite baseline row(s) in guild {g.id}")
+        except discord.Forbidden:
+            print(f"[retention] Missing permissions to read invites in guild {g.id}")
+        except Exception as e:
+            print(f"[retention] Baseline prune failed in guild {g.id}: {type(e).__name__}: {e}")
+
+
+async def _retention_loop(bot) -> None:
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        await run_retention(list(bot.guilds))
+        await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+
+
+def start_retention_task(bot) -> None:
+    global _RETENTION_TASK
+    if _RETENTION_TASK is not None and not _RETENTION_TASK.done():
+        return
+    _RETENTION_TASK = asyncio.create_task(_retention_loop(bot))
@@ -0,0 +1,506 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+
+import discord
+
+from .config import (
+    SS_VOD_ROLE_ID,
+    EXPIRED_ROLE_ID,
+    SS_VOD_ROLE_SYNC_DELAY_SECONDS,
+    ROLE_RULES_JSON,
+    ROLE_SWEEP_INTERVAL_SECONDS,
+    ROLE_SWEEP_START_DELAY_SECONDS,
+    ROLE_SWEEP_ACTION_DELAY_SECONDS,
+    ROLE_SWEEP_MAX_FIXES,
+)
+from .helpers import chunk_lines, send_audit_embed
+from .storage import get_store
+
+EVENTS = ("added", "removed")
+ACTIONS = ("add", "remove")
+
+
+class RoleRule:
+    """When trigger_role_id is `event` ("added"/"removed"), `action` ("add"/"remove") target_role_id after delay_seconds."""
+
+    __slots__ = ("trigger_role_id", "event", "action", "target_role_id", "delay_seconds", "reason")
+
+    def __init__(
+        self,
+        trigger_role_id: int,
+        event: str,
+        action: str,
+        target_role_id: int,
+        delay_seconds: float = 0.0,
+        reason: str | None = None,
+    ):
+        self.trigger_role_id = trigger_role_id
+        self.event = event
+        self.action = action
+        self.target_role_id = target_role_id
+        self.delay_seconds = delay_seconds
+        self.reason = reason or f"Role {trigger_role_id} {event}; {action} role {target_role_id}"
+
+    def key(self) -> tuple[int, str, str, int]:
+        return (self.trigger_role_id, self.event, self.action, self.target_role_id)
+
+
+# (role_id, "added"/"removed") -> rules to run; rebuilt by load_role_rules()
+_DISPATCH: dict[tuple[int, str], tuple[RoleRule, ...]] = {}
+
+
+def default_rules() -> list[RoleRule]:
+    """SS VOD gained -> remove Expired; SS VOD lost -> add Expired."""
+    if not SS_VOD_ROLE_ID or not EXPIRED_ROLE_ID:
+        return []
+    return [
+        RoleRule(SS_VOD_ROLE_ID, "added", "remove", EXPIRED_ROLE_ID, SS_VOD_ROLE_SYNC_DELAY_SECONDS, "SS VOD gained; removing Expired"),
+        RoleRule(SS_VOD_ROLE_ID, "removed", "add", EXPIRED_ROLE_ID, SS_VOD_ROLE_SYNC_DELAY_SECONDS, "SS VOD lost; adding Expired"),
+    ]
+
+
+def _rule_from_dict(d: dict, source: str) -> RoleRule | None:
+    try:
+        rule = RoleRule(
+            int(d["trigger_role_id"]),
+            str(d["event"]),
+            str(d["action"]),
+            int(d["target_role_id"]),
+            float(d.get("delay_seconds") or 0),
+            d.get("reason"),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"[role-rules] Skipping malformed rule from {source}: {d!r} ({type(e).__name__}: {e})")
+        return None
+    if rule.event not in EVENTS or rule.action not in ACTIONS or rule.trigger_role_id == rule.target_role_id:
+        print(f"[role-rules] Skipping invalid rule from {source}: {d!r}")
+        return None
+    return rule
+
+
+def _config_rules() -> list[RoleRule]:
+    if not ROLE_RULES_JSON:
+        return []
+    try:
+        entries = json.loads(ROLE_RULES_JSON)
+    except ValueError as e:
+        print(f"[role-rules] ROLE_RULES_JSON is not valid JSON: {e}")
+        return []
+    if not isinstance(entries, list):
+        print("[role-rules] ROLE_RULES_JSON must be a JSON list of rules")
+        return []
+    rules = []
+    for e in entries:
+        if not isinstance(e, dict):
+            print(f"[role-rules] Skipping malformed rule from ROLE_RULES_JSON: {e!r}")
+            continue
+        # Config uses the short names from .env.example
+        rule = _rule_from_dict(
+            {
+                "trigger_role_id": e.get("role"),
+                "event": e.get("on"),
+                "action": e.get("action"),
+                "target_role_id": e.get("target"),
+                "delay_seconds": e.get("delay"),
+                "reason": e.get("reason"),
+            },
+            "ROLE_RULES_JSON",
+        )
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+def compile_rules(rules: list[RoleRule]) -> dict[tuple[int, str], tuple[RoleRule, ...]]:
+    """Index rules by (trigger role, event); a rule listed twice (same trigger/action/target) keeps its first copy."""
+    seen: set[tuple[int, str, str, int]] = set()
+    dispatch: dict[tuple[int, str], list[RoleRule]] = {}
+    for rule in rules:
+        if rule.key() in seen:
+            continue
+        seen.add(rule.key())
+        dispatch.setdefault((rule.trigger_role_id, rule.event), []).append(rule)
+    return {k: tuple(v) for k, v in dispatch.items()}
+
+
+async def load_role_rules() -> None:
+    """Built-in, ROLE_RULES_JSON and role_rules table rules, in that order. Called from on_ready."""
+    global _DISPATCH
+    rules = default_rules() + _config_rules()
+    try:
+        rules += [r for r in (_rule_from_dict(d, "role_rules table") for d in await get_store().list_role_rules()) if r]
+    except Exception as e:
+        print(f"[role-rules] Failed to load rules from storage: {type(e).__name__}: {e}")
+    _DISPATCH = compile_rules(rules)
+    print(f"[role-rules] Loaded {len(active_rules())} rule(s)")
+
+
+def active_rules() -> list[RoleRule]:
+    return [rule for rules in _DISPATCH.values() for rule in rules]
+
+
+def _role_ids(member: discord.Member) -> set[int]:
+    return {r.id for r in member.roles}
+
+
+def rules_for_update(before: discord.Member, after: discord.Member) -> list[RoleRule]:
+    """Rules triggered by the roles that changed between before and after (usually none)."""
+    if not _DISPATCH or after.bot:
+        return []
+    before_ids, after_ids = _role_ids(before), _role_ids(after)
+    # Nickname/avatar/etc. updates leave the roles unchanged
+    if before_ids == after_ids:
+        return []
+
+    fired: list[RoleRule] = []
+    for role_id in after_ids - before_ids:
+        fired.extend(_DISPATCH.get((role_id, "added"), ()))
+    for role_id in before_ids - after_ids:
+        fired.extend(_DISPATCH.get((role_id, "removed"), ()))
+    return fired
+
+
+async def mark_trigger_gains(before: discord.Member, after: discord.Member) -> None:
+    """
+    Record a live gain of a role that has a "removed" rule, so the sweep can still apply the rule
+    if the role is later lost while the bot isn't watching.
+    """
+    if not _DISPATCH or after.bot:
+        return
+    gained = _role_ids(after) - _role_ids(before)
+    for role_id in gained:
+        if (role_id, "removed") in _DISPATCH:
+            await _mark_seen(after.guild.id, role_id, [after.id])
+
+
+async def _apply_rule(member: discord.Member, rule: RoleRule, role_ids: set[int]) -> None:
+    """Apply the rule if its trigger still holds and the target role isn't already in the wanted state."""
+    guild = member.guild
+    if (rule.trigger_role_id in role_ids) != (rule.event == "added"):
+        return
+    has_target = rule.target_role_id in role_ids
+    if has_target == (rule.action == "add"):
+        return
+
+    target = guild.get_role(rule.target_role_id)
+    if target is None:
+        print(f"[role-rules] Missing role {rule.target_role_id} in guild {guild.id}")
+        return
+
+    try:
+        if rule.action == "add":
+            await member.add_roles(target, reason=rule.reason)
+            role_ids.add(rule.target_role_id)
+        else:
+            await member.remove_roles(target, reason=rule.reason)
+            role_ids.discard(rule.target_role_id)
+    except discord.Forbidden:
+        print(f"[role-rules] Missing permissions / hierarchy issue in guild {guild.id} for member {member.id}")
+    except Exception as e:
+        print(f"[role-rules] Failed in guild {guild.id} for member {member.id}: {type(e).__name__}: {e}")
+
+
+# --------------------
+# Debounced per-member reconciliation
+# --------------------
+class _PendingSync:
+    """Rules a member's recent role transitions fired, waiting for the transitions to settle."""
+
+    __slots__ = ("guild", "member_id", "rules", "due")
+
+    def __init__(self, guild: discord.Guild, member_id: int):
+        self.guild = guild
+        self.member_id = member_id
+        # rule.key() -> rule, so a role flapping back and forth queues each rule once
+        self.rules: dict[tuple[int, str, str, int], RoleRule] = {}
+        self.due = 0.0
+
+
+# (guild_id, member_id) -> the member's one pending reconciliation
+_PENDING: dict[tuple[int, int], _PendingSync] = {}
+# (due, seq, key) min-heap; entries whose due no longer matches _PENDING are stale and skipped
+_DUE: list[tuple[float, int, tuple[int, int]]] = []
+_DUE_SEQ = itertools.count()
+_WAKE = asyncio.Event()
+_SCHEDULER_TASK: asyncio.Task | None = None
+# Running reconciliations, held so they can't be garbage-collected mid-await
+_RECONCILE_TASKS: set[asyncio.Task] = set()
+_SWEEP_TASK: asyncio.Task | None = None
+
+# Running totals for /bot_info
+SYNC_STATS = {"transitions": 0, "reconciled": 0, "sweep_fixed": 0}
+
+
+def schedule_rules(member: discord.Member, rules: list[RoleRule]) -> None:
+    """
+    Queue rules fired by a role transition. Each member has at most one pending reconciliation;
+    a new transition adds its rules and restarts the wait (the longest delay among the queued
+    rules), so a flapping role settles before anything is applied.
+    """
+    if not rules:
+        return
+    key = (member.guild.id, member.id)
+    pending = _PENDING.get(key)
+    if pending is None:
+        pending = _PENDING[key] = _PendingSync(member.guild, member.id)
+    for rule in rules:
+        pending.rules[rule.key()] = rule
+    pending.due = time.monotonic() + max(r.delay_seconds for r in pending.rules.values())
+    heapq.heappush(_DUE, (pending.due, next(_DUE_SEQ), key))
+    SYNC_STATS["transitions"] += 1
+
+    _WAKE.set()
+    _ensure_scheduler()
+
+
+def pending_syncs() -> int:
+    return len(_PENDING)
+
+
+def _ensure_scheduler() -> None:
+    global _SCHEDULER_TASK
+    if _SCHEDULER_TASK is None or _SCHEDULER_TASK.done():
+        _SCHEDULER_TASK = asyncio.create_task(_scheduler_loop())
+
+
+async def _scheduler_loop() -> None:
+    while True:
+        if not _DUE:
+            _WAKE.clear()
+            await _WAKE.wait()
+            continue
+
+        due, _, key = _DUE[0]
+        wait = due - time.monotonic()
+        if wait > 0:
+            # Woken early by a new transition, which may have queued an earlier due time
+            _WAKE.clear()
+            try:
+                await asyncio.wait_for(_WAKE.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        heapq.heappop(_DUE)
+        pending = _PENDING.get(key)
+        if pending is None or pending.due != due:
+            continue
+        del _PENDING[key]
+
+        task = asyncio.create_task(_reconcile(pending))
+        _RECONCILE_TASKS.add(task)
+        task.add_done_callback(_RECONCILE_TASKS.discard)
+
+
+async def _reconcile(pending: _PendingSync) -> None:
+    """Re-read the member once, then apply each queued rule whose trigger still holds."""
+    guild = pending.guild
+    member = guild.get_member(pending.member_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(pending.member_id)
+        except Exception:
+            return
+
+    role_ids = _role_ids(member)
+    for rule in pending.rules.values():
+        await _apply_rule(member, rule, role_ids)
+
+    # The member held these roles before losing them. If a "removed" rule couldn't be applied the
+    # sweep retries it; once it has been, the sweep must leave staff's later changes alone.
+    for role_id in {r.trigger_role_id for r in pending.rules.values() if r.event == "removed"}:
+        if _removed_rules_settled(role_ids, role_id):
+            await _forget_seen(guild.id, role_id, [member.id])
+        elif role_id not in role_ids:
+            await _mark_seen(guild.id, role_id, [member.id])
+    SYNC_STATS["reconciled"] += 1
+
+
+async def _mark_seen(guild_id: int, role_id: int, member_ids: list[int]) -> None:
+    try:
+        await get_store().mark_role_seen(guild_id=guild_id, role_id=role_id, member_ids=member_ids)
+    except Exception as e:
+        print(f"[role-rules] Failed to record role {role_id} holders in guild {guild_id}: {type(e).__name__}: {e}")
+
+
+async def _forget_seen(guild_id: int, role_id: int, member_ids: list[int]) -> None:
+    try:
+        await get_store().forget_role_seen(guild_id=guild_id, role_id=role_id, member_ids=member_ids)
+    except Exception as e:
+        print(f"[role-rules] Failed to forget role {role_id} holders in guild {guild_id}: {type(e).__name__}: {e}")
+
+
+def _removed_rules_settled(role_ids: set[int], trigger_role_id: int) -> bool:
+    """True if the member lacks trigger_role_id and every "removed" rule on it already has its target in the wanted state."""
+    if trigger_role_id in role_ids:
+        return False
+    return all(
+        (rule.target_role_id in role_ids) == (rule.action == "add")
+        for rule in _DISPATCH.get((trigger_role_id, "removed"), ())
+    )
+
+
+# --------------------
+# Periodic sweep
+# --------------------
+def _member_fix(
+    role_ids: set[int],
+    member_id: int,
+    rules: list[RoleRule],
+    seen: dict[int, set[int]],
+) -> tuple[set[int], set[int], list[str]] | None:
+    """
+    (roles to add, roles to remove, reasons) for a member whose roles break a rule, else None.
+    An "added" rule holds while the member has the trigger role; a "removed" rule holds while
+    they lack it, but only if they were seen with it and the rule hasn't been applied since.
+    """
+    adds: set[int] = set()
+    removes: set[int] = set()
+    reasons: list[str] = []
+    for rule in rules:
+        if rule.event == "added":
+            holds = rule.trigger_role_id in role_ids
+        else:
+            holds = rule.trigger_role_id not in role_ids and member_id in seen.get(rule.trigger_role_id, ())
+        if not holds:
+            continue
+        want = rule.action == "add"
+        if (rule.target_role_id in role_ids) != want:
+            (adds if want else removes).add(rule.target_role_id)
+            reasons.append(rule.reason)
+    # Two rules disagreeing about the same role: leave it alone
+    conflicts = adds & removes
+    adds -= conflicts
+    removes -= conflicts
+    if not adds and not removes:
+        return None
+    return adds, removes, reasons
+
+
+def _settle_seen(role_ids: set[int], member_id: int, seen: dict[int, set[int]], settled: dict[int, list[int]]) -> None:
+    """Move member_id from seen to settled for each trigger whose "removed" rules are now satisfied."""
+    for role_id, members in seen.items():
+        if member_id in members and _removed_rules_settled(role_ids, role_id):
+            members.discard(member_id)
+            settled[role_id].append(member_id)
+
+
+def _fix_line(member: discord.Member, adds: set[int], removes: set[int]) -> str:
+    changes = [f"+<@&{r}>" for r in sorted(adds)] + [f"-<@&{r}>" for r in sorted(removes)]
+    return f"- {member.mention} (`{member.id}`): {' '.join(changes)}"
+
+
+async def run_role_sweep(guild: discord.Guild) -> None:
+    """Check every cached member against the rules, fix violations at a throttled pace, post one summary."""
+    rules = active_rules()
+    if not rules:
+        return
+    if not guild.chunked:
+        print(f"[role-sweep] Member cache for guild {guild.id} isn't complete yet; skipping")
+        return
+
+    store = get_store()
+    removed_triggers = {r.trigger_role_id for r in rules if r.event == "removed"}
+    seen = {role_id: await store.role_seen_members(guild_id=guild.id, role_id=role_id) for role_id in removed_triggers}
+    newly_seen: dict[int, list[int]] = {role_id: [] for role_id in removed_triggers}
+    # Seen members whose "removed" rules are done with, and so shouldn't be enforced again
+    settled: dict[int, list[int]] = {role_id: [] for role_id in removed_triggers}
+
+    violations: list[tuple[discord.Member, set[int], set[int], list[str]]] = []
+    checked = 0
+    for i, member in enumerate(list(guild.members), start=1):
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+        # Members with a live reconciliation pending are left to it
+        if member.bot or (guild.id, member.id) in _PENDING:
+            continue
+        checked += 1
+        role_ids = _role_ids(member)
+        for role_id in removed_triggers & role_ids:
+            if member.id not in seen[role_id]:
+                seen[role_id].add(member.id)
+                newly_seen[role_id].append(member.id)
+        fix = _member_fix(role_ids, member.id, rules, seen)
+        if fix is not None:
+            violations.append((member, *fix))
+        _settle_seen(role_ids, member.id, seen, settled)
+
+    # Members who left can't be fixed; drop them rather than keep them forever
+    present = {m.id for m in guild.members}
+    for role_id, member_ids in seen.items():
+        settled[role_id].extend(member_ids - present)
+
+    for role_id, member_ids in newly_seen.items():
+        await _mark_seen(guild.id, role_id, member_ids)
+
+    fixed_lines: list[str] = []
+    failed = 0
+    for member, _, _, _ in violations[:ROLE_SWEEP_MAX_FIXES]:
+        # Roles may have moved while earlier fixes were throttled: re-check against the live cache
+        current = guild.get_member(member.id)
+        if current is None or (guild.id, current.id) in _PENDING:
+            continue
+        fix = _member_fix(_role_ids(current), current.id, rules, seen)
+        if fix is None:
+            continue
+        adds, removes, reasons = fix
+        reason = "Role sweep: " + "; ".join(dict.fromkeys(reasons))
+        try:
+            if adds:
+                await current.add_roles(*(discord.Object(id=r) for r in adds), reason=reason)
+            if removes:
+                await current.remove_roles(*(discord.Object(id=r) for r in removes), reason=reason)
+            fixed_lines.append(_fix_line(current, adds, removes))
+            _settle_seen((_role_ids(current) | adds) - removes, current.id, seen, settled)
+        except discord.Forbidden:
+            failed += 1
+            print(f"[role-sweep] Missing permissions / hierarchy issue in guild {guild.id} for member {current.id}")
+        except Exception as e:
+            failed += 1
+            print(f"[role-sweep] Failed in guild {guild.id} for member {current.id}: {type(e).__name__}: {e}")
+        await asyncio.sleep(ROLE_SWEEP_ACTION_DELAY_SECONDS)
+
+    for role_id, member_ids in settled.items():
+        await _forget_seen(guild.id, role_id, member_ids)
+
+    deferred = max(0, len(violations) - ROLE_SWEEP_MAX_FIXES)
+    SYNC_STATS["sweep_fixed"] += len(fixed_lines)
+    print(
+        f"[role-sweep] Guild {guild.id}: checked {checked}, fixed {len(fixed_lines)}, "
+        f"failed {failed}, deferred {deferred}"
+    )
+    if not fixed_lines and not failed:
+        return
+
+    description = "\n".join(fixed_lines) or "(no roles changed)"
+    if len(description) > 4000:
+        description = chunk_lines(fixed_lines, max_chars=3900)[0] + "\n…"
+    embed = discord.Embed(title="Role sweep", description=description, color=discord.Color.blurple())
+    embed.add_field(name="Checked", value=str(checked), inline=True)
+    embed.add_field(name="Fixed", value=str(len(fixed_lines)), inline=True)
+    embed.add_field(name="Failed", value=str(failed), inline=True)
+    if deferred:
+        embed.add_field(name="Deferred", value=f"{deferred} (over the per-sweep limit; next sweep)", inline=False)
+    await send_audit_embed(guild, embed)
+
+
+async def _sweep_loop(bot) -> None:
+    await bot.wait_until_ready()
+    await asyncio.sleep(ROLE_SWEEP_START_DELAY_SECONDS)
+    while not bot.is_closed():
+        for g in list(bot.guilds):
+            try:
+                await run_role_sweep(g)
+            except Exception as e:
+                print(f"[role-sweep] Sweep failed in guild {g.id}: {type(e).__name__}: {e}")
+        await asyncio.sleep(ROLE_SWEEP_INTERVAL_SECONDS)
+
+
+def start_role_sweep_task(bot) -> None:
+    global _SWEEP_TASK
+    if _SWEEP_TASK is not None and not _SWEEP_TASK.done():
+        return
+    _SWEEP_TASK = asyncio.create_task(_sweep_loop(bot))
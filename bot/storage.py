@@ -0,0 +1,770 @@
+import datetime as dt
+from abc import ABC, abstractmethod
+
+from .config import STORAGE_BACKEND
+from .db import connect, ensure_db
+
+
+def _now_iso() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat()
+
+
+# Keep existing inviter_id if we already have one (prevents overwriting staff creator with "bot")
+UPSERT_BASELINE_SQL = """
+INSERT INTO invite_baseline (guild_id, code, uses, inviter_id, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(guild_id, code) DO UPDATE SET
+  uses=excluded.uses,
+  inviter_id=COALESCE(invite_baseline.inviter_id, excluded.inviter_id),
+  created_at=COALESCE(invite_baseline.created_at, excluded.created_at),
+  updated_at=excluded.updated_at
+"""
+
+# Count not-yet-counted join rows into the daily rollups; run both, then MARK_ROLLED_UP_SQL, in one transaction
+ROLLUP_INVITER_SQL = """
+INSERT INTO invite_inviter_daily (guild_id, day, inviter_id, joins)
+SELECT guild_id, substr(joined_at, 1, 10), COALESCE(inviter_id, 0), COUNT(*)
+FROM invite_join_log
+WHERE id IN ({placeholders}) AND rolled_up = 0
+GROUP BY guild_id, substr(joined_at, 1, 10), COALESCE(inviter_id, 0)
+ON CONFLICT(guild_id, day, inviter_id) DO UPDATE SET
+  joins=invite_inviter_daily.joins + excluded.joins
+"""
+
+ROLLUP_CODE_SQL = """
+INSERT INTO invite_code_daily (guild_id, day, invite_code, joins)
+SELECT guild_id, substr(joined_at, 1, 10), COALESCE(invite_code, ''), COUNT(*)
+FROM invite_join_log
+WHERE id IN ({placeholders}) AND rolled_up = 0
+GROUP BY guild_id, substr(joined_at, 1, 10), COALESCE(invite_code, '')
+ON CONFLICT(guild_id, day, invite_code) DO UPDATE SET
+  joins=invite_code_daily.joins + excluded.joins
+"""
+
+# Leave time-in-server buckets: member_hourly column suffix -> upper bound in seconds (None = open-ended)
+TENURE_BUCKETS = (
+    ("1h", 60 * 60),
+    ("1d", 24 * 60 * 60),
+    ("7d", 7 * 24 * 60 * 60),
+    ("30d", 30 * 24 * 60 * 60),
+    ("365d", 365 * 24 * 60 * 60),
+    ("more", None),
+    ("unknown", None),
+)
+MEMBER_HOURLY_COUNTS = ("joins", "new_account_joins", "leaves") + tuple(f"tenure_{b}" for b, _ in TENURE_BUCKETS)
+
+MARK_ROLLED_UP_SQL = "UPDATE invite_join_log SET rolled_up = 1 WHERE id IN ({placeholders})"
+
+
+async def _rollup_join_rows(db, ids: list[int]) -> None:
+    placeholders = ",".join("?" for _ in ids)
+    await db.execute(ROLLUP_INVITER_SQL.format(placeholders=placeholders), ids)
+    await db.execute(ROLLUP_CODE_SQL.format(placeholders=placeholders), ids)
+    await db.execute(MARK_ROLLED_UP_SQL.format(placeholders=placeholders), ids)
+
+
+class Store(ABC):
+    """
+    Storage interface used by handlers and commands instead of raw SQL.
+    Baseline rows are (code, uses, inviter_id, created_at); timestamps are ISO strings (UTC).
+    New tables get an abstract method here plus an implementation in every backend
+    (a backend missing one fails at construction).
+    """
+
+    @abstractmethod
+    async def setup(self) -> None:
+        """Create or migrate whatever the backend needs; called from on_ready (the only place the schema is set up)."""
+
+    # ---- invite baseline ----
+    @abstractmethod
+    async def load_invite_baseline(self, guild_id: int) -> dict[str, tuple[int, int | None]]:
+        """code -> (uses, inviter_id)"""
+
+    @abstractmethod
+    async def upsert_invite_baseline(self, guild_id: int, rows: list[tuple[str, int, int | None, str | None]]) -> None:
+        """Insert/refresh codes; an already-stored inviter_id/created_at is never overwritten."""
+
+    @abstractmethod
+    async def set_invite_owner(self, *, guild_id: int, code: str, owner_id: int, created_at: str | None, uses: int) -> None:
+        """Like upsert, but the owner always replaces the stored inviter_id."""
+
+    @abstractmethod
+    async def delete_invite_baseline(self, guild_id: int, codes: list[str]) -> int:
+        ...
+
+    # ---- join log ----
+    @abstractmethod
+    async def add_join(
+        self,
+        *,
+        guild_id: int,
+        member_id: int,
+        member_tag: str,
+        joined_at: str,
+        invite_code: str | None,
+        inviter_id: int | None,
+        uses_before: int | None,
+        uses_after: int | None,
+    ) -> int:
+        ...
+
+    @abstractmethod
+    async def set_join_invite(
+        self,
+        row_id: int,
+        *,
+        invite_code: str | None,
+        inviter_id: int | None,
+        uses_before: int | None,
+        uses_after: int | None,
+    ) -> None:
+        """
+        Finalize a join row logged before its invite was known (all None = unknown)
+        and count it in the daily inviter/code rollups.
+        """
+
+    @abstractmethod
+    async def latest_join(self, *, guild_id: int, member_id: int) -> dict | None:
+        ...
+
+    @abstractmethod
+    async def compact_join_log_batch(self, guild_id: int, *, cutoff_iso: str, limit: int) -> int:
+        """Delete up to `limit` rows older than cutoff_iso, counting any not yet in the rollups first."""
+
+    @abstractmethod
+    async def rollup_stale_joins(self, guild_id: int, *, cutoff_iso: str, limit: int) -> int:
+        """Count up to `limit` never-finalized rows older than cutoff_iso into the rollups (as logged)."""
+
+    @abstractmethod
+    async def invite_join_counts(self, *, guild_id: int, since_day: str, by: str) -> list[tuple[int | str, int]]:
+        """
+        Joins since since_day (YYYY-MM-DD) from the daily rollups, most first.
+        by="inviter" -> [(inviter_id, joins)] (0 = unknown); by="code" -> [(invite_code, joins)] ('' = unknown)
+        """
+
+    # ---- member join/leave buckets ----
+    @abstractmethod
+    async def record_member_join(self, *, guild_id: int, hour: str, new_account: bool) -> None:
+        """Count one join in the guild's hour bucket (YYYY-MM-DDTHH, UTC)."""
+
+    @abstractmethod
+    async def record_member_leave(self, *, guild_id: int, hour: str, tenure_bucket: str) -> None:
+        """Count one leave in the hour bucket; tenure_bucket is a TENURE_BUCKETS name."""
+
+    @abstractmethod
+    async def member_hourly_counts(self, *, guild_id: int, since_hour: str) -> list[dict]:
+        """Non-empty hour buckets since since_hour, oldest first: {"hour", **MEMBER_HOURLY_COUNTS}"""
+
+    # ---- role rules ----
+    @abstractmethod
+    async def list_role_rules(self) -> list[dict]:
+        """Enabled rules: {"trigger_role_id", "event", "action", "target_role_id", "delay_seconds", "reason"}"""
+
+    @abstractmethod
+    async def role_seen_members(self, *, guild_id: int, role_id: int) -> set[int]:
+        """Members ever seen holding role_id (see mark_role_seen)."""
+
+    @abstractmethod
+    async def mark_role_seen(self, *, guild_id: int, role_id: int, member_ids: list[int]) -> None:
+        """Remember that these members held role_id; already-known members keep their first_seen_at."""
+
+    @abstractmethod
+    async def forget_role_seen(self, *, guild_id: int, role_id: int, member_ids: list[int]) -> None:
+        """Drop these members from role_id's seen set (their "removed" rules are settled, or they left)."""
+
+    # ---- AFK ----
+    @abstractmethod
+    async def set_afk(self, *, guild_id: int, user_id: int, message: str | None, until_ts: int | None) -> None:
+        ...
+
+    @abstractmethod
+    async def clear_afk(self, *, guild_id: int, user_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_afk(self, *, guild_id: int, user_id: int) -> dict | None:
+        """{"message", "until_ts", "set_at"} or None"""
+
+    # ---- server status ----
+    @abstractmethod
+    async def set_server_status(self, *, guild_id: int, role_id: int, is_open: bool, note: str | None, updated_by: int) -> None:
+        ...
+
+    @abstractmethod
+    async def clear_server_status(self, *, guild_id: int, role_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_server_status(self, *, guild_id: int, role_id: int) -> dict | None:
+        """{"is_open", "note", "updated_at", "updated_by"} or None"""
+
+
+# --------------------
+# SQLite backend
+# --------------------
+class SqliteStore(Store):
+    async def setup(self) -> None:
+        await ensure_db()
+
+    async def load_invite_baseline(self, guild_id):
+        async with connect() as db:
+            rows = await db.execute_fetchall(
+                "SELECT code, uses, inviter_id FROM invite_baseline WHERE guild_id = ?",
+                (guild_id,),
+            )
+        return {r[0]: (r[1], r[2]) for r in rows}
+
+    async def upsert_invite_baseline(self, guild_id, rows):
+        if not rows:
+            return
+        now = _now_iso()
+        async with connect() as db:
+            await db.executemany(
+                UPSERT_BASELINE_SQL,
+                [(guild_id, code, uses, inviter_id, created_at, now) for code, uses, inviter_id, created_at in rows],
+            )
+            await db.commit()
+
+    async def set_invite_owner(self, *, guild_id, code, owner_id, created_at, uses):
+        async with connect() as db:
+            await db.execute(
+                """
+                INSERT INTO invite_baseline (guild_id, code, uses, inviter_id, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, code) DO UPDATE SET
+                  uses=excluded.uses,
+                  inviter_id=excluded.inviter_id,
+                  created_at=COALESCE(invite_baseline.created_at, excluded.created_at),
+                  updated_at=excluded.updated_at
+                """,
+                (guild_id, code, uses, owner_id, created_at, _now_iso()),
+            )
+            await db.commit()
+
+    async def delete_invite_baseline(self, guild_id, codes):
+        if not codes:
+            return 0
+        placeholders = ",".join("?" for _ in codes)
+        async with connect() as db:
+            cur = await db.execute(
+                f"DELETE FROM invite_baseline WHERE guild_id = ? AND code IN ({placeholders})",
+                (guild_id, *codes),
+            )
+            await db.commit()
+            return cur.rowcount or 0
+
+    async def add_join(self, *, guild_id, member_id, member_tag, joined_at, invite_code, inviter_id, uses_before, uses_after):
+        async with connect() as db:
+            cur = await db.execute(
+                """
+                INSERT INTO invite_join_log (
+                  guild_id, member_id, member_tag, joined_at,
+                  invite_code, inviter_id, uses_before, uses_after
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (guild_id, member_id, member_tag, joined_at, invite_code, inviter_id, uses_before, uses_after),
+            )
+            await db.commit()
+            return cur.lastrowid
+
+    async def set_join_invite(self, row_id, *, invite_code, inviter_id, uses_before, uses_after):
+        async with connect() as db:
+            await db.execute(
+                """
+                UPDATE invite_join_log
+                SET invite_code = ?, inviter_id = ?, uses_before = ?, uses_after = ?
+                WHERE id = ? AND rolled_up = 0
+                """,
+                (invite_code, inviter_id, uses_before, uses_after, row_id),
+            )
+            await _rollup_join_rows(db, [row_id])
+            await db.commit()
+
+    async def latest_join(self, *, guild_id, member_id):
+        async with connect() as db:
+            cur = await db.execute(
+                """
+                SELECT invite_code, inviter_id, uses_before, uses_after, joined_at
+                FROM invite_join_log
+                WHERE guild_id = ? AND member_id = ?
+                ORDER BY id DESC
+                LIMIT 1
+                """,
+                (guild_id, member_id),
+            )
+            row = await cur.fetchone()
+
+        if not row:
+            return None
+
+        invite_code, inviter_id, uses_before, uses_after, joined_at = row
+        return {
+            "invite_code": invite_code,
+            "inviter_id": inviter_id,
+            "uses_before": uses_before,
+            "uses_after": uses_after,
+            "joined_at": joined_at,
+        }
+
+    async def compact_join_log_batch(self, guild_id, *, cutoff_iso, limit):
+        async with connect() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT id FROM invite_join_log
+                WHERE guild_id = ? AND joined_at < ?
+                ORDER BY joined_at
+                LIMIT ?
+                """,
+                (guild_id, cutoff_iso, limit),
+            )
+            if not rows:
+                return 0
+
+            ids = [r[0] for r in rows]
+            placeholders = ",".join("?" for _ in ids)
+            await _rollup_join_rows(db, ids)
+            await db.execute(f"DELETE FROM invite_join_log WHERE id IN ({placeholders})", ids)
+            await db.commit()
+            return len(ids)
+
+    async def rollup_stale_joins(self, guild_id, *, cutoff_iso, limit):
+        async with connect() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT id FROM invite_join_log
+                WHERE guild_id = ? AND joined_at < ? AND rolled_up = 0
+                ORDER BY joined_at
+                LIMIT ?
+                """,
+                (guild_id, cutoff_iso, limit),
+            )
+            if not rows:
+                return 0
+            ids = [r[0] for r in rows]
+            await _rollup_join_rows(db, ids)
+            await db.commit()
+            return len(ids)
+
+    async def invite_join_counts(self, *, guild_id, since_day, by):
+        if by == "code":
+            sql = """
+                SELECT invite_code, SUM(joins) AS total
+                FROM invite_code_daily
+                WHERE guild_id = ? AND day >= ?
+                GROUP BY invite_code
+                ORDER BY total DESC, invite_code
+            """
+        else:
+            sql = """
+                SELECT inviter_id, SUM(joins) AS total
+                FROM invite_inviter_daily
+                WHERE guild_id = ? AND day >= ?
+                GROUP BY inviter_id
+                ORDER BY total DESC, inviter_id
+            """
+        async with connect() as db:
+            rows = await db.execute_fetchall(sql, (guild_id, since_day))
+        return [(r[0], r[1]) for r in rows]
+
+    async def _bump_member_hourly(self, guild_id: int, hour: str, columns: tuple[str, ...]) -> None:
+        # Column names only ever come from MEMBER_HOURLY_COUNTS
+        cols = ", ".join(columns)
+        ones = ", ".join("1" for _ in columns)
+        updates = ", ".join(f"{c} = member_hourly.{c} + 1" for c in columns)
+        async with connect() as db:
+            await db.execute(
+                f"""
+                INSERT INTO member_hourly (guild_id, hour, {cols})
+                VALUES (?, ?, {ones})
+                ON CONFLICT(guild_id, hour) DO UPDATE SET {updates}
+                """,
+                (guild_id, hour),
+            )
+            await db.commit()
+
+    async def record_member_join(self, *, guild_id, hour, new_account):
+        columns = ("joins", "new_account_joins") if new_account else ("joins",)
+        await self._bump_member_hourly(guild_id, hour, columns)
+
+    async def record_member_leave(self, *, guild_id, hour, tenure_bucket):
+        column = f"tenure_{tenure_bucket}"
+        if column not in MEMBER_HOURLY_COUNTS:
+            raise ValueError(f"Unknown tenure bucket {tenure_bucket!r}")
+        await self._bump_member_hourly(guild_id, hour, ("leaves", column))
+
+    async def member_hourly_counts(self, *, guild_id, since_hour):
+        async with connect() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                SELECT hour, {", ".join(MEMBER_HOURLY_COUNTS)}
+                FROM member_hourly
+                WHERE guild_id = ? AND hour >= ?
+                ORDER BY hour
+                """,
+                (guild_id, since_hour),
+            )
+        return [{"hour": r[0], **dict(zip(MEMBER_HOURLY_COUNTS, r[1:]))} for r in rows]
+
+    async def list_role_rules(self):
+        async with connect() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT trigger_role_id, event, action, target_role_id, delay_seconds, reason
+                FROM role_rules
+                WHERE enabled = 1
+                ORDER BY id
+                """
+            )
+        return [
+            {
+                "trigger_role_id": r[0],
+                "event": r[1],
+                "action": r[2],
+                "target_role_id": r[3],
+                "delay_seconds": r[4],
+                "reason": r[5],
+            }
+            for r in rows
+        ]
+
+    async def role_seen_members(self, *, guild_id, role_id):
+        async with connect() as db:
+            rows = await db.execute_fetchall(
+                "SELECT member_id FROM role_rule_seen WHERE guild_id = ? AND role_id = ?",
+                (guild_id, role_id),
+            )
+        return {r[0] for r in rows}
+
+    async def mark_role_seen(self, *, guild_id, role_id, member_ids):
+        if not member_ids:
+            return
+        now = _now_iso()
+        async with connect() as db:
+            await db.executemany(
+                """
+                INSERT INTO role_rule_seen (guild_id, role_id, member_id, first_seen_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(guild_id, role_id, member_id) DO NOTHING
+                """,
+                [(guild_id, role_id, member_id, now) for member_id in member_ids],
+            )
+            await db.commit()
+
+    async def forget_role_seen(self, *, guild_id, role_id, member_ids):
+        if not member_ids:
+            return
+        async with connect() as db:
+            await db.executemany(
+                "DELETE FROM role_rule_seen WHERE guild_id = ? AND role_id = ? AND member_id = ?",
+                [(guild_id, role_id, member_id) for member_id in member_ids],
+            )
+            await db.commit()
+
+    async def set_afk(self, *, guild_id, user_id, message, until_ts):
+        async with connect() as db:
+            await db.execute(
+                """
+                INSERT INTO afk_status (guild_id, user_id, message, until_ts, set_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                  message=excluded.message,
+                  until_ts=excluded.until_ts,
+                  set_at=excluded.set_at
+                """,
+                (guild_id, user_id, message, until_ts, _now_iso()),
+            )
+            await db.commit()
+
+    async def clear_afk(self, *, guild_id, user_id):
+        async with connect() as db:
+            cur = await db.execute(
+                "DELETE FROM afk_status WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id),
+            )
+            await db.commit()
+            return (cur.rowcount or 0) > 0
+
+    async def get_afk(self, *, guild_id, user_id):
+        async with connect() as db:
+            cur = await db.execute(
+                "SELECT message, until_ts, set_at FROM afk_status WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id),
+            )
+            row = await cur.fetchone()
+        if not row:
+            return None
+        message, until_ts, set_at = row
+        return {"message": message, "until_ts": until_ts, "set_at": set_at}
+
+    async def set_server_status(self, *, guild_id, role_id, is_open, note, updated_by):
+        async with connect() as db:
+            await db.execute(
+                """
+                INSERT INTO server_status (guild_id, role_id, is_open, note, updated_at, updated_by)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, role_id) DO UPDATE SET
+                  is_open=excluded.is_open,
+                  note=excluded.note,
+                  updated_at=excluded.updated_at,
+                  updated_by=excluded.updated_by
+                """,
+                (guild_id, role_id, 1 if is_open else 0, note, _now_iso(), updated_by),
+            )
+            await db.commit()
+
+    async def clear_server_status(self, *, guild_id, role_id):
+        async with connect() as db:
+            cur = await db.execute(
+                "DELETE FROM server_status WHERE guild_id = ? AND role_id = ?",
+                (guild_id, role_id),
+            )
+            await db.commit()
+            return (cur.rowcount or 0) > 0
+
+    async def get_server_status(self, *, guild_id, role_id):
+        async with connect() as db:
+            cur = await db.execute(
+                "SELECT is_open, note, updated_at, updated_by FROM server_status WHERE guild_id = ? AND role_id = ?",
+                (guild_id, role_id),
+            )
+            row = await cur.fetchone()
+        if not row:
+            return None
+        is_open_i, note, updated_at, updated_by = row
+        return {"is_open": bool(is_open_i), "note": note, "updated_at": updated_at, "updated_by": updated_by}
+
+
+# --------------------
+# In-memory backend (nothing survives a restart; for benchmarks and hot-path experiments)
+# --------------------
+class MemoryStore(Store):
+    def __init__(self):
+        # (guild_id, code) -> {"uses", "inviter_id", "created_at", "updated_at"}
+        self.invite_baseline: dict[tuple[int, str], dict] = {}
+        self.join_log: list[dict] = []
+        self.next_join_id = 1
+        # (guild_id, day, inviter_id) -> joins / (guild_id, day, invite_code) -> joins
+        self.inviter_daily: dict[tuple[int, str, int], int] = {}
+        self.code_daily: dict[tuple[int, str, str], int] = {}
+        # (guild_id, hour) -> {MEMBER_HOURLY_COUNTS column: count}
+        self.member_hourly: dict[tuple[int, str], dict[str, int]] = {}
+        # Same shape as list_role_rules() rows
+        self.role_rules: list[dict] = []
+        # (guild_id, role_id) -> {member_id: first_seen_at}
+        self.role_seen: dict[tuple[int, int], dict[int, str]] = {}
+        self.afk: dict[tuple[int, int], dict] = {}
+        self.server_status: dict[tuple[int, int], dict] = {}
+
+    async def setup(self) -> None:
+        # The audit archive, webhook spill and backups live in SQLite whichever backend holds store data
+        await ensure_db()
+
+    async def load_invite_baseline(self, guild_id):
+        return {
+            code: (row["uses"], row["inviter_id"])
+            for (gid, code), row in self.invite_baseline.items()
+            if gid == guild_id
+        }
+
+    async def upsert_invite_baseline(self, guild_id, rows):
+        now = _now_iso()
+        for code, uses, inviter_id, created_at in rows:
+            existing = self.invite_baseline.get((guild_id, code))
+            if existing is None:
+                self.invite_baseline[(guild_id, code)] = {
+                    "uses": uses,
+                    "inviter_id": inviter_id,
+                    "created_at": created_at,
+                    "updated_at": now,
+                }
+                continue
+            existing["uses"] = uses
+            if existing["inviter_id"] is None:
+                existing["inviter_id"] = inviter_id
+            if existing["created_at"] is None:
+                existing["created_at"] = created_at
+            existing["updated_at"] = now
+
+    async def set_invite_owner(self, *, guild_id, code, owner_id, created_at, uses):
+        existing = self.invite_baseline.get((guild_id, code))
+        self.invite_baseline[(guild_id, code)] = {
+            "uses": uses,
+            "inviter_id": owner_id,
+            "created_at": (existing["created_at"] if existing and existing["created_at"] else created_at),
+            "updated_at": _now_iso(),
+        }
+
+    async def delete_invite_baseline(self, guild_id, codes):
+        removed = 0
+        for code in codes:
+            if self.invite_baseline.pop((guild_id, code), None) is not None:
+                removed += 1
+        return removed
+
+    async def add_join(self, *, guild_id, member_id, member_tag, joined_at, invite_code, inviter_id, uses_before, uses_after):
+        row_id = self.next_join_id
+        self.next_join_id += 1
+        self.join_log.append({
+            "id": row_id,
+            "guild_id": guild_id,
+            "member_id": member_id,
+            "member_tag": member_tag,
+            "joined_at": joined_at,
+            "invite_code": invite_code,
+            "inviter_id": inviter_id,
+            "uses_before": uses_before,
+            "uses_after": uses_after,
+            "rolled_up": False,
+        })
+        return row_id
+
+    def _rollup_row(self, row: dict) -> None:
+        if row["rolled_up"]:
+            return
+        day = row["joined_at"][:10]
+        k1 = (row["guild_id"], day, row["inviter_id"] or 0)
+        k2 = (row["guild_id"], day, row["invite_code"] or "")
+        self.inviter_daily[k1] = self.inviter_daily.get(k1, 0) + 1
+        self.code_daily[k2] = self.code_daily.get(k2, 0) + 1
+        row["rolled_up"] = True
+
+    async def set_join_invite(self, row_id, *, invite_code, inviter_id, uses_before, uses_after):
+        for row in self.join_log:
+            if row["id"] == row_id:
+                if not row["rolled_up"]:
+                    row.update(
+                        invite_code=invite_code,
+                        inviter_id=inviter_id,
+                        uses_before=uses_before,
+                        uses_after=uses_after,
+                    )
+                    self._rollup_row(row)
+                return
+
+    async def latest_join(self, *, guild_id, member_id):
+        for row in reversed(self.join_log):
+            if row["guild_id"] == guild_id and row["member_id"] == member_id:
+                return {
+                    "invite_code": row["invite_code"],
+                    "inviter_id": row["inviter_id"],
+                    "uses_before": row["uses_before"],
+                    "uses_after": row["uses_after"],
+                    "joined_at": row["joined_at"],
+                }
+        return None
+
+    async def compact_join_log_batch(self, guild_id, *, cutoff_iso, limit):
+        old = [r for r in self.join_log if r["guild_id"] == guild_id and r["joined_at"] < cutoff_iso]
+        old.sort(key=lambda r: r["joined_at"])
+        batch = old[:limit]
+        if not batch:
+            return 0
+        for r in batch:
+            self._rollup_row(r)
+        ids = {r["id"] for r in batch}
+        self.join_log = [r for r in self.join_log if r["id"] not in ids]
+        return len(batch)
+
+    async def rollup_stale_joins(self, guild_id, *, cutoff_iso, limit):
+        stale = [
+            r for r in self.join_log
+            if r["guild_id"] == guild_id and r["joined_at"] < cutoff_iso and not r["rolled_up"]
+        ]
+        stale.sort(key=lambda r: r["joined_at"])
+        for r in stale[:limit]:
+            self._rollup_row(r)
+        return len(stale[:limit])
+
+    async def invite_join_counts(self, *, guild_id, since_day, by):
+        source = self.code_daily if by == "code" else self.inviter_daily
+        totals: dict = {}
+        for (gid, day, key), joins in source.items():
+            if gid == guild_id and day >= since_day:
+                totals[key] = totals.get(key, 0) + joins
+        return sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    def _bump_member_hourly(self, guild_id: int, hour: str, columns: tuple[str, ...]) -> None:
+        bucket = self.member_hourly.get((guild_id, hour))
+        if bucket is None:
+            bucket = self.member_hourly[(guild_id, hour)] = dict.fromkeys(MEMBER_HOURLY_COUNTS, 0)
+        for c in columns:
+            bucket[c] += 1
+
+    async def record_member_join(self, *, guild_id, hour, new_account):
+        self._bump_member_hourly(guild_id, hour, ("joins", "new_account_joins") if new_account else ("joins",))
+
+    async def record_member_leave(self, *, guild_id, hour, tenure_bucket):
+        column = f"tenure_{tenure_bucket}"
+        if column not in MEMBER_HOURLY_COUNTS:
+            raise ValueError(f"Unknown tenure bucket {tenure_bucket!r}")
+        self._bump_member_hourly(guild_id, hour, ("leaves", column))
+
+    async def member_hourly_counts(self, *, guild_id, since_hour):
+        return [
+            {"hour": hour, **counts}
+            for (gid, hour), counts in sorted(self.member_hourly.items(), key=lambda kv: kv[0][1])
+            if gid == guild_id and hour >= since_hour
+        ]
+
+    async def list_role_rules(self):
+        return [dict(r) for r in self.role_rules]
+
+    async def role_seen_members(self, *, guild_id, role_id):
+        return set(self.role_seen.get((guild_id, role_id), ()))
+
+    async def mark_role_seen(self, *, guild_id, role_id, member_ids):
+        seen = self.role_seen.setdefault((guild_id, role_id), {})
+        now = _now_iso()
+        for member_id in member_ids:
+            seen.setdefault(member_id, now)
+
+    async def forget_role_seen(self, *, guild_id, role_id, member_ids):
+        seen = self.role_seen.get((guild_id, role_id))
+        if seen is None:
+            return
+        for member_id in member_ids:
+            seen.pop(member_id, None)
+
+    async def set_afk(self, *, guild_id, user_id, message, until_ts):
+        self.afk[(guild_id, user_id)] = {"message": message, "until_ts": until_ts, "set_at": _now_iso()}
+
+    async def clear_afk(self, *, guild_id, user_id):
+        return self.afk.pop((guild_id, user_id), None) is not None
+
+    async def get_afk(self, *, guild_id, user_id):
+        row = self.afk.get((guild_id, user_id))
+        return dict(row) if row else None
+
+    async def set_server_status(self, *, guild_id, role_id, is_open, note, updated_by):
+        self.server_status[(guild_id, role_id)] = {
+            "is_open": bool(is_open),
+            "note": note,
+            "updated_at": _now_iso(),
+            "updated_by": updated_by,
+        }
+
+    async def clear_server_status(self, *, guild_id, role_id):
+        return self.server_status.pop((guild_id, role_id), None) is not None
+
+    async def get_server_status(self, *, guild_id, role_id):
+        row = self.server_status.get((guild_id, role_id))
+        return dict(row) if row else None
+
+
+_BACKENDS = {
+    "sqlite": SqliteStore,
+    "memory": MemoryStore,
+}
+
+_STORE: Store | None = None
+
+
+def get_store() -> Store:
+    """Process-wide store for the backend selected by STORAGE_BACKEND."""
+    global _STORE
+    if _STORE is None:
+        backend = _BACKENDS.get(STORAGE_BACKEND)
+        if backend is None:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (expected one of: {', '.join(_BACKENDS)}).")
+        _STORE = backend()
+    return _STORE
@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+import pytest
+
+# bot.config refuses to import without these; tests never talk to Discord
+os.environ.setdefault("DISCORD_TOKEN", "test-token")
+os.environ.setdefault("XC_URL", "http://xc.invalid")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="bot-tests-"), "bot.sqlite3"))
+
+
+@pytest.fixture
+def sqlite_path(tmp_path, monkeypatch):
+    """A fresh, empty SQLite file that bot.db.connect() / ensure_db() point at."""
+    from bot import db
+
+    path = str(tmp_path / "bot.sqlite3")
+    monkeypatch.setattr(db, "SQLITE_PATH", path)
+    return path
@@ -0,0 +1,156 @@
+import asyncio
+import sqlite3
+from collections import deque
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot import audit_webhook, db
+
+
+class FakeWebhook:
+    """Local stand-in for a Discord webhook: answers with the queued statuses, then 200."""
+
+    def __init__(self):
+        self.statuses: deque[int] = deque()
+        self.received: list[str] = []
+        self.server: TestServer | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        status = self.statuses.popleft() if self.statuses else 200
+        if status != 200:
+            return web.json_response({"message": "nope"}, status=status)
+        self.received.append(payload["content"])
+        return web.json_response({"id": str(len(self.received))})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/webhook", self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await audit_webhook.shutdown()
+        await self.server.close()
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("/webhook"))
+
+
+@pytest.fixture
+def webhook_state(sqlite_path, monkeypatch):
+    asyncio.run(db.ensure_db())
+    monkeypatch.setattr(audit_webhook, "_RETRY_QUEUE", deque())
+    monkeypatch.setattr(audit_webhook, "_RETRY_TASK", None)
+    monkeypatch.setattr(audit_webhook, "_SESSION", None)
+    monkeypatch.setattr(audit_webhook, "_SPILL_PENDING", False)
+    monkeypatch.setattr(audit_webhook, "_SPILL_REPLAYED_UPTO", -(2 ** 63))
+    monkeypatch.setattr(audit_webhook, "WEBHOOK_STATS", dict.fromkeys(audit_webhook.WEBHOOK_STATS, 0))
+    monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_BACKOFF_MAX_SECONDS", 0.05)
+    return sqlite_path
+
+
+def _spill_rows(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM audit_spill").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def _drained() -> None:
+    while audit_webhook._RETRY_TASK is not None and not audit_webhook._RETRY_TASK.done():
+        await asyncio.sleep(0.01)
+
+
+def test_delivers_and_returns_message_id(webhook_state, monkeypatch):
+    async def scenario():
+        async with FakeWebhook() as hook:
+            monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", hook.url)
+            return await audit_webhook.post_message({"content": "a"}), hook.received
+
+    message_id, received = asyncio.run(scenario())
+    assert message_id == "1"
+    assert received == ["a"]
+    assert audit_webhook.WEBHOOK_STATS["delivered"] == 1
+
+
+def test_server_error_is_queued_and_retried(webhook_state, monkeypatch):
+    async def scenario():
+        async with FakeWebhook() as hook:
+            monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", hook.url)
+            hook.statuses.extend([500, 502])
+            result = await audit_webhook.post_message({"content": "a"})
+            await _drained()
+            return result, hook.received
+
+    result, received = asyncio.run(scenario())
+    assert result is audit_webhook.QUEUED
+    assert received == ["a"]
+    assert audit_webhook.WEBHOOK_STATS["delivered"] == 1
+
+
+def test_overflow_spills_and_replays_in_order(webhook_state, monkeypatch):
+    monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_RETRY_QUEUE_MAX", 2)
+    monkeypatch.setattr(audit_webhook, "SPILL_REPLAY_BATCH", 2)
+
+    async def scenario():
+        async with FakeWebhook() as hook:
+            monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", hook.url)
+            hook.statuses.extend([503] * 1000)
+            results = [await audit_webhook.post_message({"content": str(i)}) for i in range(6)]
+            spilled = _spill_rows(webhook_state)
+            # The webhook comes back
+            hook.statuses.clear()
+            await _drained()
+            return results, spilled, hook.received
+
+    results, spilled, received = asyncio.run(scenario())
+    assert all(r is audit_webhook.QUEUED for r in results)
+    assert spilled == 4
+    assert received == [str(i) for i in range(6)]
+    assert _spill_rows(webhook_state) == 0
+
+
+def test_shutdown_keeps_queued_messages_in_order(webhook_state, monkeypatch):
+    monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_RETRY_QUEUE_MAX", 2)
+
+    async def outage():
+        async with FakeWebhook() as hook:
+            monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", hook.url)
+            # The webhook stays down until shutdown
+            hook.statuses.extend([503] * 1000)
+            for i in range(4):
+                await audit_webhook.post_message({"content": str(i)})
+
+    async def restart():
+        monkeypatch.setattr(audit_webhook, "_SPILL_PENDING", False)
+        monkeypatch.setattr(audit_webhook, "_SPILL_REPLAYED_UPTO", -(2 ** 63))
+        async with FakeWebhook() as hook:
+            monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", hook.url)
+            await audit_webhook.resume_spilled()
+            await _drained()
+            return hook.received
+
+    asyncio.run(outage())
+    assert _spill_rows(webhook_state) == 4
+    assert asyncio.run(restart()) == ["0", "1", "2", "3"]
+    assert _spill_rows(webhook_state) == 0
+
+
+def test_client_error_is_dropped(webhook_state, monkeypatch):
+    async def scenario():
+        async with FakeWebhook() as hook:
+            monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", hook.url)
+            hook.statuses.append(400)
+            return await audit_webhook.post_message({"content": "a"}), hook.received
+
+    result, received = asyncio.run(scenario())
+    assert result is None
+    assert received == []
+    assert audit_webhook.WEBHOOK_STATS["dropped"] == 1
@@ -0,0 +1,141 @@
+import asyncio
+import re
+import sqlite3
+
+import discord
+import pytest
+
+from bot import audit_archive, audit_webhook, db
+from bot.storage import SqliteStore, Store
+
+# Tables a full scan is fine for: (table, why)
+SCAN_ALLOWED = {
+    "role_rules": "the whole table is loaded on every ready",
+    "audit_spill": "read oldest-first in rowid order and stops at LIMIT",
+}
+
+SCAN_RE = re.compile(r"\bSCAN (\w+)")
+SKIP_PREFIXES = ("PRAGMA", "CREATE", "DROP", "ALTER", "BEGIN", "COMMIT")
+
+
+@pytest.fixture
+def recorded(sqlite_path, monkeypatch):
+    """Every statement the real code sends through db.TimedConnection: sql -> one set of parameters."""
+    statements: dict[str, tuple] = {}
+
+    def wrap(name, many=False):
+        original = getattr(db.TimedConnection, name)
+
+        async def recording(self, sql, parameters=None):
+            if not sql.lstrip().upper().startswith(SKIP_PREFIXES):
+                params = parameters
+                if many:
+                    params = list(parameters)
+                    parameters = params
+                    params = params[0] if params else None
+                statements.setdefault(sql, tuple(params or ()))
+            return await original(self, sql, parameters)
+
+        monkeypatch.setattr(db.TimedConnection, name, recording)
+
+    asyncio.run(db.ensure_db())
+    wrap("execute")
+    wrap("execute_fetchall")
+    wrap("executemany", many=True)
+    return statements
+
+
+class _CallLog:
+    """Proxy that remembers which store methods were called."""
+
+    def __init__(self, store: Store):
+        self.store = store
+        self.called: set[str] = set()
+
+    def __getattr__(self, name):
+        self.called.add(name)
+        return getattr(self.store, name)
+
+
+async def _drive_store() -> set[str]:
+    """Call every Store method on SqliteStore; returns the names called."""
+    s = _CallLog(SqliteStore())
+    await s.setup()
+    await s.upsert_invite_baseline(1, [("abc", 3, 10, None), ("def", 0, None, None)])
+    await s.load_invite_baseline(1)
+    await s.set_invite_owner(guild_id=1, code="abc", owner_id=42, created_at=None, uses=4)
+    await s.delete_invite_baseline(1, ["def"])
+    row = await s.add_join(
+        guild_id=1, member_id=5, member_tag="a#1", joined_at="2025-01-10T12:00:00+00:00",
+        invite_code=None, inviter_id=None, uses_before=None, uses_after=None,
+    )
+    await s.set_join_invite(row, invite_code="abc", inviter_id=10, uses_before=1, uses_after=2)
+    await s.add_join(
+        guild_id=1, member_id=6, member_tag="b#1", joined_at="2025-01-11T12:00:00+00:00",
+        invite_code=None, inviter_id=None, uses_before=None, uses_after=None,
+    )
+    await s.latest_join(guild_id=1, member_id=5)
+    await s.rollup_stale_joins(1, cutoff_iso="2025-02-01", limit=10)
+    await s.compact_join_log_batch(1, cutoff_iso="2025-02-01", limit=10)
+    await s.invite_join_counts(guild_id=1, since_day="2025-01-01", by="inviter")
+    await s.invite_join_counts(guild_id=1, since_day="2025-01-01", by="code")
+    await s.record_member_join(guild_id=1, hour="2025-01-01T10", new_account=True)
+    await s.record_member_leave(guild_id=1, hour="2025-01-01T11", tenure_bucket="7d")
+    await s.member_hourly_counts(guild_id=1, since_hour="2025-01-01T00")
+    await s.list_role_rules()
+    await s.mark_role_seen(guild_id=1, role_id=2, member_ids=[5])
+    await s.role_seen_members(guild_id=1, role_id=2)
+    await s.forget_role_seen(guild_id=1, role_id=2, member_ids=[5])
+    await s.set_afk(guild_id=1, user_id=2, message="lunch", until_ts=None)
+    await s.get_afk(guild_id=1, user_id=2)
+    await s.clear_afk(guild_id=1, user_id=2)
+    await s.set_server_status(guild_id=1, role_id=2, is_open=True, note=None, updated_by=9)
+    await s.get_server_status(guild_id=1, role_id=2)
+    await s.clear_server_status(guild_id=1, role_id=2)
+    return s.called
+
+
+async def _drive_audit() -> None:
+    if db.AUDIT_ARCHIVE_ENABLED:
+        ref = audit_archive.archive_embed(1, discord.Embed(title="Member joined", description="hello"))
+        audit_archive.archive_embed_edit(ref, discord.Embed(title="Member joined", description="edited"))
+        await audit_archive.search_audit_archive(1, "hello", since_iso="2000-01-01", until_iso="2100-01-01")
+    await audit_webhook._spill([{"content": "a"}, {"content": "b"}])
+    await audit_webhook.resume_spilled()
+    await audit_webhook._replay_spill()
+    await audit_webhook._settle(audit_webhook._RETRY_QUEUE[0])
+    await audit_webhook._persist_retry_queue()
+    audit_webhook._SPILL_PENDING = False
+
+
+def _plan(path: str, sql: str, params: tuple) -> list[str]:
+    conn = sqlite3.connect(path)
+    try:
+        return [r[-1] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+    finally:
+        conn.close()
+
+
+def test_every_store_method_is_covered(recorded):
+    # A new Store method must be added to _drive_store so its SQL gets checked
+    called = asyncio.run(_drive_store())
+    assert called == set(Store.__abstractmethods__)
+
+
+def test_no_full_table_scans(recorded, sqlite_path, monkeypatch):
+    monkeypatch.setattr(audit_webhook, "AUDIT_WEBHOOK_URL", "http://127.0.0.1:9/webhook")
+    # Only the spill's SQL is wanted here, not deliveries
+    monkeypatch.setattr(audit_webhook, "_ensure_retry_task", lambda: None)
+    asyncio.run(_drive_store())
+    asyncio.run(_drive_audit())
+    assert recorded
+
+    scans = []
+    for sql, params in recorded.items():
+        for detail in _plan(sqlite_path, sql, params):
+            m = SCAN_RE.search(detail)
+            # FTS5 MATCH shows up as a scan of the virtual table's own index
+            if m is None or "VIRTUAL TABLE" in detail or m.group(1) in SCAN_ALLOWED:
+                continue
+            scans.append(f"{detail}\n  in: {' '.join(sql.split())}")
+    assert not scans, "full table scans:\n" + "\n".join(scans)
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+
+from bot.storage import MemoryStore, SqliteStore, Store
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, sqlite_path):
+    s = SqliteStore() if request.param == "sqlite" else MemoryStore()
+    asyncio.run(s.setup())
+    return s
+
+
+def test_backend_missing_a_method_fails_at_construction():
+    class Partial(Store):
+        async def setup(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_baseline_upsert_keeps_first_inviter(store):
+    async def scenario():
+        await store.upsert_invite_baseline(1, [("abc", 3, 10, "2025-01-01T00:00:00+00:00"), ("def", 0, None, None)])
+        await store.upsert_invite_baseline(1, [("abc", 5, 99, None), ("def", 1, 20, "2025-01-02T00:00:00+00:00")])
+        await store.upsert_invite_baseline(2, [("abc", 7, 30, None)])
+        return await store.load_invite_baseline(1), await store.load_invite_baseline(2)
+
+    g1, g2 = asyncio.run(scenario())
+    assert g1 == {"abc": (5, 10), "def": (1, 20)}
+    assert g2 == {"abc": (7, 30)}
+
+
+def test_invite_owner_and_delete(store):
+    async def scenario():
+        await store.upsert_invite_baseline(1, [("abc", 3, 10, None), ("def", 0, None, None)])
+        await store.set_invite_owner(guild_id=1, code="abc", owner_id=42, created_at=None, uses=4)
+        await store.set_invite_owner(guild_id=1, code="new", owner_id=42, created_at="2025-01-01T00:00:00+00:00", uses=0)
+        removed = await store.delete_invite_baseline(1, ["abc", "missing"])
+        return removed, await store.load_invite_baseline(1)
+
+    removed, baseline = asyncio.run(scenario())
+    assert removed == 1
+    assert baseline == {"def": (0, None), "new": (0, 42)}
+
+
+def test_join_log_attribution_and_rollups(store):
+    async def scenario():
+        row = await store.add_join(
+            guild_id=1, member_id=5, member_tag="a#1", joined_at="2025-01-10T12:00:00+00:00",
+            invite_code=None, inviter_id=None, uses_before=None, uses_after=None,
+        )
+        await store.set_join_invite(row, invite_code="abc", inviter_id=10, uses_before=1, uses_after=2)
+        # A second finalize of the same row must not count it twice
+        await store.set_join_invite(row, invite_code="abc", inviter_id=10, uses_before=1, uses_after=2)
+        other = await store.add_join(
+            guild_id=1, member_id=6, member_tag="b#1", joined_at="2025-01-11T12:00:00+00:00",
+            invite_code=None, inviter_id=None, uses_before=None, uses_after=None,
+        )
+        await store.set_join_invite(other, invite_code=None, inviter_id=None, uses_before=None, uses_after=None)
+        return (
+            await store.latest_join(guild_id=1, member_id=5),
+            await store.latest_join(guild_id=1, member_id=7),
+            await store.invite_join_counts(guild_id=1, since_day="2025-01-01", by="inviter"),
+            await store.invite_join_counts(guild_id=1, since_day="2025-01-11", by="code"),
+        )
+
+    latest, missing, by_inviter, by_code = asyncio.run(scenario())
+    assert latest == {
+        "invite_code": "abc",
+        "inviter_id": 10,
+        "uses_before": 1,
+        "uses_after": 2,
+        "joined_at": "2025-01-10T12:00:00+00:00",
+    }
+    assert missing is None
+    assert by_inviter == [(0, 1), (10, 1)]
+    assert by_code == [("", 1)]
+
+
+def test_stale_rollup_and_compaction(store):
+    async def scenario():
+        for i, day in enumerate(("2025-01-01", "2025-01-02", "2025-03-01")):
+            await store.add_join(
+                guild_id=1, member_id=i, member_tag=f"m{i}", joined_at=f"{day}T00:00:00+00:00",
+                invite_code=None, inviter_id=None, uses_before=None, uses_after=None,
+            )
+        counted = await store.rollup_stale_joins(1, cutoff_iso="2025-02-01", limit=1)
+        removed = await store.compact_join_log_batch(1, cutoff_iso="2025-02-01", limit=100)
+        return (
+            counted,
+            removed,
+            await store.latest_join(guild_id=1, member_id=0),
+            await store.latest_join(guild_id=1, member_id=2),
+            await store.invite_join_counts(guild_id=1, since_day="2025-01-01", by="inviter"),
+        )
+
+    counted, removed, gone, kept, counts = asyncio.run(scenario())
+    assert counted == 1
+    assert removed == 2
+    assert gone is None
+    assert kept is not None
+    # Both compacted rows are counted exactly once; the recent row is still pending attribution
+    assert counts == [(0, 2)]
+
+
+def test_member_hourly_buckets(store):
+    async def scenario():
+        await store.record_member_join(guild_id=1, hour="2025-01-01T10", new_account=True)
+        await store.record_member_join(guild_id=1, hour="2025-01-01T10", new_account=False)
+        await store.record_member_leave(guild_id=1, hour="2025-01-01T11", tenure_bucket="7d")
+        await store.record_member_join(guild_id=1, hour="2024-12-31T23", new_account=False)
+        await store.record_member_join(guild_id=2, hour="2025-01-01T10", new_account=False)
+        with pytest.raises(ValueError):
+            await store.record_member_leave(guild_id=1, hour="2025-01-01T11", tenure_bucket="bogus")
+        return await store.member_hourly_counts(guild_id=1, since_hour="2025-01-01T00")
+
+    rows = asyncio.run(scenario())
+    assert [r["hour"] for r in rows] == ["2025-01-01T10", "2025-01-01T11"]
+    assert (rows[0]["joins"], rows[0]["new_account_joins"], rows[0]["leaves"]) == (2, 1, 0)
+    assert (rows[1]["joins"], rows[1]["leaves"], rows[1]["tenure_7d"], rows[1]["tenure_1h"]) == (0, 1, 1, 0)
+
+
+def test_role_rules_and_seen(store):
+    async def scenario():
+        await store.mark_role_seen(guild_id=1, role_id=2, member_ids=[5, 6])
+        await store.mark_role_seen(guild_id=1, role_id=2, member_ids=[6, 7])
+        await store.mark_role_seen(guild_id=1, role_id=2, member_ids=[])
+        await store.mark_role_seen(guild_id=2, role_id=2, member_ids=[5])
+        await store.forget_role_seen(guild_id=1, role_id=2, member_ids=[5, 8])
+        await store.forget_role_seen(guild_id=1, role_id=3, member_ids=[6])
+        return (
+            await store.list_role_rules(),
+            await store.role_seen_members(guild_id=1, role_id=2),
+            await store.role_seen_members(guild_id=1, role_id=3),
+            await store.role_seen_members(guild_id=2, role_id=2),
+        )
+
+    rules, seen, other, other_guild = asyncio.run(scenario())
+    assert rules == []
+    assert seen == {6, 7}
+    assert other == set()
+    assert other_guild == {5}
+
+
+def test_afk(store):
+    async def scenario():
+        await store.set_afk(guild_id=1, user_id=2, message="lunch", until_ts=123)
+        got = await store.get_afk(guild_id=1, user_id=2)
+        cleared = await store.clear_afk(guild_id=1, user_id=2)
+        return got, cleared, await store.clear_afk(guild_id=1, user_id=2), await store.get_afk(guild_id=1, user_id=2)
+
+    got, cleared, cleared_again, after = asyncio.run(scenario())
+    assert (got["message"], got["until_ts"]) == ("lunch", 123)
+    assert got["set_at"]
+    assert cleared is True
+    assert cleared_again is False
+    assert after is None
+
+
+def test_server_status(store):
+    async def scenario():
+        await store.set_server_status(guild_id=1, role_id=2, is_open=False, note="maintenance", updated_by=9)
+        got = await store.get_server_status(guild_id=1, role_id=2)
+        cleared = await store.clear_server_status(guild_id=1, role_id=2)
+        return got, cleared, await store.get_server_status(guild_id=1, role_id=2)
+
+    got, cleared, after = asyncio.run(scenario())
+    assert (got["is_open"], got["note"], got["updated_by"]) == (False, "maintenance", 9)
+    assert cleared is True
+    assert after is None